@@ -1,18 +1,93 @@
 import uuid
 import json
 import threading
-import queue
+import time
 from datetime import datetime
 from flask import Flask, render_template, request, Response, stream_with_context
 
-from bot.reservation_bot import run_reservation
+from bot.availability_watcher import get_watcher_registry
+from bot.broker import get_broker
+from bot.driver_manager import get_driver_pool, get_orphan_reaper, page_load_baseline
+from bot.http_engine import get_http_pool, get_reservation_engine
+from bot.job_scheduler import AdmissionError, get_job_scheduler
+from bot.job_store import get_job_store, worker_identity
+from bot.memory_watchdog import get_memory_watchdog
+from bot.metrics import REGISTRY, page_load_savings
+from bot.poll_scheduler import get_poll_scheduler
+from bot.release_mode import get_release_settings, parse_release_time, run_release_reservation
+from bot.reservation_bot import run_batch_reservation, run_reservation
+from bot.session_cache import get_session_cache
+from bot.session_registry import get_session_registry
+from bot.sse_hub import CLOSED, KEEPALIVE, StreamHub
 
 app = Flask(__name__)
 
-# Store active reservation sessions
-# Structure: {session_id: queue.Queue()}
-active_sessions = {}
-cancel_events = {}
+# Warm browsers shared by all reservations in this worker
+driver_pool = get_driver_pool()
+driver_pool.start()
+
+# Kills Chrome and chromedriver processes leaked by crashed or abandoned drivers
+orphan_reaper = get_orphan_reaper()
+orphan_reaper.start()
+
+# Replaces browsers that grow too large while polling, without signing in again
+memory_watchdog = get_memory_watchdog()
+
+# Single reservations run over plain HTTP with RESERVATION_ENGINE=http, on one
+# shared connection pool, and only take a browser when a page needs one
+reservation_engine = get_reservation_engine()
+http_pool = get_http_pool()
+
+# Encrypted cache of signed-in cookies, keyed by account
+session_cache = get_session_cache()
+
+# Global polling budget shared by every watch in this worker
+poll_scheduler = get_poll_scheduler()
+
+# One availability watcher per date, shared by every session waiting on it
+watcher_registry = get_watcher_registry()
+
+# Progress messages and cancel flags for every reservation session.
+# Use SESSION_BROKER=sqlite when running more than one worker.
+broker = get_broker()
+
+# Creation and activity times of this worker's sessions; one reaper expires them
+session_registry = get_session_registry(broker)
+session_registry.start()
+
+# Bounded runner for reservation jobs with a memory-based concurrency cap
+job_scheduler = get_job_scheduler()
+
+# Single dispatcher and keepalive timer feeding every connected SSE client
+stream_hub = StreamHub(broker)
+
+# Durable record of every job, so jobs interrupted by a restart are resumed.
+# Jobs this worker runs are owned by worker_id; the watcher is started below.
+job_store = get_job_store()
+worker_id = worker_identity()
+
+# Full-profile page load cost that lean workers report their savings against
+load_baseline = page_load_baseline()
+
+# Release-time reservations waiting for their lead time, by session ID
+release_settings = get_release_settings()
+scheduled_releases = {}
+
+# Gauges read at scrape time
+REGISTRY.gauge("active_sessions", "Reservation jobs running in this worker",
+               callback=lambda: job_scheduler.stats()["running"])
+REGISTRY.gauge("queued_sessions", "Reservation jobs waiting for a slot in this worker",
+               callback=lambda: job_scheduler.stats()["queued"])
+REGISTRY.gauge("live_browsers", "Chrome instances owned by this worker's pool",
+               callback=lambda: driver_pool.stats()["live"])
+REGISTRY.gauge("live_sessions", "Reservation sessions tracked by this worker, including finished ones not yet expired",
+               callback=lambda: session_registry.stats()["live"])
+REGISTRY.gauge("sse_clients", "Connected status page streams",
+               callback=lambda: stream_hub.stats()["clients"])
+REGISTRY.gauge("browser_page_load_ms_saved", "Mean milliseconds saved per lean page load against full ones",
+               callback=lambda: page_load_savings(load_baseline)["ms_saved"])
+REGISTRY.gauge("browser_page_load_bytes_saved", "Mean bytes saved per lean page load against full ones",
+               callback=lambda: page_load_savings(load_baseline)["bytes_saved"])
 
 
 @app.route('/')
@@ -24,115 +99,310 @@ def index():
 @app.route('/health')
 def health():
     """Health check endpoint for deployment platforms"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}, 200
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "engine": reservation_engine,
+        "driver_pool": driver_pool.stats(),
+        "orphan_reaper": orphan_reaper.stats(),
+        "memory_watchdog": memory_watchdog.stats(),
+        "watched_dates": watcher_registry.stats(),
+        "polling": poll_scheduler.stats(),
+        "streams": stream_hub.stats(),
+        "sessions": session_registry.stats(),
+        "jobs": job_scheduler.stats(),
+        "page_loads": page_load_savings(load_baseline),
+        "job_store": job_store.stats() if job_store else None
+    }, 200
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/start_reservation', methods=['POST'])
 def start_reservation():
     """
-    Start a new reservation in a background thread.
+    Queue a new reservation on the job scheduler.
     Returns a page that streams status updates via SSE.
     """
-    # Generate unique session ID
-    session_id = str(uuid.uuid4())
-
-    # Create message queue and cancel event for this session
-    message_queue = queue.Queue()
-    cancel_event = threading.Event()
-    active_sessions[session_id] = message_queue
-    cancel_events[session_id] = cancel_event
-
     # Get form data
     username = request.form.get('username', '').strip()
     password = request.form.get('password', '').strip()
     license_plate = request.form.get('license_plate', '').strip()
     date_str = request.form.get('date', '').strip()
+    extra_dates = request.form.get('extra_dates', '').strip()
+    max_bookings = request.form.get('max_bookings', '1').strip() or '1'
+    release_str = request.form.get('release_at', '').strip()
 
     # Validate inputs
     if not all([username, password, license_plate, date_str]):
         return render_template('index.html', error="All fields are required"), 400
+    if not max_bookings.isdigit() or int(max_bookings) < 1:
+        return render_template('index.html', error="Max bookings must be a positive number"), 400
 
-    # Progress callback that pushes to queue
-    def progress_callback(message, status):
-        message_queue.put({
-            'message': message,
-            'status': status,
-            'timestamp': datetime.now().isoformat()
-        })
+    # Every (date, plate) combination is a target; one browser watches them all
+    dates = [date_str] + [d.strip() for d in extra_dates.split(',') if d.strip()]
+    plates = [p.strip() for p in license_plate.split(',') if p.strip()]
+    targets = [{"date": d, "license_plate": p} for d in dates for p in plates]
+    if not targets:
+        return render_template('index.html', error="All fields are required"), 400
 
-    # Start bot in background thread
-    def run_bot():
-        result = run_reservation(username, password, license_plate, date_str, progress_callback, cancel_event)
-
-        # Push final result to queue
-        if result['success']:
-            message_queue.put({
-                'message': result['message'],
-                'status': 'success',
-                'timestamp': datetime.now().isoformat(),
-                'final': True
-            })
-        else:
-            message_queue.put({
-                'message': result['message'],
-                'status': 'error',
-                'timestamp': datetime.now().isoformat(),
-                'final': True
-            })
-
-    thread = threading.Thread(target=run_bot)
-    thread.daemon = True
-    thread.start()
+    # Release-time mode prepares several browsers for one known opening
+    release_at = None
+    if release_str:
+        if len(targets) > 1:
+            return render_template('index.html', error="Release time works with a single date and plate"), 400
+        try:
+            release_at = parse_release_time(release_str, poll_scheduler.timezone)
+        except Exception as e:
+            return render_template('index.html', error=str(e)), 400
+
+    # Generate unique session ID and register it only once the input is valid
+    session_id = str(uuid.uuid4())
+    session_registry.open(session_id)
+
+    params = {
+        "username": username,
+        "date": date_str,
+        "plates": plates,
+        "targets": targets,
+        "max_bookings": int(max_bookings),
+        "release_at": release_at,
+        "release_str": release_str,
+    }
+    if job_store:
+        job_store.create(session_id, params, password, worker_id)
+
+    # A queued job is told its position by the scheduler
+    try:
+        launch_job(session_id, params, password)
+    except AdmissionError as e:
+        session_registry.evict(session_id)
+        return render_template('index.html', error=str(e)), 503
 
     # Redirect to status page with session ID
     return render_template('status.html', session_id=session_id)
 
 
+def publish_progress(session_id, message, status, final=False):
+    """Publish one progress message for a session to the broker."""
+    msg = {
+        'message': message,
+        'status': status,
+        'timestamp': datetime.now().isoformat()
+    }
+    if final:
+        msg['final'] = True
+    broker.publish(session_id, msg)
+    session_registry.touch(session_id)
+
+
+def finish_job(session_id, outcome):
+    """Start the session's expiry clock and record the job's outcome in the job store."""
+    session_registry.finish(session_id)
+    if job_store:
+        job_store.finish(session_id, outcome)
+
+
+def launch_job(session_id, params, password, resume_state=None):
+    """
+    Submit a reservation job to the scheduler, or schedule a far-off release.
+
+    Args:
+        session_id: Broker session receiving the job's progress
+        params: Job parameters as recorded in the job store
+        password: Account password
+        resume_state: Progress recorded by an interrupted run of this job, if any
+
+    Returns:
+        int: Queue position, 0 if the job started or was scheduled
+
+    Raises:
+        AdmissionError: If the scheduler cannot accept the job
+    """
+    cancel_event = broker.cancel_event(session_id)
+    username = params["username"]
+    date_str = params["date"]
+    plates = params["plates"]
+    targets = params["targets"]
+    release_at = params["release_at"]
+    release_str = params["release_str"]
+
+    # Progress callback that publishes to the broker
+    def progress_callback(message, status):
+        publish_progress(session_id, message, status)
+
+    # Phase changes and progress go to the job store so a restart can resume the job
+    def on_phase(phase, state):
+        if job_store:
+            job_store.update(session_id, phase, **state)
+
+    # Job run by the scheduler once a slot is free
+    def run_bot():
+        if cancel_event.is_set():
+            publish_progress(session_id, 'Reservation cancelled before it started.', 'error', final=True)
+            finish_job(session_id, "cancelled")
+            return
+
+        outcome = "error"
+        try:
+            if release_at:
+                result = run_release_reservation(username, password, plates[0], date_str, release_at,
+                                                 progress_callback, cancel_event, driver_pool=driver_pool,
+                                                 poll_scheduler=poll_scheduler, on_phase=on_phase,
+                                                 **release_settings)
+            elif len(targets) > 1:
+                result = run_batch_reservation(username, password, targets, progress_callback, cancel_event,
+                                               max_bookings=params["max_bookings"], driver_pool=driver_pool,
+                                               session_cache=session_cache, poll_scheduler=poll_scheduler,
+                                               on_phase=on_phase, resume_state=resume_state,
+                                               memory_watchdog=memory_watchdog)
+            else:
+                result = run_reservation(username, password, plates[0], date_str, progress_callback, cancel_event,
+                                         driver_pool=driver_pool, session_cache=session_cache,
+                                         watcher_registry=watcher_registry, poll_scheduler=poll_scheduler,
+                                         on_phase=on_phase, resume_state=resume_state,
+                                         memory_watchdog=memory_watchdog, engine=reservation_engine,
+                                         http_pool=http_pool)
+
+            # Publish final result
+            if result['success']:
+                outcome = "success"
+                publish_progress(session_id, result['message'], 'success', final=True)
+            else:
+                outcome = "cancelled" if cancel_event.is_set() else "error"
+                publish_progress(session_id, result['message'], 'error', final=True)
+        finally:
+            finish_job(session_id, outcome)
+
+    # A release far in the future takes no job slot until shortly before its lead time
+    start_in = release_at - release_settings["lead_time"] - 60 - time.time() if release_at else 0
+    if start_in > 0:
+        def submit_release():
+            scheduled_releases.pop(session_id, None)
+            try:
+                job_scheduler.submit(session_id, run_bot, priority=-1, on_update=progress_callback,
+                                     slots=release_settings["racers"])
+            except AdmissionError as e:
+                publish_progress(session_id, str(e), 'error', final=True)
+                finish_job(session_id, "error")
+
+        timer = threading.Timer(start_in, submit_release)
+        timer.daemon = True
+        scheduled_releases[session_id] = timer
+        timer.start()
+        progress_callback(f"Scheduled: browsers will be prepared "
+                          f"{release_settings['lead_time']:.0f}s before {release_str}", "queued")
+        return 0
+
+    try:
+        # A release job drives one browser per racer, so it holds that many slots
+        return job_scheduler.submit(session_id, run_bot, priority=-1 if release_at else 0,
+                                    on_update=progress_callback,
+                                    slots=release_settings["racers"] if release_at else 1)
+    except AdmissionError:
+        finish_job(session_id, "error")
+        raise
+
+
+def resume_job(job):
+    """
+    Pick up a job interrupted by a restart, crash or sleeping instance.
+
+    The job restarts from its recorded phase: a run that had reached the
+    calendar signs back in (from the session cache when possible) and goes
+    straight back to polling. A run interrupted during checkout is not
+    retried, since the booking may already have gone through.
+    """
+    session_id = job["job_id"]
+    params = job["params"]
+    # In-memory sessions do not survive a restart; this recreates it for the status page
+    session_registry.open(session_id)
+
+    if job["phase"] in ("complete_reservation", "checkout_race"):
+        publish_progress(session_id, "Server restarted during checkout. Check your account for the "
+                                     "reservation before submitting again.", "error", final=True)
+        finish_job(session_id, "error")
+        return
+
+    # A cached login is only released against the password, so one is needed either way
+    password = job_store.password(job)
+    if password is None:
+        print(f"[ERROR] Cannot resume job {session_id}: its password could not be decrypted. "
+              f"JOB_STORE_KEY (or the key file in JOB_STORE_KEY_PATH) must stay the same across restarts.")
+        publish_progress(session_id, "Server restarted and the job could not be resumed. "
+                                     "Please submit it again.", "error", final=True)
+        finish_job(session_id, "error")
+        return
+
+    publish_progress(session_id, f"Server restarted; resuming from {job['phase'].replace('_', ' ')}...", "info")
+    try:
+        launch_job(session_id, params, password, resume_state=job["state"])
+    except AdmissionError as e:
+        publish_progress(session_id, str(e), 'error', final=True)
+
+
+if job_store:
+    job_store.watch(worker_id, resume_job)
+
+
 @app.route('/stream/<session_id>')
 def stream(session_id):
     """
     SSE endpoint that streams status updates for a reservation session.
+
+    Every event carries its broker event ID, so a reconnecting EventSource
+    sends Last-Event-ID and only receives what it has not seen yet.
     """
-    def generate():
-        message_queue = active_sessions.get(session_id)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '0')
+    after_id = int(last_event_id) if last_event_id.isdigit() else 0
+    if after_id > broker.last_id(session_id):
+        # The session was recreated after a restart; replay it from the start
+        after_id = 0
 
-        if not message_queue:
-            yield f"data: {json.dumps({'message': 'Invalid session', 'status': 'error'})}\n\n"
+    def generate():
+        if not broker.exists(session_id):
+            yield f"data: {json.dumps({'message': 'Invalid session', 'status': 'error', 'final': True})}\n\n"
             return
 
+        # Tell the browser how soon to reconnect after a dropped connection
+        yield "retry: 3000\n\n"
+
+        session_registry.touch(session_id)
+        client = stream_hub.subscribe(session_id, after_id=after_id)
         try:
             while True:
-                try:
-                    # Wait for messages from bot thread (30s timeout for keepalive)
-                    msg = message_queue.get(timeout=30)
-
-                    # Send message to client
-                    yield f"data: {json.dumps(msg)}\n\n"
-
-                    # Check if this is the final message
-                    if msg.get('final', False):
-                        # Cleanup session after a short delay
-                        def cleanup():
-                            import time
-                            time.sleep(5)
-                            if session_id in active_sessions:
-                                del active_sessions[session_id]
-                            if session_id in cancel_events:
-                                del cancel_events[session_id]
-
-                        cleanup_thread = threading.Thread(target=cleanup)
-                        cleanup_thread.daemon = True
-                        cleanup_thread.start()
-                        break
-
-                except queue.Empty:
+                # Parked until the hub delivers a message or a keepalive
+                item = client.queue.get()
+
+                if item is CLOSED:
+                    # Session was removed
+                    return
+
+                if item is KEEPALIVE:
                     # Send keepalive comment to prevent timeout
                     yield ": keepalive\n\n"
+                    continue
+
+                event_id, msg = item
+
+                # Send message to client
+                yield f"id: {event_id}\ndata: {json.dumps(msg)}\n\n"
+
+                # The session registry expires the session once its job has finished
+                if msg.get('final', False):
+                    return
 
         except GeneratorExit:
             # Client disconnected
             pass
 
+        finally:
+            stream_hub.unsubscribe(client)
+
     return Response(
         stream_with_context(generate()),
         mimetype='text/event-stream',
@@ -147,9 +417,14 @@ def stream(session_id):
 @app.route('/cancel/<session_id>', methods=['POST'])
 def cancel(session_id):
     """Signal a running reservation to stop."""
-    event = cancel_events.get(session_id)
-    if event:
-        event.set()
+    if broker.cancel(session_id):
+        # Drop it from this worker's queue or release schedule if it has not started yet
+        timer = scheduled_releases.pop(session_id, None)
+        if timer:
+            timer.cancel()
+        if timer or job_scheduler.cancel(session_id):
+            publish_progress(session_id, 'Reservation cancelled before it started.', 'error', final=True)
+            finish_job(session_id, "cancelled")
         return {"status": "cancelled"}, 200
     return {"status": "not_found"}, 404
 
@@ -0,0 +1 @@
+# Benchmarks that run the bot against the local mock site
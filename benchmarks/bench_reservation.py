@@ -0,0 +1,282 @@
+"""
+End-to-end benchmark of the reservation bot against the local mock site.
+
+Starts the mock site on a free port, schedules the target date to open
+after --flip-after seconds, runs --sessions concurrent reservations and
+reports:
+
+- time-to-reserve: job start to successful checkout, per session
+- detection latency: date flip to the bot noticing it, per session
+- polls per second: calendar requests seen by the mock site while waiting
+- peak memory per session: peak RSS of the browser process trees / sessions
+
+With --engine http the sessions run without a browser unless one falls back,
+so the same numbers compare the two engines.
+
+Usage:
+    python -m benchmarks.bench_reservation --sessions 4 --flip-after 20
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+from werkzeug.serving import make_server
+
+from mock_site.server import MockState, create_app
+
+
+def start_mock_server(state):
+    """
+    Serve the mock site in a background thread.
+
+    Returns:
+        tuple: (server, base_url)
+    """
+    server = make_server("127.0.0.1", 0, create_app(state), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def process_tree_rss_mb(root_pid):
+    """
+    Resident memory of every descendant of a process (Linux /proc only).
+
+    Args:
+        root_pid: Process whose children (chromedriver, Chrome) are measured
+
+    Returns:
+        float: Megabytes of RSS summed over all descendants
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError):
+            continue
+
+    total_kb = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class MemorySampler:
+    """Samples the RSS of this process's browser children and keeps the peak."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, process_tree_rss_mb(os.getpid()))
+            self._stop.wait(self.interval)
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "mean": round(statistics.mean(values), 3),
+        "min": round(min(values), 3),
+        "max": round(max(values), 3),
+    }
+
+
+def run_benchmark(sessions=1, flip_after=20.0, poll_interval=2.0, http_polling=True, shared_watcher=False,
+                  target_date=None, driver_profile="full", in_page_polling=True, tabs_per_browser=1,
+                  engine="browser"):
+    """
+    Run concurrent reservations against a fresh mock site.
+
+    Args:
+        sessions: Number of concurrent reservations
+        flip_after: Seconds after start when the target date opens
+        poll_interval: Seconds between availability checks per watch
+        http_polling: Poll over HTTP instead of refreshing the browser
+        shared_watcher: Share one HTTP watcher between all sessions
+        target_date: Date to reserve (default: a week from today)
+        driver_profile: Browser profile to launch, "full" or "lean"
+        in_page_polling: Refetch the calendar inside the page instead of reloading it
+        tabs_per_browser: Sessions sharing one browser process in isolated tabs (1 = a browser each)
+        engine: "browser" or "http" (browserless, falling back to a browser per session)
+
+    Returns:
+        dict: Benchmark report
+    """
+    state = MockState()
+    server, base_url = start_mock_server(state)
+
+    # The bot reads the base URL at import time
+    os.environ["PARKING_BASE_URL"] = base_url
+    os.environ["DRIVER_PROFILE"] = driver_profile
+    from bot.availability_watcher import WatcherRegistry
+    from bot.driver_manager import block_heavy_requests, setup_driver
+    from bot.metrics import page_load_savings
+    from bot.multiplex import MultiplexedDriverPool
+    from bot.poll_scheduler import PollScheduler
+    from bot.reservation_bot import run_reservation
+
+    target_date = target_date or (date.today() + timedelta(days=7)).isoformat()
+    # Budget sized so every watch polls at exactly poll_interval
+    scheduler = PollScheduler(
+        requests_per_minute=60.0 / poll_interval * sessions,
+        min_interval=poll_interval,
+        jitter=0,
+    )
+    watcher_registry = WatcherRegistry(scheduler=scheduler) if shared_watcher else None
+    driver_pool = MultiplexedDriverPool(
+        setup_driver, tabs_per_browser=tabs_per_browser,
+        tab_setup=block_heavy_requests if driver_profile == "lean" else None,
+    ) if tabs_per_browser > 1 else None
+
+    sampler = MemorySampler()
+    sampler.start()
+
+    start = time.time()
+    flip_time = state.flip(target_date, flip_after)
+    calendar_requests_at_flip = {}
+    results = [None] * sessions
+
+    def flip_marker():
+        time.sleep(max(flip_time - time.time(), 0))
+        calendar_requests_at_flip["count"] = state.counts["calendar"]
+
+    threading.Thread(target=flip_marker, daemon=True).start()
+
+    def session(index):
+        detected = {}
+        polling_started = {}
+
+        def progress(message, status):
+            now = time.time()
+            if status == "polling" and "start" not in polling_started:
+                polling_started["start"] = now
+            if status == "success" and "detected" not in detected and now >= flip_time:
+                detected["detected"] = now
+
+        job_start = time.time()
+        result = run_reservation(
+            "bench-user", "bench-pass", "ABC123", target_date,
+            progress_callback=progress, poll_scheduler=scheduler, http_polling=http_polling,
+            watcher_registry=watcher_registry, in_page_polling=in_page_polling, driver_pool=driver_pool,
+            engine=engine,
+        )
+        job_end = time.time()
+        results[index] = {
+            "success": result["success"],
+            "message": result["message"],
+            "engine": result.get("engine"),
+            "time_to_reserve": job_end - job_start if result["success"] else None,
+            "detection_latency": detected["detected"] - flip_time if "detected" in detected else None,
+            "polling_started": polling_started.get("start"),
+            "phase_timings": result.get("phase_timings"),
+        }
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sampler.stop()
+    if driver_pool:
+        driver_pool.shutdown()
+    server.shutdown()
+
+    polling_starts = [r["polling_started"] for r in results if r["polling_started"]]
+    waiting_seconds = flip_time - min(polling_starts) if polling_starts else 0
+    polls_before_flip = calendar_requests_at_flip.get("count", state.counts["calendar"])
+
+    return {
+        "sessions": sessions,
+        "http_polling": http_polling,
+        "shared_watcher": shared_watcher,
+        "driver_profile": driver_profile,
+        "in_page_polling": in_page_polling,
+        "tabs_per_browser": tabs_per_browser,
+        "engine": engine,
+        "finished_over_http": sum(1 for r in results if r["engine"] == "http"),
+        "poll_interval": poll_interval,
+        "flip_after": flip_after,
+        "succeeded": sum(1 for r in results if r["success"]),
+        "bookings": len(state.bookings),
+        "time_to_reserve": summarize([r["time_to_reserve"] for r in results]),
+        "detection_latency": summarize([r["detection_latency"] for r in results]),
+        "polls_per_second": round(polls_before_flip / waiting_seconds, 3) if waiting_seconds > 0 else None,
+        "page_loads": page_load_savings(),
+        "peak_memory_mb": round(sampler.peak_mb, 1),
+        "peak_memory_per_session_mb": round(sampler.peak_mb / sessions, 1),
+        "wall_seconds": round(time.time() - start, 2),
+        "errors": [r["message"] for r in results if not r["success"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot against the local mock site")
+    parser.add_argument("--sessions", type=int, default=1, help="Concurrent reservations")
+    parser.add_argument("--flip-after", type=float, default=20.0, help="Seconds until the date opens")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between checks per watch")
+    parser.add_argument("--no-http-polling", action="store_true", help="Poll by refreshing the browser")
+    parser.add_argument("--no-in-page", action="store_true",
+                        help="Reload the calendar page instead of refetching it in place")
+    parser.add_argument("--shared-watcher", action="store_true", help="Share one HTTP watcher per date")
+    parser.add_argument("--driver-profile", choices=["full", "lean"], default="full",
+                        help="Browser profile to launch")
+    parser.add_argument("--tabs-per-browser", type=int, default=1,
+                        help="Sessions sharing one browser in isolated tabs (default: a browser each)")
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser",
+                        help="Drive Chrome throughout, or run over HTTP with browser fallback")
+    parser.add_argument("--date", help="Target date YYYY-MM-DD (default: a week from today)")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        sessions=args.sessions,
+        flip_after=args.flip_after,
+        poll_interval=args.poll_interval,
+        http_polling=not args.no_http_polling,
+        shared_watcher=args.shared_watcher,
+        target_date=args.date,
+        driver_profile=args.driver_profile,
+        in_page_polling=not args.no_in_page,
+        tabs_per_browser=args.tabs_per_browser,
+        engine=args.engine,
+    )
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import threading
+import time
+
+from bot.metrics import record_poll
+from bot.poll_scheduler import get_poll_scheduler
+
+
+class Subscription:
+    """A session waiting on one date. Woken by the date's watcher."""
+
+    def __init__(self, date_base, check):
+        """
+        Args:
+            date_base: Date string in YYYY-MM-DD format
+            check: Callable(date_base) returning True/False/None, bound to this session's cookies
+        """
+        self.date_base = date_base
+        self.check = check
+        self.result = None  # "available" or "fallback" once resolved
+        self.errors = 0
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._check_seconds = []
+
+    def wait(self, timeout=None):
+        """
+        Block until the watcher resolves this subscription.
+
+        Returns:
+            bool: True if resolved, False on timeout
+        """
+        return self._event.wait(timeout)
+
+    def resolve(self, result):
+        self.result = result
+        self._event.set()
+
+    def record_check(self, seconds):
+        """Note a check the watcher ran while this session was subscribed."""
+        with self._lock:
+            self._check_seconds.append(seconds)
+
+    def take_checks(self):
+        """
+        Returns:
+            list: Durations in seconds of the checks run since the last call
+        """
+        with self._lock:
+            checks, self._check_seconds = self._check_seconds, []
+        return checks
+
+
+class DateWatcher:
+    """
+    Polls a single date on behalf of every session waiting on it.
+
+    Each check uses one subscriber's session, rotating through subscribers so
+    an expired session only affects its own owner. When the date opens all
+    subscribers are woken at once.
+    """
+
+    def __init__(self, registry, date_base, refresh_rate=5, max_errors=3, scheduler=None):
+        self.registry = registry
+        self.date_base = date_base
+        self.refresh_rate = refresh_rate
+        self.max_errors = max_errors
+        self.scheduler = scheduler
+        self.subscribers = []
+        self.checks = 0
+        self._next = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _pick_subscriber(self):
+        with self.registry.lock:
+            if not self.subscribers:
+                return None
+            self._next %= len(self.subscribers)
+            sub = self.subscribers[self._next]
+            self._next += 1
+            return sub
+
+    def _record(self, seconds):
+        # Every subscriber waits on this check, so each one reports it
+        with self.registry.lock:
+            subscribers = self.subscribers[:]
+        for sub in subscribers:
+            sub.record_check(seconds)
+
+    def _delay(self, key, error=False):
+        if self.scheduler:
+            return self.scheduler.next_delay(key, error=error)
+        return self.refresh_rate
+
+    def _run(self):
+        # The whole date counts as a single watch against the request budget
+        key = self.scheduler.register() if self.scheduler else None
+        try:
+            self._poll(key)
+        finally:
+            if self.scheduler:
+                self.scheduler.unregister(key)
+
+    def _poll(self, key):
+        while True:
+            sub = self._pick_subscriber()
+            if sub is None:
+                return
+
+            check_start = time.monotonic()
+            try:
+                available = sub.check(self.date_base)
+                sub.errors = 0
+                self._record(record_poll("http", check_start))
+            except Exception:
+                self._record(record_poll("http", check_start, failed=True))
+                sub.errors += 1
+                if sub.errors >= self.max_errors:
+                    self.registry.unsubscribe(sub, result="fallback")
+                time.sleep(self._delay(key, error=True))
+                continue
+            finally:
+                self.checks += 1
+
+            if available is None:
+                # This session cannot read the calendar over HTTP
+                self.registry.unsubscribe(sub, result="fallback")
+                continue
+
+            if available:
+                self.registry.resolve_date(self.date_base)
+                return
+
+            time.sleep(self._delay(key))
+
+
+class WatcherRegistry:
+    """
+    Pub/sub registry with one DateWatcher per target date.
+
+    Sessions subscribe with their own check function; the first subscriber
+    for a date starts its watcher and the last one to leave stops it.
+    """
+
+    def __init__(self, refresh_rate=5, scheduler=None):
+        """
+        Args:
+            refresh_rate: Seconds between checks when no scheduler is given
+            scheduler: Optional PollScheduler that paces every watcher
+        """
+        self.refresh_rate = refresh_rate
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self._watchers = {}
+
+    def subscribe(self, date_base, check):
+        """
+        Register a session as waiting on a date.
+
+        Args:
+            date_base: Date string in YYYY-MM-DD format
+            check: Callable(date_base) returning True/False/None
+
+        Returns:
+            Subscription: Handle to wait on and later unsubscribe
+        """
+        sub = Subscription(date_base, check)
+        with self.lock:
+            watcher = self._watchers.get(date_base)
+            new_watcher = watcher is None
+            if new_watcher:
+                watcher = DateWatcher(self, date_base, refresh_rate=self.refresh_rate,
+                                      scheduler=self.scheduler)
+                self._watchers[date_base] = watcher
+            watcher.subscribers.append(sub)
+        if new_watcher:
+            watcher.start()
+        return sub
+
+    def unsubscribe(self, sub, result=None):
+        """
+        Remove a session from its date's watcher.
+
+        Args:
+            sub: Subscription returned by subscribe()
+            result: Optional result to wake the subscriber with
+        """
+        with self.lock:
+            watcher = self._watchers.get(sub.date_base)
+            if watcher and sub in watcher.subscribers:
+                watcher.subscribers.remove(sub)
+                if not watcher.subscribers:
+                    del self._watchers[sub.date_base]
+        if result:
+            sub.resolve(result)
+
+    def resolve_date(self, date_base):
+        """Wake every subscriber of a date because it has opened."""
+        with self.lock:
+            watcher = self._watchers.pop(date_base, None)
+            subscribers = watcher.subscribers[:] if watcher else []
+            if watcher:
+                watcher.subscribers.clear()
+        for sub in subscribers:
+            sub.resolve("available")
+
+    def stats(self):
+        """
+        Returns:
+            dict: {date: {"subscribers": int, "checks": int}} for each watched date
+        """
+        with self.lock:
+            return {
+                date_base: {"subscribers": len(w.subscribers), "checks": w.checks}
+                for date_base, w in self._watchers.items()
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_watcher_registry():
+    """
+    Returns:
+        WatcherRegistry: Process-wide registry shared by all reservations
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = WatcherRegistry(scheduler=get_poll_scheduler())
+        return _registry
@@ -0,0 +1,295 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Progress messages kept per session; older ones are dropped first
+DEFAULT_BUFFER_SIZE = 200
+
+
+class InMemoryBroker:
+    """
+    Session broker for a single process.
+
+    Holds each session's progress messages and cancel flag in memory. Only
+    usable when every request for a session reaches the same worker.
+    """
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        Args:
+            buffer_size: Most recent messages kept per session for replay
+        """
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def create_session(self, session_id):
+        with self._lock:
+            self._sessions[session_id] = {
+                "messages": deque(maxlen=self.buffer_size),
+                "next_id": 1,
+                "cond": threading.Condition(self._lock),
+                "cancel": threading.Event(),
+            }
+
+    def exists(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def last_id(self, session_id):
+        """
+        Returns:
+            int: Event ID of the newest message in the session, 0 if there is none
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session["next_id"] - 1 if session else 0
+
+    def publish(self, session_id, message):
+        """
+        Append a message to a session's stream, dropping the oldest one once
+        the buffer is full.
+
+        Returns:
+            int: Event ID of the message, or None if the session is gone
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            event_id = session["next_id"]
+            session["next_id"] += 1
+            session["messages"].append((event_id, message))
+            session["cond"].notify_all()
+            return event_id
+
+    def read(self, session_id, after_id=0, timeout=30):
+        """
+        Return messages newer than after_id, waiting up to timeout for one to arrive.
+
+        Returns:
+            list: [(event_id, message)] pairs; empty on timeout, None if the session is gone
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    return None
+                pending = [m for m in session["messages"] if m[0] > after_id]
+                remaining = deadline - time.monotonic()
+                if pending or remaining <= 0:
+                    return pending
+                session["cond"].wait(remaining)
+
+    def cancel(self, session_id):
+        """
+        Returns:
+            bool: True if the session existed and was flagged
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session["cancel"].set()
+        return True
+
+    def is_cancelled(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        return session is None or session["cancel"].is_set()
+
+    def cancel_event(self, session_id):
+        """
+        Returns:
+            threading.Event: Set when the session is cancelled
+        """
+        with self._lock:
+            return self._sessions[session_id]["cancel"]
+
+    def delete(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session:
+                session["cond"].notify_all()
+
+
+class BrokerCancelEvent:
+    """Event-like view of a session's cancel flag stored in a shared broker."""
+
+    def __init__(self, broker, session_id, poll_interval=0.5):
+        self.broker = broker
+        self.session_id = session_id
+        self.poll_interval = poll_interval
+        self._set = False
+
+    def is_set(self):
+        if not self._set:
+            self._set = self.broker.is_cancelled(self.session_id)
+        return self._set
+
+    def set(self):
+        self.broker.cancel(self.session_id)
+        self._set = True
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(self.poll_interval, remaining))
+            else:
+                time.sleep(self.poll_interval)
+        return True
+
+
+class SqliteBroker:
+    """
+    Session broker backed by a SQLite file shared by every worker on the host.
+
+    Progress messages and cancel flags go through the database, so a stream
+    or cancel request can be served by any gunicorn worker, not only the one
+    running the reservation.
+    """
+
+    def __init__(self, path, poll_interval=0.25, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        Args:
+            path: SQLite database file
+            poll_interval: Seconds between checks while a reader waits for messages
+            buffer_size: Most recent messages kept per session for replay
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " cancelled INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " body TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def create_session(self, session_id):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, cancelled, created) VALUES (?, 0, ?)",
+                (session_id, time.time()),
+            )
+
+    def exists(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def last_id(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MAX(id) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] or 0
+
+    def publish(self, session_id, message):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO messages (session_id, body) VALUES (?, ?)",
+                (session_id, json.dumps(message)),
+            )
+            # Keep only the newest buffer_size rows of this session
+            conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND id < ("
+                " SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (session_id, session_id, self.buffer_size - 1),
+            )
+            return cursor.lastrowid
+
+    def read(self, session_id, after_id=0, timeout=30):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._connect() as conn:
+                if conn.execute(
+                    "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone() is None:
+                    return None
+                rows = conn.execute(
+                    "SELECT id, body FROM messages WHERE session_id = ? AND id > ? ORDER BY id",
+                    (session_id, after_id),
+                ).fetchall()
+            if rows or time.monotonic() >= deadline:
+                return [(row[0], json.loads(row[1])) for row in rows]
+            time.sleep(self.poll_interval)
+
+    def cancel(self, session_id):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE sessions SET cancelled = 1 WHERE session_id = ?", (session_id,)
+            )
+            return cursor.rowcount > 0
+
+    def is_cancelled(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cancelled FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        # A session removed while its job is still running counts as cancelled
+        return row is None or bool(row[0])
+
+    def cancel_event(self, session_id):
+        return BrokerCancelEvent(self, session_id)
+
+    def delete(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def get_broker():
+    """
+    Create the session broker selected by environment settings.
+
+    Environment:
+        SESSION_BROKER: "memory" (single worker) or "sqlite" (shared across workers)
+        SESSION_BROKER_PATH: SQLite file for the shared broker (default: system temp dir)
+        SESSION_BUFFER_SIZE: Messages kept per session for replay (default: 200)
+
+    Returns:
+        InMemoryBroker or SqliteBroker
+    """
+    backend = os.getenv('SESSION_BROKER', 'memory').lower()
+    buffer_size = int(os.getenv('SESSION_BUFFER_SIZE', str(DEFAULT_BUFFER_SIZE)))
+    if backend == 'memory':
+        return InMemoryBroker(buffer_size=buffer_size)
+    if backend == 'sqlite':
+        return SqliteBroker(os.getenv(
+            'SESSION_BROKER_PATH',
+            os.path.join(tempfile.gettempdir(), 'crystal_parking_broker.db')
+        ), buffer_size=buffer_size)
+    raise Exception(f"Unknown SESSION_BROKER '{backend}'. Use 'memory' or 'sqlite'.")
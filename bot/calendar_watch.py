@@ -0,0 +1,181 @@
+from selenium.common.exceptions import WebDriverException
+
+# Installs (once per page load) an observer that re-checks the target days
+# whenever the calendar markup changes, and wakes up anything waiting on it.
+_WATCH_JS = """
+function cellFor(date) {
+  return document.querySelector('[data-date^="' + date + '"]');
+}
+
+function ensureWatch(dates) {
+  var watch = window.__calendarWatch;
+  if (!watch) {
+    watch = window.__calendarWatch = {dates: [], waiters: []};
+    watch.scan = function () {
+      for (var i = 0; i < watch.dates.length; i++) {
+        var cell = cellFor(watch.dates[i]);
+        if (cell && !cell.classList.contains('fc-unavailable')) {
+          return watch.dates[i];
+        }
+      }
+      return null;
+    };
+    new MutationObserver(function () {
+      if (!watch.waiters.length) return;
+      var open = watch.scan();
+      if (open) {
+        var waiters = watch.waiters;
+        watch.waiters = [];
+        waiters.forEach(function (wake) { wake(open); });
+      }
+    }).observe(document.documentElement, {
+      subtree: true, childList: true, attributes: true, attributeFilter: ['class']
+    });
+  }
+  watch.dates = dates;
+  return watch;
+}
+
+function present(dates) {
+  return dates.filter(function (date) { return cellFor(date) !== null; });
+}
+"""
+
+# Re-fetch the calendar without reloading the page. Prefers the calendar's
+# own refetchEvents() (FullCalendar v3 through jQuery, or an instance the
+# page keeps on window.calendar); otherwise fetches the page HTML and copies
+# the state of the target cells into the live DOM.
+REFETCH_SCRIPT = _WATCH_JS + """
+var dates = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+var watch = ensureWatch(dates);
+var finished = false;
+
+function report(mode, error) {
+  if (finished) return;
+  finished = true;
+  done({mode: mode, error: error || null, found: present(dates), open: watch.scan()});
+}
+
+function refetchThroughCalendar() {
+  if (window.calendar && typeof window.calendar.refetchEvents === 'function') {
+    window.calendar.refetchEvents();
+    return true;
+  }
+  if (window.jQuery && window.jQuery.fn.fullCalendar && window.jQuery('.fc').length) {
+    window.jQuery('.fc').fullCalendar('refetchEvents');
+    return true;
+  }
+  return false;
+}
+
+if (refetchThroughCalendar()) {
+  // Report once the calendar has stopped re-rendering for a moment
+  var quiet = null;
+  var observer = new MutationObserver(function () {
+    clearTimeout(quiet);
+    quiet = setTimeout(settle, 300);
+  });
+  var settle = function () { observer.disconnect(); report('calendar'); };
+  observer.observe(document.documentElement, {subtree: true, childList: true, attributes: true});
+  quiet = setTimeout(settle, 1000);
+  setTimeout(function () { observer.disconnect(); report('calendar', 'calendar refetch timed out'); }, timeout);
+} else {
+  fetch(window.location.href, {credentials: 'same-origin', cache: 'no-store'})
+    .then(function (response) {
+      if (!response.ok) throw new Error('HTTP ' + response.status);
+      return response.text();
+    })
+    .then(function (html) {
+      var fresh = new DOMParser().parseFromString(html, 'text/html');
+      var applied = 0;
+      dates.forEach(function (date) {
+        var source = fresh.querySelector('[data-date^="' + date + '"]');
+        var target = cellFor(date);
+        if (!source || !target) return;
+        ['data-href', 'onclick', 'class'].forEach(function (name) {
+          if (source.hasAttribute(name)) {
+            target.setAttribute(name, source.getAttribute(name));
+          } else {
+            target.removeAttribute(name);
+          }
+        });
+        applied++;
+      });
+      report('fetch', applied ? null : 'target dates missing from the fetched calendar');
+    })
+    .catch(function (e) { report('fetch', String(e)); });
+  setTimeout(function () { report('fetch', 'calendar fetch timed out'); }, timeout);
+}
+"""
+
+# Block until a target day opens or the timeout passes, without polling
+WAIT_SCRIPT = _WATCH_JS + """
+var dates = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+var watch = ensureWatch(dates);
+var open = watch.scan();
+if (open) {
+  done(open);
+} else {
+  var timer;
+  var wake = function (date) {
+    clearTimeout(timer);
+    var index = watch.waiters.indexOf(wake);
+    if (index >= 0) watch.waiters.splice(index, 1);
+    done(date);
+  };
+  timer = setTimeout(function () { wake(null); }, timeout);
+  watch.waiters.push(wake);
+}
+"""
+
+
+class InPageCalendar:
+    """
+    Watches calendar days from inside the page instead of reloading it.
+
+    A MutationObserver in the page re-checks the target days whenever the
+    calendar changes, and refetch() pulls fresh availability in place, so a
+    check costs one network round trip rather than a full page load and the
+    browser does not re-parse the page between checks.
+    """
+
+    def __init__(self, driver, date_bases, timeout=10):
+        """
+        Args:
+            driver: Selenium WebDriver instance showing the calendar view
+            date_bases: Date strings in YYYY-MM-DD format, in order of preference
+            timeout: Seconds allowed for one in-page refetch
+        """
+        self.driver = driver
+        self.date_bases = list(date_bases)
+        self.timeout = timeout
+
+    def refetch(self):
+        """
+        Pull fresh availability into the page.
+
+        Returns:
+            dict: {"mode": "calendar" or "fetch", "error": str or None,
+                   "found": dates present in the page, "open": first open date or None}
+        """
+        try:
+            self.driver.set_script_timeout(self.timeout + 5)
+            return self.driver.execute_async_script(REFETCH_SCRIPT, self.date_bases, self.timeout * 1000)
+        except WebDriverException as e:
+            return {"mode": None, "error": str(e).splitlines()[0], "found": [], "open": None}
+
+    def wait(self, seconds):
+        """
+        Wait for the page itself to open a target day.
+
+        Args:
+            seconds: Maximum seconds to wait
+
+        Returns:
+            str: The date that opened, None if none did within seconds
+        """
+        try:
+            self.driver.set_script_timeout(seconds + 5)
+            return self.driver.execute_async_script(WAIT_SCRIPT, self.date_bases, int(seconds * 1000))
+        except WebDriverException:
+            return None
@@ -0,0 +1,87 @@
+# Every WebDriver call is an HTTP round trip to chromedriver, so these scripts
+# gather everything a step needs in one execute_script call and return plain
+# data (plus element references where the caller clicks).
+
+SELECT_OPTIONS_SCRIPT = """
+var select = document.getElementById(arguments[0]);
+if (!select) return null;
+return Array.prototype.map.call(select.options, function (option) {
+  return {index: option.index, value: option.value, text: option.text.trim(), selected: option.selected};
+});
+"""
+
+SELECT_OPTION_SCRIPT = """
+var select = document.getElementById(arguments[0]);
+if (!select) return null;
+for (var i = 0; i < select.options.length; i++) {
+  if (select.options[i].text.trim() === arguments[1]) {
+    select.selectedIndex = i;
+    select.dispatchEvent(new Event('input', {bubbles: true}));
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+    return select.options[i].text.trim();
+  }
+}
+return null;
+"""
+
+CALENDAR_CELLS_SCRIPT = """
+var cells = {};
+arguments[0].forEach(function (date) {
+  var cell = document.querySelector('div[data-date^="' + date + '"]');
+  if (cell) {
+    cells[date] = {
+      element: cell,
+      date: cell.getAttribute('data-date'),
+      available: !cell.classList.contains('fc-unavailable')
+    };
+  }
+});
+return cells;
+"""
+
+
+def read_select_options(driver, element_id="plate"):
+    """
+    Read every option of a dropdown in one call.
+
+    Args:
+        driver: Selenium WebDriver instance
+        element_id: id of the <select> element
+
+    Returns:
+        list: [{"index": int, "value": str, "text": str, "selected": bool}],
+              or None if the dropdown is not on the page
+    """
+    return driver.execute_script(SELECT_OPTIONS_SCRIPT, element_id)
+
+
+def select_option(driver, text, element_id="plate"):
+    """
+    Select the dropdown option with this visible text in one call.
+
+    Fires the same input and change events as a user selection.
+
+    Args:
+        driver: Selenium WebDriver instance
+        text: Visible option text to select
+        element_id: id of the <select> element
+
+    Returns:
+        str: The selected option text, or None if the dropdown or option is missing
+    """
+    return driver.execute_script(SELECT_OPTION_SCRIPT, element_id, text.strip())
+
+
+def read_calendar_cells(driver, date_bases):
+    """
+    Read the state of several calendar days in one call.
+
+    Args:
+        driver: Selenium WebDriver instance showing the calendar view
+        date_bases: Date strings in YYYY-MM-DD format
+
+    Returns:
+        dict: {date_base: {"element": WebElement, "date": data-date value, "available": bool}}
+              for every date present on the page
+    """
+    return driver.execute_script(CALENDAR_CELLS_SCRIPT, list(date_bases))
@@ -1,16 +1,85 @@
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
+from bot.metrics import BROWSER_PROCESSES_REAPED_TOTAL, record_page_load
+from bot.multiplex import MultiplexedDriverPool
+from bot.processes import is_browser_process, kill_tree, process_age, scan_processes
 
-def setup_driver():
+
+# Resources a lean driver never downloads: images, fonts, media and common trackers
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+    "*newrelic.com*", "*nr-data.net*", "*sentry.io*",
+]
+
+# Chromium features a headless reservation bot has no use for
+LEAN_ARGUMENTS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-sync',
+    '--disable-default-apps',
+    '--disable-component-update',
+    '--disable-domain-reliability',
+    '--disable-client-side-phishing-detection',
+    '--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication',
+    '--no-first-run',
+    '--mute-audio',
+    '--blink-settings=imagesEnabled=false',
+]
+
+
+def driver_profile():
+    """
+    Returns:
+        str: "lean" or "full", from the DRIVER_PROFILE environment variable (default: full)
+    """
+    profile = os.getenv('DRIVER_PROFILE', 'full').lower()
+    if profile not in ('lean', 'full'):
+        raise Exception(f"Unknown DRIVER_PROFILE '{profile}'. Use 'lean' or 'full'.")
+    return profile
+
+
+def page_load_baseline():
+    """
+    Full-profile page load cost to measure lean browsers against.
+
+    Environment:
+        PAGE_LOAD_BASELINE_MS: Mean milliseconds per full-profile page load
+        PAGE_LOAD_BASELINE_BYTES: Mean bytes per full-profile page load
+
+    Returns:
+        dict: {"ms": float, "bytes": int}, or None unless both are set
+    """
+    ms = os.getenv('PAGE_LOAD_BASELINE_MS')
+    transferred = os.getenv('PAGE_LOAD_BASELINE_BYTES')
+    if not ms or not transferred:
+        return None
+    return {"ms": float(ms), "bytes": int(transferred)}
+
+
+def setup_driver(profile=None):
     """
     Setup Chrome driver for browser automation.
     Configures headless mode for cloud deployment.
 
+    Args:
+        profile: "full" loads pages normally; "lean" blocks heavy assets and
+                 trackers, uses eager page loads and turns off unneeded
+                 Chromium features (default: DRIVER_PROFILE)
+
     Returns:
         webdriver.Chrome: Configured Chrome driver instance
     """
+    profile = profile or driver_profile()
     options = Options()
 
     # Headless mode for cloud environments
@@ -21,8 +90,15 @@ def setup_driver():
     options.add_argument('--disable-dev-shm-usage')
     options.add_argument('--disable-gpu')
 
-    # Set window size for consistent rendering
-    options.add_argument('--window-size=1920,1080')
+    if profile == 'lean':
+        # Return from get()/refresh() once the DOM is ready instead of after every asset
+        options.page_load_strategy = 'eager'
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_argument('--window-size=1280,800')
+    else:
+        # Set window size for consistent rendering
+        options.add_argument('--window-size=1920,1080')
 
     # Use Chrome binary from environment variable if set (for cloud deployments)
     if os.getenv('CHROME_BIN'):
@@ -31,4 +107,558 @@ def setup_driver():
     # Selenium 4.6+ manages ChromeDriver automatically
     driver = webdriver.Chrome(options=options)
 
+    if profile == 'lean':
+        block_heavy_requests(driver)
+
+    driver.profile = profile
+    pid = driver_pid(driver)
+    if pid:
+        _live_drivers[pid] = driver
     return driver
+
+
+def block_heavy_requests(driver):
+    """
+    Block images, fonts, media and trackers in the driver's current tab.
+
+    Args:
+        driver: Selenium WebDriver instance (or tab handle) to apply the block list to
+    """
+    blocked = LEAN_BLOCKED_URLS + [
+        pattern.strip() for pattern in os.getenv('DRIVER_BLOCKED_URLS', '').split(',') if pattern.strip()
+    ]
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+
+
+# Drivers launched by this process, by chromedriver PID. Entries disappear
+# once a driver object is garbage collected, so a driver dropped without
+# quit() shows up as an untracked chromedriver for the reaper.
+_live_drivers = weakref.WeakValueDictionary()
+
+
+def driver_pid(driver):
+    """
+    Returns:
+        int: PID of the driver's chromedriver process, None if it has none
+    """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+def kill_driver(driver):
+    """
+    Kill a driver's chromedriver and every browser process under it at once.
+
+    Any WebDriver call in flight on this driver fails immediately instead
+    of running to its timeout. The driver object is unusable afterwards;
+    quit() on it only cleans up.
+
+    A tab of a shared browser is closed instead, leaving the other tabs running.
+
+    Returns:
+        int: Number of processes killed
+    """
+    if getattr(driver, "shared", False):
+        driver.kill()
+        return 0
+    pid = driver_pid(driver)
+    if not pid:
+        return 0
+    _live_drivers.pop(pid, None)
+    return kill_tree(pid)
+
+
+# Bytes of the current document plus every subresource it has fetched so far
+TRANSFER_SIZE_SCRIPT = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return entries.reduce(function (total, entry) { return total + (entry.transferSize || 0); }, 0);
+"""
+
+
+def refresh_page(driver):
+    """
+    Reload the current page and record how long it took and how much it transferred.
+
+    The duration is what the bot actually waits for, so eager page loads
+    show up as a shorter refresh. Blocked requests never appear in Resource
+    Timing, so lean drivers report fewer bytes.
+
+    Args:
+        driver: Selenium WebDriver instance
+    """
+    start = time.monotonic()
+    driver.refresh()
+    seconds = time.monotonic() - start
+    try:
+        transferred = driver.execute_script(TRANSFER_SIZE_SCRIPT) or 0
+    except Exception:
+        return
+    record_page_load(getattr(driver, "profile", "full"), seconds, transferred)
+
+
+class CancelGuard:
+    """
+    Tears down a run's browsers the moment its cancel flag is set.
+
+    Cancellation otherwise only takes effect when the bot next checks the
+    flag, which can be after a page load, a 10-second WebDriverWait or a
+    whole login. The guard watches the flag on its own thread and kills the
+    attached browsers, so whatever call is in flight fails right away and
+    the memory and CPU of the browser are released immediately.
+    """
+
+    def __init__(self, cancel_event, poll_interval=0.25):
+        """
+        Args:
+            cancel_event: threading.Event-like flag (None disables the guard)
+            poll_interval: Seconds between checks of a flag that cannot wake waiters
+        """
+        self.cancel_event = cancel_event
+        self.poll_interval = poll_interval
+        self._drivers = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._fired = False
+        if cancel_event is not None:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def attach(self, driver):
+        """Tear this driver down too if the run is cancelled; kills it now if it already was."""
+        with self._lock:
+            if not self._fired:
+                self._drivers.append(driver)
+                return
+        kill_driver(driver)
+
+    def detach(self, driver):
+        """Stop guarding a driver, e.g. once it has been handed back to a pool."""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+
+    def close(self):
+        """Stop watching the flag."""
+        self._closed.set()
+
+    @property
+    def fired(self):
+        """True once the guard has torn the browsers down."""
+        with self._lock:
+            return self._fired
+
+    def _watch(self):
+        while not self._closed.is_set():
+            if self.cancel_event.wait(self.poll_interval):
+                break
+        else:
+            return
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._fired = True
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            kill_driver(driver)
+
+
+class DriverPool:
+    """
+    Pool of pre-launched Chrome drivers.
+
+    Browsers are launched ahead of time so that a reservation does not pay
+    for browser startup. Each driver is leased to one job at a time, reset
+    (cookies and storage cleared) when it is returned, and recycled once it
+    has served too many leases or grown too old.
+    """
+
+    def __init__(self, size=1, max_total=None, max_leases=20, max_age=3600,
+                 lease_timeout=60, factory=setup_driver):
+        """
+        Args:
+            size: Number of idle browsers to keep warm
+            max_total: Maximum number of live browsers (idle + leased), None for no cap
+            max_leases: Recycle a browser after this many leases
+            max_age: Recycle a browser after this many seconds
+            lease_timeout: Seconds to wait for a browser when max_total is reached
+            factory: Callable that launches a new driver
+        """
+        self.size = size
+        self.max_total = max_total
+        self.max_leases = max_leases
+        self.max_age = max_age
+        self.lease_timeout = lease_timeout
+        self.factory = factory
+
+        self._idle = []
+        self._info = {}  # id(driver) -> {"created": float, "leases": int}
+        self._launching = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "lease_waits": 0,
+            "lease_wait_seconds": 0.0,
+            "launched": 0,
+            "recycled": 0,
+            "health_failures": 0,
+        }
+
+    def start(self):
+        """Launch the warm browsers in a background thread."""
+        thread = threading.Thread(target=self._refill, daemon=True)
+        thread.start()
+
+    def acquire(self):
+        """
+        Lease a driver from the pool, launching a new one if none is warm.
+
+        Returns:
+            webdriver.Chrome: A healthy driver leased to the caller
+        """
+        deadline = time.monotonic() + self.lease_timeout
+        waited = False
+        wait_start = time.monotonic()
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise Exception("Driver pool is shut down")
+
+                driver = self._idle.pop() if self._idle else None
+                if driver is None and self._has_capacity():
+                    self._launching += 1
+                    launch = True
+                elif driver is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Exception("Timed out waiting for a browser from the pool")
+                    waited = True
+                    self._cond.wait(remaining)
+                    continue
+                else:
+                    launch = False
+
+            if waited:
+                self._record_wait(time.monotonic() - wait_start)
+                waited = False
+
+            if launch:
+                driver = self._launch()
+                self._record("misses")
+                break
+
+            if self._is_healthy(driver):
+                self._record("hits")
+                break
+
+            self._record("health_failures")
+            self._discard(driver)
+
+        with self._cond:
+            self._info[id(driver)]["leases"] += 1
+
+        # Top the pool back up while the caller uses this browser
+        self.start()
+        return driver
+
+    def release(self, driver, discard=False):
+        """
+        Return a leased driver to the pool.
+
+        Args:
+            driver: Driver previously returned by acquire()
+            discard: Quit the browser instead of reusing it
+        """
+        if driver is None:
+            return
+
+        if discard or self._closed or self._is_expired(driver) or not self._reset(driver):
+            self._discard(driver, recycled=not discard)
+            self.start()
+            return
+
+        with self._cond:
+            if len(self._idle) >= self.size:
+                surplus = True
+            else:
+                self._idle.append(driver)
+                surplus = False
+            self._cond.notify()
+
+        if surplus:
+            self._discard(driver)
+
+    @contextmanager
+    def lease(self):
+        """Context manager that acquires a driver and releases it on exit."""
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Pool counters plus current idle and live browser counts
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["live"] = len(self._info)
+        return stats
+
+    def shutdown(self):
+        """Quit every idle browser and stop handing out new ones."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+    def _has_capacity(self):
+        if self.max_total is None:
+            return True
+        return len(self._info) + self._launching < self.max_total
+
+    def _refill(self):
+        while True:
+            with self._cond:
+                missing = self.size - len(self._idle) - self._launching
+                if self._closed or missing <= 0 or not self._has_capacity():
+                    return
+                self._launching += 1
+
+            try:
+                driver = self._launch()
+            except Exception as e:
+                print(f"[ERROR] Failed to pre-launch browser: {e}")
+                return
+
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    def _launch(self):
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._cond:
+                self._launching -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._launching -= 1
+            self._info[id(driver)] = {"created": time.monotonic(), "leases": 0}
+            self._stats["launched"] += 1
+        return driver
+
+    def _is_expired(self, driver):
+        info = self._info.get(id(driver))
+        if info is None:
+            return True
+        too_old = self.max_age and time.monotonic() - info["created"] > self.max_age
+        too_used = self.max_leases and info["leases"] >= self.max_leases
+        return bool(too_old or too_used)
+
+    def _is_healthy(self, driver):
+        if self._is_expired(driver):
+            return False
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def _reset(self, driver):
+        """Clear cookies, storage and extra tabs so the next job starts clean."""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            origin = driver.execute_script("return window.location.origin;")
+            driver.delete_all_cookies()
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            if origin and origin.startswith("http"):
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                    "origin": origin,
+                    "storageTypes": "all",
+                })
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver, recycled=False):
+        with self._cond:
+            self._info.pop(id(driver), None)
+            if recycled:
+                self._stats["recycled"] += 1
+            self._cond.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _record(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _record_wait(self, seconds):
+        with self._cond:
+            self._stats["lease_waits"] += 1
+            self._stats["lease_wait_seconds"] += seconds
+
+
+class OrphanReaper:
+    """
+    Kills browser processes that no driver owns any more.
+
+    Two kinds of leak are found: chromedriver processes started by this
+    worker whose driver object was dropped without quit(), and Chrome or
+    chromedriver processes re-parented to PID 1 after the worker or the
+    chromedriver that launched them died. Only automation browsers are
+    touched (chromedriver itself, or Chrome started with --enable-automation),
+    and only once they are older than the grace period, so a driver that is
+    still being launched is never mistaken for a leak.
+    """
+
+    def __init__(self, interval=60, grace=120):
+        """
+        Args:
+            interval: Seconds between scans
+            grace: Minimum age in seconds before a process can be reaped
+        """
+        self.interval = interval
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._started = False
+        self._stats = {"scans": 0, "reaped": 0}
+
+    def start(self):
+        """Start scanning in a background thread (once per process)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.reap_once()
+                except Exception as e:
+                    print(f"[ERROR] Orphan reaper scan failed: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def reap_once(self):
+        """
+        Scan for leaked browser processes and kill them.
+
+        Returns:
+            int: Number of processes killed
+        """
+        table = scan_processes()
+        now = time.time()
+        me = os.getpid()
+        tracked = set(_live_drivers.keys())
+        killed = 0
+        for pid, info in table.items():
+            if not is_browser_process(info) or process_age(info, now) < self.grace:
+                continue
+            is_driver = "chromedriver" in info["name"]
+            leaked = is_driver and info["ppid"] == me and pid not in tracked
+            orphaned = info["ppid"] == 1 and (is_driver or "--enable-automation" in info["cmdline"])
+            if leaked or orphaned:
+                count = kill_tree(pid, table)
+                if count:
+                    print(f"[INFO] Reaped {count} leaked browser process(es) under PID {pid}")
+                    BROWSER_PROCESSES_REAPED_TOTAL.inc(count)
+                    killed += count
+        with self._lock:
+            self._stats["scans"] += 1
+            self._stats["reaped"] += killed
+        return killed
+
+    def stats(self):
+        """
+        Returns:
+            dict: Scans run and processes reaped by this worker
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def get_orphan_reaper():
+    """
+    Return the process-wide orphan reaper, creating it from environment settings.
+
+    Environment:
+        REAPER_INTERVAL: Seconds between scans for leaked browsers (default: 60)
+        REAPER_GRACE: Minimum age in seconds of a process before it can be reaped (default: 120)
+
+    Returns:
+        OrphanReaper: Shared reaper instance
+    """
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = OrphanReaper(
+                interval=float(os.getenv('REAPER_INTERVAL', '60')),
+                grace=float(os.getenv('REAPER_GRACE', '120')),
+            )
+        return _reaper
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """
+    Return the process-wide driver pool, creating it from environment settings.
+
+    Environment:
+        DRIVER_POOL_SIZE: Warm browsers to keep ready (default: 1)
+        DRIVER_POOL_MAX: Cap on live browsers (default: no cap)
+        DRIVER_MAX_LEASES: Leases before a browser is recycled (default: 20)
+        DRIVER_MAX_AGE: Seconds before a browser is recycled (default: 3600)
+        DRIVER_TABS_PER_BROWSER: Jobs sharing one browser process in isolated tabs;
+                                 1 gives every job its own browser (default: 1)
+
+    Returns:
+        DriverPool or MultiplexedDriverPool: Shared pool instance
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            max_total = os.getenv('DRIVER_POOL_MAX')
+            tabs_per_browser = int(os.getenv('DRIVER_TABS_PER_BROWSER', '1'))
+            if tabs_per_browser > 1:
+                _pool = MultiplexedDriverPool(
+                    setup_driver,
+                    tabs_per_browser=tabs_per_browser,
+                    max_browsers=int(max_total) if max_total else None,
+                    tab_setup=block_heavy_requests if driver_profile() == 'lean' else None,
+                )
+                return _pool
+            _pool = DriverPool(
+                size=int(os.getenv('DRIVER_POOL_SIZE', '1')),
+                max_total=int(max_total) if max_total else None,
+                max_leases=int(os.getenv('DRIVER_MAX_LEASES', '20')),
+                max_age=float(os.getenv('DRIVER_MAX_AGE', '3600')),
+            )
+        return _pool
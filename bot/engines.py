@@ -0,0 +1,75 @@
+import abc
+
+
+class EngineFallback(Exception):
+    """Raised by an engine on a page it cannot handle; the reservation continues in a browser."""
+
+
+def plate_matches(license_plate, option_text):
+    """Fuzzy match: the entered plate appears in the option text, ignoring case and spaces."""
+    return license_plate.strip().lower().replace(" ", "") in option_text.strip().lower().replace(" ", "")
+
+
+class ReservationEngine(abc.ABC):
+    """
+    The steps of a reservation, independent of how the site is driven.
+
+    run_reservation calls them in this order: login, select_plate,
+    open_calendar (or resume_calendar for an interrupted run),
+    wait_for_date, add_to_cart and checkout. The browser engine clicks
+    through the pages in Chrome; the HTTP engine submits the same forms
+    without one and raises EngineFallback whenever the site does something
+    it cannot follow, so the run can be finished in a browser instead.
+    Steps after the date has been put in the cart never fall back, and
+    neither does a rejected sign-in.
+    """
+
+    # "browser" or "http"; recorded in logs and metrics
+    name = None
+
+    @abc.abstractmethod
+    def login(self, username, password, log):
+        """Sign in, reusing a cached session for this account when the engine has one."""
+
+    @abc.abstractmethod
+    def select_plate(self, license_plate, log):
+        """
+        Returns:
+            str: The plate option text matched by fuzzy matching
+        """
+
+    @abc.abstractmethod
+    def open_calendar(self, log):
+        """Go from the plate page to the calendar view."""
+
+    @abc.abstractmethod
+    def resume_calendar(self, calendar_url, log):
+        """
+        Returns:
+            bool: True if the calendar recorded by an interrupted run loaded again
+        """
+
+    @property
+    @abc.abstractmethod
+    def calendar_url(self):
+        """URL of the calendar view currently open."""
+
+    @abc.abstractmethod
+    def wait_for_date(self, date_base, log, cancel_event=None, watcher_registry=None, scheduler=None):
+        """Block until the date opens."""
+
+    @abc.abstractmethod
+    def add_to_cart(self, date_base, log):
+        """Put the open date in the cart and bring up the checkout form."""
+
+    @abc.abstractmethod
+    def checkout(self, matched_plate, log, before_submit=None):
+        """
+        Select the plate on the checkout form and submit it.
+
+        Args:
+            matched_plate: Plate option text returned by select_plate
+            log: Logging callback function
+            before_submit: Optional callable checked right before submitting;
+                           returning False aborts the checkout
+        """
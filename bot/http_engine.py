@@ -0,0 +1,442 @@
+import os
+import threading
+from html.parser import HTMLParser
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import urlencode, urljoin, urlparse
+import urllib3
+
+from bot.engines import EngineFallback, ReservationEngine, plate_matches
+from bot.http_poller import HttpAvailabilityPoller
+
+# Sent instead of urllib3's default so the site serves the same pages a browser gets
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class PageParser(HTMLParser):
+    """
+    Collects what the HTTP engine acts on: forms with their fields, select
+    options, links, elements carrying a data-href and calendar cells.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self.selects = {}  # id or name -> [{"value", "text", "selected"}], forms included
+        self.links = []  # [{"href", "text", "class"}]
+        self.actions = []  # Elements with a data-href: [{"href", "text", "class"}]
+        self.cells = {}  # data-date -> {"class", "href"}
+        self._form = None
+        self._select = None
+        self._open = []  # (tag, record) of elements whose text is being collected
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+
+        if tag == "form":
+            self._form = {
+                "action": attrs.get("action", ""),
+                "method": (attrs.get("method") or "get").upper(),
+                "fields": {},
+                "selects": {},
+                "inputs": [],
+                "buttons": [],
+            }
+            self.forms.append(self._form)
+        elif tag == "input" and attrs.get("name"):
+            kind = attrs.get("type", "text").lower()
+            if self._form is not None:
+                self._form["inputs"].append(dict(attrs, type=kind))
+                if kind in ("submit", "button", "image", "reset"):
+                    self._form["buttons"].append({"id": attrs.get("id", ""), "name": attrs["name"],
+                                                  "value": attrs.get("value", ""), "text": attrs.get("value", "")})
+                elif kind not in ("checkbox", "radio") or "checked" in attrs:
+                    self._form["fields"][attrs["name"]] = attrs.get("value", "")
+        elif tag == "select":
+            self._select = {"name": attrs.get("name", ""), "options": []}
+            for key in {attrs.get("id"), attrs.get("name")} - {None, ""}:
+                self.selects[key] = self._select["options"]
+                if self._form is not None:
+                    self._form["selects"][key] = self._select
+        elif tag == "option" and self._select is not None:
+            self._close("option")
+            option = {"value": attrs.get("value"), "text": "", "selected": "selected" in attrs}
+            self._select["options"].append(option)
+            self._open.append(("option", option))
+        elif tag == "button":
+            button = {"id": attrs.get("id", ""), "name": attrs.get("name", ""),
+                      "value": attrs.get("value", ""), "text": "", "type": attrs.get("type", "submit").lower()}
+            if self._form is not None:
+                self._form["buttons"].append(button)
+            self._open.append(("button", button))
+
+        if tag == "a" and attrs.get("href"):
+            link = {"href": attrs["href"], "text": "", "class": attrs.get("class", "")}
+            self.links.append(link)
+            self._open.append(("a", link))
+            # A day whose link is nested inside its cell
+            for _, record in self._open:
+                if record.get("cell") and not record["href"]:
+                    record["href"] = attrs["href"]
+        if attrs.get("data-date"):
+            cell = {"class": attrs.get("class", ""), "href": attrs.get("data-href", ""), "cell": True}
+            self.cells[attrs["data-date"]] = cell
+            self._open.append((tag, cell))
+        elif attrs.get("data-href"):
+            action = {"href": attrs["data-href"], "text": "", "class": attrs.get("class", "")}
+            self.actions.append(action)
+            self._open.append((tag, action))
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "select":
+            self._close("option")
+            self._select = None
+        self._close(tag)
+
+    def handle_data(self, data):
+        for _, record in self._open:
+            if "text" in record:
+                record["text"] += data
+
+    def _close(self, tag):
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index][0] == tag:
+                _, record = self._open.pop(index)
+                if "text" in record:
+                    record["text"] = " ".join(record["text"].split())
+                return
+
+
+def parse_page(html):
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+class HttpEngine(ReservationEngine):
+    """
+    Runs a reservation without a browser, over one pooled HTTP session.
+
+    Submits the same login, plate, calendar and checkout forms a browser
+    would, keeping the session cookies itself, so a run costs a handful of
+    small requests instead of a Chromium process. Whenever a page is not
+    the plain HTML form or link it expects (a script-driven step, an extra
+    challenge, a layout change) it raises EngineFallback, and the run
+    carries on in a browser. It never falls back once 'Reserve Car Parking'
+    has been requested, so the date cannot be added to the cart or booked
+    twice, nor when the site rejects the credentials.
+    """
+
+    name = "http"
+
+    def __init__(self, login_url, http=None, session_cache=None, timeout=15):
+        """
+        Args:
+            login_url: Login page of the site
+            http: Optional urllib3.PoolManager shared with other runs
+            session_cache: Optional SessionCache shared with the browser engine
+            timeout: Seconds before a request is abandoned
+        """
+        self.login_url = login_url
+        self.http = http or urllib3.PoolManager(maxsize=2)
+        self.session_cache = session_cache
+        self.timeout = timeout
+        self.cookies = {}
+        self.url = None
+        self.status = None
+        self.page = None
+        self._calendar_url = None
+
+    def login(self, username, password, log):
+        if self.session_cache:
+            cached = self.session_cache.get(username, password)
+            if cached and self._restore(cached, log):
+                log("Reused cached session, skipping login", "info")
+                return
+            if cached:
+                log("Cached session expired, signing in again", "info")
+                self.session_cache.invalidate(username)
+
+        log("Signing in over HTTP...", "info")
+        self._get(self.login_url)
+        form = self._login_form()
+        if form is None:
+            raise EngineFallback("Login form not found in the page")
+
+        fields = dict(form["fields"])
+        user_input = next(
+            (i for i in form["inputs"] if i["type"] in ("text", "email") and i.get("placeholder") == "Username"),
+            next((i for i in form["inputs"] if i["type"] in ("text", "email")), None),
+        )
+        password_input = next(i for i in form["inputs"] if i["type"] == "password")
+        if user_input is None:
+            raise EngineFallback("Username field not found in the login form")
+        fields[user_input["name"]] = username
+        fields[password_input["name"]] = password
+        self._submit(form, fields)
+
+        if self._login_form() is not None:
+            # The site showed the login form again: the credentials were rejected
+            raise Exception("Failed to sign in: the site rejected the username or password")
+        if self.status >= 400:
+            # Could be a check only a browser passes; let the browser tell
+            raise EngineFallback(f"Sign-in returned HTTP {self.status}")
+        log("Signed in successfully", "info")
+
+        if self.session_cache:
+            self.session_cache.put(username, password, self.browser_cookies(), self.url)
+
+    def select_plate(self, license_plate, log):
+        if not license_plate.strip():
+            raise Exception("Failed to select license plate: License plate cannot be empty")
+        options = self.page.selects.get("plate")
+        if not options:
+            raise EngineFallback("Plate dropdown not found in the page")
+        for option in options:
+            if plate_matches(license_plate, option["text"]):
+                log(f"Selected license plate: {option['text']}", "info")
+                return option["text"]
+        raise Exception("Failed to select license plate: No matching license plate found in dropdown")
+
+    def open_calendar(self, log):
+        link = next((link for link in self.page.links if link["text"] == "Add More Days"), None)
+        if link is None:
+            raise EngineFallback("'Add More Days' link not found in the page")
+        self._get(link["href"])
+        if not self.page.cells:
+            raise EngineFallback("Calendar has no days readable without a browser")
+        self._calendar_url = self.url
+        log("Navigated to calendar view", "info")
+
+    def resume_calendar(self, calendar_url, log):
+        try:
+            self._get(calendar_url)
+        except EngineFallback:
+            return False
+        if not self.page.cells:
+            log("Could not reopen the calendar directly, selecting the plate again...", "info")
+            return False
+        self._calendar_url = self.url
+        log("Resumed at the calendar view", "info")
+        return True
+
+    @property
+    def calendar_url(self):
+        return self._calendar_url
+
+    def poller(self):
+        """
+        Returns:
+            HttpAvailabilityPoller: Poller for the calendar on this session's connections
+        """
+        return HttpAvailabilityPoller(
+            self._calendar_url, self.browser_cookies(), user_agent=USER_AGENT, timeout=self.timeout, http=self.http
+        )
+
+    def wait_for_date(self, date_base, log, cancel_event=None, watcher_registry=None, scheduler=None):
+        # Imported here because reservation_bot builds engines and imports this module
+        from bot.reservation_bot import wait_over_http
+
+        if not wait_over_http(None, date_base, log, cancel_event=cancel_event, watcher_registry=watcher_registry,
+                              scheduler=scheduler, poller=self.poller()):
+            raise EngineFallback("Calendar not readable over HTTP")
+
+    def add_to_cart(self, date_base, log):
+        self._get(self._calendar_url)
+        cell = next((cell for date, cell in self.page.cells.items() if date.startswith(date_base)), None)
+        if cell is None or "fc-unavailable" in cell["class"].split():
+            raise EngineFallback(f"Date {date_base} is no longer open on the calendar")
+        if not cell["href"]:
+            raise EngineFallback("Calendar day has no link to follow")
+        self._get(cell["href"])
+
+        reserve = next(
+            (element for element in self.page.actions + self.page.links
+             if "add2cart" in element["class"].split() and "Reserve Car Parking" in element["text"]),
+            None,
+        )
+        form = None
+        if reserve is None:
+            form = next((f for f in self.page.forms
+                         if any("Reserve Car Parking" in b["text"] for b in f["buttons"])), None)
+            if form is None:
+                raise EngineFallback("'Reserve Car Parking' not found in the page")
+
+        # From here on the date may be in the cart, and a browser would add it again, so errors are final
+        try:
+            if reserve is not None:
+                self._get(reserve["href"])
+            else:
+                self._submit(form, form["fields"])
+        except Exception as e:
+            raise Exception(f"'Reserve Car Parking' request failed: {e}")
+        log("Clicked 'Reserve Car Parking' button", "info")
+
+        if self._checkout_form() is None:
+            raise Exception("Checkout form did not load after 'Reserve Car Parking'")
+
+    def checkout(self, matched_plate, log, before_submit=None):
+        # add_to_cart has already requested Reserve, so a browser would add the date again: errors are final
+        form = self._checkout_form()
+        if form is None:
+            raise Exception("Checkout form not found in the page")
+        select = form["selects"].get("plate")
+        option = next((o for o in select["options"] if o["text"] == matched_plate), None) if select else None
+        if option is None or not select["name"]:
+            raise Exception("Failed to select license plate in checkout: plate not selectable in the checkout form")
+
+        fields = dict(form["fields"])
+        fields[select["name"]] = option["value"] if option["value"] is not None else option["text"]
+        button = next(b for b in form["buttons"] if b["id"] == "btnCheckout")
+        if button["name"]:
+            fields[button["name"]] = button["value"]
+        log("Selected license plate in checkout", "info")
+
+        if before_submit and not before_submit():
+            raise Exception("Checkout aborted before submitting.")
+
+        # From here on the site may have taken the booking, so errors are final
+        try:
+            self._submit(form, fields)
+        except Exception as e:
+            raise Exception(f"Checkout request failed: {e}")
+        log("Clicked 'Continue' button", "info")
+        if self.status >= 400:
+            raise Exception(f"Checkout failed with HTTP {self.status}")
+        if self._checkout_form() is not None:
+            raise Exception("Checkout form came back after submitting; the reservation may not have gone through")
+        log("Checkout submitted, reservation confirmed.", "info")
+
+    def browser_cookies(self):
+        """
+        Returns:
+            list: Session cookies in the format of driver.get_cookies(), for the
+                  session cache and for handing the session to a browser
+        """
+        parts = urlparse(self.login_url)
+        return [
+            {"name": name, "value": value, "domain": parts.hostname, "path": "/",
+             "secure": parts.scheme == "https"}
+            for name, value in self.cookies.items()
+        ]
+
+    def _restore(self, cached, log):
+        log("Restoring cached session...", "info")
+        self.cookies = {cookie["name"]: cookie["value"] for cookie in cached["cookies"]}
+        try:
+            self._get(cached["landing_url"])
+        except EngineFallback:
+            return False
+        # A live session lands on the plate page instead of bouncing back to login
+        return bool(self.page.selects.get("plate")) and "/login" not in self.url
+
+    def _login_form(self):
+        return next((f for f in self.page.forms if any(i["type"] == "password" for i in f["inputs"])), None)
+
+    def _checkout_form(self):
+        return next((f for f in self.page.forms if any(b["id"] == "btnCheckout" for b in f["buttons"])), None)
+
+    def _get(self, url):
+        try:
+            self._request("GET", urljoin(self.url or self.login_url, url))
+        except EngineFallback:
+            raise
+        except Exception as e:
+            raise EngineFallback(f"Request failed ({e})")
+        if self.status >= 400:
+            raise EngineFallback(f"Page returned HTTP {self.status}")
+
+    def _submit(self, form, fields):
+        action = urljoin(self.url, form["action"] or self.url)
+        if form["method"] == "POST":
+            self._request("POST", action, fields)
+        else:
+            self._request("GET", f"{action.split('?')[0]}?{urlencode(fields)}")
+
+    def _request(self, method, url, fields=None):
+        # Redirects are followed here rather than by urllib3 so cookies set on every hop are kept
+        for _ in range(10):
+            headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"}
+            if self.cookies:
+                headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+            if self.url:
+                headers["Referer"] = self.url
+            body = None
+            if fields is not None:
+                body = urlencode(fields)
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            response = self.http.request(
+                method, url, body=body, headers=headers, timeout=self.timeout, retries=False, redirect=False
+            )
+            self._store_cookies(response.headers.getlist("Set-Cookie"))
+
+            if response.status in REDIRECT_STATUSES and response.headers.get("Location"):
+                url = urljoin(url, response.headers["Location"])
+                if response.status in (301, 302, 303):
+                    method, fields = "GET", None
+                continue
+
+            self.url = url
+            self.status = response.status
+            self.page = parse_page(response.data.decode("utf-8", errors="replace"))
+            return
+        raise EngineFallback("Too many redirects")
+
+    def _store_cookies(self, headers):
+        for header in headers:
+            cookie = SimpleCookie()
+            try:
+                cookie.load(header)
+            except CookieError:
+                continue
+            for name, morsel in cookie.items():
+                if morsel["max-age"] == "0" or not morsel.value:
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+
+
+_http = None
+_http_lock = threading.Lock()
+
+
+def get_http_pool():
+    """
+    Return the process-wide connection pool used by browserless reservations.
+
+    Environment:
+        HTTP_POOL_SIZE: Connections kept open to the site (default: 10)
+
+    Returns:
+        urllib3.PoolManager: Shared pool
+    """
+    global _http
+    with _http_lock:
+        if _http is None:
+            _http = urllib3.PoolManager(maxsize=int(os.getenv('HTTP_POOL_SIZE', '10')))
+        return _http
+
+
+def get_reservation_engine():
+    """
+    Engine that runs reservations, from environment settings.
+
+    Environment:
+        RESERVATION_ENGINE: "browser" to drive Chrome throughout, or "http" to run
+                            over plain HTTP and switch to Chrome only when a page
+                            needs it (default: browser)
+
+    Returns:
+        str: "browser" or "http"
+    """
+    engine = os.getenv('RESERVATION_ENGINE', 'browser').lower()
+    if engine not in ('browser', 'http'):
+        raise Exception(f"Unknown RESERVATION_ENGINE '{engine}'. Use 'browser' or 'http'.")
+    return engine
@@ -0,0 +1,119 @@
+from html.parser import HTMLParser
+import urllib3
+
+
+class CalendarParser(HTMLParser):
+    """Collects the class attribute of every element carrying a data-date attribute."""
+
+    def __init__(self):
+        super().__init__()
+        self.days = {}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("data-date"):
+            self.days[attrs["data-date"]] = attrs.get("class") or ""
+
+
+def parse_calendar(html):
+    """
+    Extract calendar cells from a page.
+
+    Args:
+        html: Calendar page markup
+
+    Returns:
+        dict: {data-date value: class string}
+    """
+    parser = CalendarParser()
+    parser.feed(html)
+    parser.close()
+    return parser.days
+
+
+class HttpAvailabilityPoller:
+    """
+    Checks calendar availability over plain HTTP instead of a browser refresh.
+
+    The poller reuses the signed-in cookies of a browser session and keeps
+    its connection to the site open between polls, so a long watch costs a
+    single small request per check.
+    """
+
+    def __init__(self, url, cookies, user_agent=None, timeout=10, http=None):
+        """
+        Args:
+            url: Calendar page URL
+            cookies: List of cookie dicts from driver.get_cookies()
+            user_agent: User-Agent header to send, normally the browser's own
+            timeout: Seconds before a request is abandoned
+            http: Optional urllib3.PoolManager to share connections with other pollers
+        """
+        self.url = url
+        self.timeout = timeout
+        self.http = http or urllib3.PoolManager(maxsize=2)
+        self.headers = {
+            "Cookie": "; ".join(f"{c['name']}={c['value']}" for c in cookies),
+            "Accept": "text/html,application/xhtml+xml",
+        }
+        if user_agent:
+            self.headers["User-Agent"] = user_agent
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """
+        Build a poller for the calendar page the browser is currently showing.
+
+        Args:
+            driver: Selenium WebDriver instance parked on the calendar view
+
+        Returns:
+            HttpAvailabilityPoller: Poller sharing the browser's session
+        """
+        user_agent = driver.execute_script("return navigator.userAgent;")
+        return cls(driver.current_url, driver.get_cookies(), user_agent=user_agent, **kwargs)
+
+    def fetch(self):
+        """
+        Fetch and parse the calendar page.
+
+        Returns:
+            dict: {data-date value: class string}; empty if the page has no calendar cells
+        """
+        response = self.http.request(
+            "GET", self.url, headers=self.headers, timeout=self.timeout, retries=False
+        )
+        if response.status != 200:
+            raise Exception(f"Calendar request failed with HTTP {response.status}")
+        return parse_calendar(response.data.decode("utf-8", errors="replace"))
+
+    def check_many(self, date_bases):
+        """
+        Check several dates from a single calendar fetch.
+
+        Args:
+            date_bases: Date strings in YYYY-MM-DD format
+
+        Returns:
+            dict: {date_base: True/False/None} with the same meaning as check()
+        """
+        days = self.fetch()
+        states = {date_base: None for date_base in date_bases}
+        for data_date, classes in days.items():
+            for date_base in date_bases:
+                if states[date_base] is None and data_date.startswith(date_base):
+                    states[date_base] = "fc-unavailable" not in classes.split()
+        return states
+
+    def check(self, date_base):
+        """
+        Check whether a date is open.
+
+        Args:
+            date_base: Date string in YYYY-MM-DD format
+
+        Returns:
+            bool: True if available, False if unavailable,
+                  None if the date is not present in the response
+        """
+        return self.check_many([date_base])[date_base]
@@ -0,0 +1,288 @@
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+
+class AdmissionError(Exception):
+    """Raised when the job queue is full and a new job cannot be accepted."""
+
+
+def available_memory_mb():
+    """
+    Memory this container can still use, honouring cgroup limits.
+
+    Returns:
+        float: Available megabytes, or None if it cannot be determined
+    """
+    available = None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        pass
+
+    # cgroup v2, then v1
+    for limit_path, usage_path in (
+        ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+        ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes'),
+    ):
+        try:
+            with open(limit_path) as f:
+                limit = f.read().strip()
+            with open(usage_path) as f:
+                usage = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if limit.isdigit() and int(limit) < 1 << 60:
+            cgroup_available = (int(limit) - usage) / (1024 * 1024)
+            available = cgroup_available if available is None else min(available, cgroup_available)
+        break
+
+    return available
+
+
+def memory_based_concurrency(job_memory_mb, reserve_mb=150, workers=1):
+    """
+    Number of browser jobs that fit in the memory left for this worker.
+
+    Every worker process sees the same free memory, so each takes an even
+    share of it.
+
+    Args:
+        job_memory_mb: Estimated memory per running job (browser + driver)
+        reserve_mb: Memory kept free for the web worker itself
+        workers: Worker processes sharing the container
+
+    Returns:
+        int: At least 1
+    """
+    available = available_memory_mb()
+    if available is None:
+        return 1
+    return max(1, int((available / max(workers, 1) - reserve_mb) // job_memory_mb))
+
+
+class Job:
+    """A queued or running reservation job."""
+
+    def __init__(self, job_id, func, priority, seq, on_update, slots=1):
+        self.job_id = job_id
+        self.func = func
+        self.priority = priority
+        self.slots = slots
+        self.seq = seq
+        self.on_update = on_update
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class JobScheduler:
+    """
+    Bounded job runner with a priority queue and admission control.
+
+    Running jobs hold at most max_concurrent slots, one per browser they
+    drive, and each runs on its own thread. A job needing more slots than
+    max_concurrent runs once nothing else is running. Extra jobs wait in a
+    priority queue (lower value first, FIFO within a priority) and are told
+    their position and estimated start time whenever the queue moves. Jobs
+    beyond max_queue are rejected.
+    """
+
+    def __init__(self, max_concurrent=1, max_queue=20, avg_job_seconds=900):
+        """
+        Args:
+            max_concurrent: Slots (browsers) running jobs may hold at the same time
+            max_queue: Jobs allowed to wait; further submissions are rejected
+            avg_job_seconds: Initial estimate of job duration for start-time estimates
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.avg_job_seconds = avg_job_seconds
+
+        self._queue = []
+        self._running = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def submit(self, job_id, func, priority=0, on_update=None, slots=1):
+        """
+        Queue a job, starting it right away if a slot is free.
+
+        Args:
+            job_id: Unique job ID (the reservation session ID)
+            func: Callable run on a worker thread
+            priority: Lower runs first (default: 0)
+            on_update: Optional callback(message, status) for queue position updates
+            slots: Browsers the job drives at once (default: 1)
+
+        Returns:
+            int: 0 if the job started immediately, otherwise its queue position
+
+        Raises:
+            AdmissionError: If the queue is full
+        """
+        with self._lock:
+            if self._slots_in_use() >= self.max_concurrent and len(self._queue) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise AdmissionError("Server is busy. Please try again in a few minutes.")
+            self._stats["submitted"] += 1
+            heapq.heappush(self._queue, Job(job_id, func, priority, next(self._seq), on_update, slots))
+
+        self._dispatch()
+        return self.position(job_id)
+
+    def cancel(self, job_id):
+        """
+        Remove a job that has not started yet.
+
+        Returns:
+            bool: True if the job was still queued
+        """
+        with self._lock:
+            for job in self._queue:
+                if job.job_id == job_id:
+                    self._queue.remove(job)
+                    heapq.heapify(self._queue)
+                    break
+            else:
+                return False
+        self._announce_positions()
+        return True
+
+    def position(self, job_id):
+        """
+        Returns:
+            int: 1-based queue position, 0 if running or unknown
+        """
+        with self._lock:
+            for index, job in enumerate(sorted(self._queue)):
+                if job.job_id == job_id:
+                    return index + 1
+        return 0
+
+    def estimated_wait(self, position):
+        """
+        Args:
+            position: 1-based queue position
+
+        Returns:
+            float: Seconds until a job at this position is expected to start
+        """
+        rounds = math.ceil(position / max(self.max_concurrent, 1))
+        return rounds * self.avg_job_seconds
+
+    def stats(self):
+        """
+        Returns:
+            dict: Running and queued counts, limits and lifetime counters
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "running": len(self._running),
+                "slots_in_use": self._slots_in_use(),
+                "queued": len(self._queue),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "avg_job_seconds": round(self.avg_job_seconds),
+            })
+        return stats
+
+    def _slots_in_use(self):
+        return sum(job.slots for job in self._running.values())
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while self._queue:
+                # The head of the queue waits for enough free slots; an oversized job runs alone
+                in_use = self._slots_in_use()
+                if in_use and in_use + self._queue[0].slots > self.max_concurrent:
+                    break
+                job = heapq.heappop(self._queue)
+                self._running[job.job_id] = job
+                started.append(job)
+
+        for job in started:
+            thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+            thread.start()
+
+        self._announce_positions()
+
+    def _run(self, job):
+        start = time.monotonic()
+        failed = False
+        try:
+            job.func()
+        except Exception as e:
+            failed = True
+            print(f"[ERROR] Job {job.job_id} crashed: {e}")
+        finally:
+            duration = time.monotonic() - start
+            with self._lock:
+                self._running.pop(job.job_id, None)
+                self._stats["failed" if failed else "completed"] += 1
+                # Exponential moving average keeps estimates current
+                self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * duration
+            self._dispatch()
+
+    def _announce_positions(self):
+        with self._lock:
+            queued = sorted(self._queue)
+        for index, job in enumerate(queued):
+            if not job.on_update:
+                continue
+            position = index + 1
+            wait_minutes = max(1, round(self.estimated_wait(position) / 60))
+            try:
+                job.on_update(
+                    f"Queued: position {position}, estimated start in ~{wait_minutes} min",
+                    "queued",
+                )
+            except Exception:
+                pass
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler():
+    """
+    Return the process-wide job scheduler, creating it from environment settings.
+
+    Environment:
+        MAX_CONCURRENT_JOBS: Fixed cap on running jobs (default: derived from available memory)
+        JOB_MEMORY_MB: Estimated memory per running job (default: 400, or 120 when
+                       DRIVER_TABS_PER_BROWSER shares browsers between jobs)
+        WEB_CONCURRENCY: gunicorn worker processes splitting the memory budget (default: 1)
+        JOB_QUEUE_LIMIT: Jobs allowed to wait before new ones are rejected (default: 20)
+        JOB_AVG_SECONDS: Initial job duration estimate for queue ETAs (default: 900)
+
+    Returns:
+        JobScheduler: Shared scheduler instance
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            max_concurrent = os.getenv('MAX_CONCURRENT_JOBS')
+            # A job in a shared browser costs a tab rather than a whole Chromium
+            shared = int(os.getenv('DRIVER_TABS_PER_BROWSER', '1')) > 1
+            _scheduler = JobScheduler(
+                max_concurrent=int(max_concurrent) if max_concurrent else memory_based_concurrency(
+                    float(os.getenv('JOB_MEMORY_MB', '120' if shared else '400')),
+                    workers=int(os.getenv('WEB_CONCURRENCY', '1')),
+                ),
+                max_queue=int(os.getenv('JOB_QUEUE_LIMIT', '20')),
+                avg_job_seconds=float(os.getenv('JOB_AVG_SECONDS', '900')),
+            )
+        return _scheduler
@@ -0,0 +1,285 @@
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from cryptography.fernet import Fernet, InvalidToken
+
+from bot.keys import load_or_create_key
+
+
+def worker_identity():
+    """
+    Returns:
+        str: ID unique to this worker process, used as the owner of its jobs
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def owner_is_dead(owner):
+    """
+    Returns:
+        bool: True if the owner ran on this host and its process no longer exists
+    """
+    host, _, rest = owner.partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+class JobStore:
+    """
+    Durable record of reservation jobs in a SQLite file.
+
+    Each job's parameters, current phase and progress (matched plate,
+    calendar URL, dates already booked) are written as the job moves along.
+    Running workers refresh a heartbeat on the jobs they own; a job whose
+    heartbeat goes stale (deploy, crash, instance put to sleep) is claimed
+    by the next worker that checks and resumed from its recorded phase.
+
+    Passwords are kept Fernet-encrypted only while a job is active and are
+    erased as soon as it finishes.
+    """
+
+    def __init__(self, path, key=None, key_path=None):
+        """
+        Args:
+            path: SQLite database file
+            key: Fernet key (bytes or str); if omitted, a key generated once and kept
+                 in key_path is used, so a restarted worker can still decrypt the
+                 passwords of the jobs it resumes
+            key_path: File holding the generated key (default: <path>.key); keep it
+                      apart from the database so a copy of one alone reveals nothing
+        """
+        self.path = path
+        self._fernet = Fernet(key or load_or_create_key(key_path or f"{path}.key"))
+        self._stats = {"resumed": 0}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " params TEXT NOT NULL,"
+                " secret BLOB,"
+                " phase TEXT NOT NULL,"
+                " state TEXT NOT NULL,"
+                " active INTEGER NOT NULL DEFAULT 1,"
+                " owner TEXT,"
+                " heartbeat REAL NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_active ON jobs (active, heartbeat)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def create(self, job_id, params, password, owner):
+        """
+        Record a new job.
+
+        Args:
+            job_id: Unique job ID (the reservation session ID)
+            params: JSON-serializable job parameters, without the password
+            password: Account password, stored encrypted until the job finishes
+            owner: Worker identity running the job
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, params, secret, phase, state, active, owner, heartbeat, created)"
+                " VALUES (?, ?, ?, 'queued', '{}', 1, ?, ?, ?)",
+                (job_id, json.dumps(params), self._fernet.encrypt(password.encode()), owner, now, now),
+            )
+
+    def update(self, job_id, phase, **state):
+        """
+        Record the phase a job has entered and merge progress into its state.
+
+        Args:
+            job_id: Job ID
+            phase: Phase name, e.g. "login" or "poll_for_availability"
+            **state: Progress values to remember (matched_plate, calendar_url, booked, ...)
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            merged = json.loads(row[0])
+            merged.update(state)
+            conn.execute(
+                "UPDATE jobs SET phase = ?, state = ?, heartbeat = ? WHERE job_id = ?",
+                (phase, json.dumps(merged), time.time(), job_id),
+            )
+
+    def finish(self, job_id, outcome):
+        """
+        Mark a job as finished and erase its password.
+
+        Args:
+            job_id: Job ID
+            outcome: Final phase label, e.g. "success", "error" or "cancelled"
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET active = 0, secret = NULL, phase = ?, heartbeat = ? WHERE job_id = ?",
+                (outcome, time.time(), job_id),
+            )
+
+    def password(self, job):
+        """
+        Returns:
+            str: The job's decrypted password, or None if it cannot be recovered
+        """
+        if not job.get("secret"):
+            return None
+        try:
+            return self._fernet.decrypt(job["secret"]).decode()
+        except InvalidToken:
+            return None
+
+    def heartbeat(self, owner):
+        """Refresh the heartbeat of every active job owned by this worker."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND active = 1", (time.time(), owner)
+            )
+
+    def claim_stale(self, owner, stale_after=45):
+        """
+        Take over active jobs whose owner stopped sending heartbeats, or whose
+        owner process on this host is gone.
+
+        Args:
+            owner: Worker identity taking the jobs over
+            stale_after: Seconds without a heartbeat before a job counts as interrupted
+
+        Returns:
+            list: Claimed jobs as dicts with job_id, params, secret, phase and state
+        """
+        claimed = []
+        cutoff = time.time() - stale_after
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, params, secret, phase, state, owner, heartbeat FROM jobs"
+                " WHERE active = 1 AND owner != ?",
+                (owner,),
+            ).fetchall()
+            for job_id, params, secret, phase, state, previous, heartbeat in rows:
+                if heartbeat >= cutoff and not owner_is_dead(previous):
+                    continue
+                # Compare-and-set on the old owner so only one worker wins each job
+                cursor = conn.execute(
+                    "UPDATE jobs SET owner = ?, heartbeat = ? WHERE job_id = ? AND owner = ? AND active = 1",
+                    (owner, time.time(), job_id, previous),
+                )
+                if cursor.rowcount:
+                    claimed.append({
+                        "job_id": job_id,
+                        "params": json.loads(params),
+                        "secret": secret,
+                        "phase": phase,
+                        "state": json.loads(state),
+                    })
+        with self._lock:
+            self._stats["resumed"] += len(claimed)
+        return claimed
+
+    def purge(self, older_than=86400):
+        """Delete finished jobs that ended more than older_than seconds ago."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE active = 0 AND heartbeat < ?", (time.time() - older_than,)
+            )
+
+    def watch(self, owner, resume, interval=15, stale_after=45):
+        """
+        Start the background thread that keeps this worker's jobs alive and
+        resumes interrupted ones. The first pass runs immediately, so jobs
+        interrupted by a restart are picked up as soon as a worker boots.
+
+        Args:
+            owner: This worker's identity
+            resume: Callable(job) invoked for every claimed job
+            interval: Seconds between passes
+            stale_after: Seconds without a heartbeat before a job is taken over
+        """
+        def loop():
+            while True:
+                try:
+                    self.heartbeat(owner)
+                    for job in self.claim_stale(owner, stale_after):
+                        try:
+                            resume(job)
+                        except Exception as e:
+                            print(f"[ERROR] Failed to resume job {job['job_id']}: {e}")
+                    self.purge()
+                except Exception as e:
+                    print(f"[ERROR] Job store pass failed: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Active and finished job counts plus jobs resumed by this worker
+        """
+        with self._connect() as conn:
+            active, finished = conn.execute(
+                "SELECT COALESCE(SUM(active), 0), COALESCE(SUM(1 - active), 0) FROM jobs"
+            ).fetchone()
+        with self._lock:
+            return {"active": active, "finished": finished, "resumed": self._stats["resumed"]}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """
+    Return the process-wide job store, creating it from environment settings.
+
+    Environment:
+        JOB_STORE: "sqlite" to persist jobs, "none" to keep them in memory only (default: sqlite)
+        JOB_STORE_PATH: SQLite file for job records (default: system temp dir, which does
+                        not survive a redeploy or a free instance spinning down)
+        JOB_STORE_KEY: Fernet key for stored passwords (default: SESSION_CACHE_KEY, else a key
+                       generated once and stored in JOB_STORE_KEY_PATH)
+        JOB_STORE_KEY_PATH: File for the generated key (default: JOB_STORE_PATH + ".key")
+
+    Returns:
+        JobStore: Shared store instance, or None when disabled
+    """
+    global _store
+    backend = os.getenv('JOB_STORE', 'sqlite').lower()
+    if backend == 'none':
+        return None
+    if backend != 'sqlite':
+        raise Exception(f"Unknown JOB_STORE '{backend}'. Use 'sqlite' or 'none'.")
+    with _store_lock:
+        if _store is None:
+            _store = JobStore(
+                os.getenv('JOB_STORE_PATH', os.path.join(tempfile.gettempdir(), 'crystal_parking_jobs.db')),
+                key=os.getenv('JOB_STORE_KEY') or os.getenv('SESSION_CACHE_KEY'),
+                key_path=os.getenv('JOB_STORE_KEY_PATH'),
+            )
+        return _store
@@ -0,0 +1,41 @@
+import os
+import uuid
+from cryptography.fernet import Fernet
+
+
+def load_or_create_key(path):
+    """
+    Read a Fernet key from a file, generating and saving one on first use.
+
+    The key is written to a temporary file and hard-linked into place, which
+    fails if the file already exists, so workers starting together all end
+    up with the key of whichever one got there first.
+
+    Args:
+        path: Key file, readable only by this user
+
+    Returns:
+        bytes: Fernet key
+    """
+    try:
+        with open(path, 'rb') as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(Fernet.generate_key())
+    os.chmod(tmp_path, 0o600)
+    try:
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+
+    with open(path, 'rb') as f:
+        return f.read().strip()
@@ -0,0 +1,213 @@
+import os
+import threading
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from bot.driver_manager import driver_pid, setup_driver
+from bot.metrics import BROWSER_RECYCLE_FREED_BYTES, BROWSER_RECYCLES_TOTAL
+from bot.processes import tree_rss
+
+
+class WatchedDriver:
+    """
+    Driver handle whose browser the memory watchdog can swap out.
+
+    Every attribute and WebDriver call is forwarded to the current browser,
+    so the bot uses it like a plain driver. After a page refresh the
+    watchdog may replace the browser underneath; the new one is signed in
+    with the old one's cookies and already shows the same page, so the
+    polling loop just carries on.
+    """
+
+    def __init__(self, driver, watchdog, driver_pool=None, log=None):
+        """
+        Args:
+            driver: Selenium WebDriver instance to wrap
+            watchdog: MemoryWatchdog deciding when to recycle it
+            driver_pool: Optional DriverPool that leased the driver; replacements come from it too
+            log: Optional logging callback function for recycle notices
+        """
+        self.driver = driver
+        self.watchdog = watchdog
+        self.driver_pool = driver_pool
+        self.log = log
+        self.refreshes = 0
+        self.skip_until = 0
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def refresh(self):
+        self.driver.refresh()
+        self.refreshes += 1
+        self.watchdog.check(self)
+
+
+class MemoryWatchdog:
+    """
+    Replaces browsers that have grown too large during a long watch.
+
+    A Chromium reloading the calendar every few seconds for hours slowly
+    gains resident memory. Every sample_every refreshes the watchdog sums
+    the RSS of the driver's process tree (chromedriver, browser, renderers);
+    once it passes max_rss, or the browser has served max_refreshes
+    refreshes, a fresh browser is started, given the old one's cookies and
+    sent to the same page, and the old one is torn down. Login and plate
+    selection are not repeated.
+    """
+
+    def __init__(self, max_rss=700 * 1024 * 1024, max_refreshes=2000, sample_every=10):
+        """
+        Args:
+            max_rss: Process-tree resident bytes that trigger a recycle (None to disable)
+            max_refreshes: Refreshes that trigger a recycle regardless of memory (None to disable)
+            sample_every: Refreshes between memory samples
+        """
+        self.max_rss = max_rss
+        self.max_refreshes = max_refreshes
+        self.sample_every = max(1, sample_every)
+        self._lock = threading.Lock()
+        self._stats = {"samples": 0, "recycles": 0, "failures": 0, "freed_bytes": 0, "last_freed_bytes": None}
+
+    def watch(self, driver, driver_pool=None, log=None):
+        """
+        Returns:
+            WatchedDriver: Handle to use in place of driver
+        """
+        return WatchedDriver(driver, self, driver_pool=driver_pool, log=log)
+
+    def check(self, handle):
+        """
+        Sample a watched browser after a refresh and recycle it if it is over a limit.
+
+        Args:
+            handle: WatchedDriver that just refreshed
+        """
+        if handle.refreshes < handle.skip_until or handle.refreshes % self.sample_every:
+            return
+        reason = None
+        rss = None
+        if self.max_refreshes and handle.refreshes >= self.max_refreshes:
+            reason = "refreshes"
+        elif self.max_rss and not getattr(handle.driver, "shared", False):
+            # A shared browser's memory belongs to every tab in it, so tabs only recycle on refreshes
+            pid = driver_pid(handle.driver)
+            rss = tree_rss(pid) if pid else None
+            with self._lock:
+                self._stats["samples"] += 1
+            if rss and rss > self.max_rss:
+                reason = "memory"
+        if reason:
+            self.recycle(handle, reason, rss)
+
+    def recycle(self, handle, reason, rss=None):
+        """
+        Move a watched job onto a fresh browser without signing in again.
+
+        Args:
+            handle: WatchedDriver to move
+            reason: "memory" or "refreshes"
+            rss: Process-tree RSS of the old browser, if already sampled
+
+        Returns:
+            bool: True if the browser was replaced; on failure the old one is kept
+        """
+        old = handle.driver
+        log = handle.log or (lambda message, status="info": None)
+        if rss is None:
+            pid = driver_pid(old)
+            rss = tree_rss(pid) if pid else None
+
+        url = old.current_url
+        cookies = old.get_cookies()
+        new = None
+        try:
+            new = handle.driver_pool.acquire() if handle.driver_pool else setup_driver()
+            # Cookies can only be set for the domain currently loaded
+            new.get(url)
+            new.delete_all_cookies()
+            for cookie in cookies:
+                try:
+                    new.add_cookie(cookie)
+                except Exception:
+                    continue
+            new.get(url)
+            WebDriverWait(new, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-date]")))
+        except Exception as e:
+            if new is not None:
+                self._release(handle, new)
+            with self._lock:
+                self._stats["failures"] += 1
+            # Leave this browser alone for a while before trying again
+            handle.skip_until = handle.refreshes + self.sample_every * 10
+            log(f"Could not replace the browser ({e}); keeping the current one.", "info")
+            return False
+
+        handle.driver = new
+        handle.refreshes = 0
+        handle.skip_until = 0
+        self._release(handle, old)
+
+        new_pid = driver_pid(new)
+        new_rss = tree_rss(new_pid) if new_pid else None
+        freed = rss - new_rss if rss is not None and new_rss is not None else None
+        BROWSER_RECYCLES_TOTAL.inc(reason=reason)
+        if freed is not None:
+            BROWSER_RECYCLE_FREED_BYTES.observe(max(freed, 0))
+        with self._lock:
+            self._stats["recycles"] += 1
+            if freed is not None:
+                self._stats["freed_bytes"] += max(freed, 0)
+                self._stats["last_freed_bytes"] = freed
+
+        detail = f", freed {max(freed, 0) / (1024 * 1024):.0f} MB" if freed is not None else ""
+        log(f"Replaced the browser to keep memory in check ({reason}{detail}).", "info")
+        return True
+
+    def stats(self):
+        """
+        Returns:
+            dict: Memory samples taken, recycles, failed recycles and bytes freed
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _release(self, handle, driver):
+        if handle.driver_pool:
+            handle.driver_pool.release(driver, discard=True)
+            return
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+
+def get_memory_watchdog():
+    """
+    Return the process-wide memory watchdog, creating it from environment settings.
+
+    Environment:
+        DRIVER_MAX_RSS_MB: Browser process-tree memory that triggers a recycle, 0 to disable (default: 700)
+        DRIVER_MAX_REFRESHES: Page refreshes that trigger a recycle, 0 to disable (default: 2000)
+        DRIVER_MEMORY_SAMPLE_EVERY: Refreshes between memory samples (default: 10)
+
+    Returns:
+        MemoryWatchdog: Shared watchdog instance
+    """
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            max_rss_mb = float(os.getenv('DRIVER_MAX_RSS_MB', '700'))
+            max_refreshes = int(os.getenv('DRIVER_MAX_REFRESHES', '2000'))
+            _watchdog = MemoryWatchdog(
+                max_rss=max_rss_mb * 1024 * 1024 if max_rss_mb else None,
+                max_refreshes=max_refreshes or None,
+                sample_every=int(os.getenv('DRIVER_MEMORY_SAMPLE_EVERY', '10')),
+            )
+        return _watchdog
@@ -0,0 +1,308 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast HTTP poll up to a slow login
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Transfer size buckets in bytes, from a bare HTML document up to a page with all its assets
+BYTE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+
+# Memory buckets in bytes, from a small page's worth of RSS up to a bloated browser
+MEMORY_BUCKETS = tuple(mb * 1024 * 1024 for mb in (25, 50, 100, 200, 400, 800, 1600))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value)
+                    for key, value in self._values.items()]
+
+
+class Gauge:
+    """Point-in-time value, either set directly or read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback:
+            try:
+                return [(self.name, "", self.callback())]
+            except Exception:
+                return []
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value)
+                    for key, value in self._values.items()]
+
+
+class Histogram:
+    """Latency distribution with cumulative buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            state = self._values.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def mean(self, **labels):
+        """
+        Returns:
+            float: Mean of the observed values for these labels, None if nothing was observed
+        """
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if not state or not state["count"]:
+                return None
+            return state["sum"] / state["count"]
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                for bound, count in zip(self.buckets, state["counts"]):
+                    samples.append((f"{self.name}_bucket",
+                                    _format_labels(self.labels, key, [("le", bound)]), count))
+                samples.append((f"{self.name}_bucket",
+                                _format_labels(self.labels, key, [("le", "+Inf")]), state["count"]))
+                samples.append((f"{self.name}_sum", _format_labels(self.labels, key), state["sum"]))
+                samples.append((f"{self.name}_count", _format_labels(self.labels, key), state["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=(), callback=None):
+        gauge = self._register(Gauge, name, help_text, labels)
+        if callback:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets)
+
+    def render(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PHASE_SECONDS = REGISTRY.histogram(
+    "reservation_phase_seconds", "Time spent in each reservation phase", labels=("phase",)
+)
+POLL_SECONDS = REGISTRY.histogram(
+    "reservation_poll_seconds", "Duration of a single availability check", labels=("mode",)
+)
+POLLS_TOTAL = REGISTRY.counter(
+    "reservation_polls_total", "Availability checks performed", labels=("mode",)
+)
+POLL_TIMEOUTS_TOTAL = REGISTRY.counter(
+    "reservation_poll_timeouts_total", "Availability checks that timed out or failed", labels=("mode",)
+)
+PAGE_REFRESHES_TOTAL = REGISTRY.counter(
+    "reservation_page_refreshes_total", "Full calendar page reloads in the browser"
+)
+PAGE_LOAD_SECONDS = REGISTRY.histogram(
+    "browser_page_load_seconds", "Time for a browser page load to return", labels=("profile",)
+)
+PAGE_LOAD_BYTES = REGISTRY.histogram(
+    "browser_page_load_bytes", "Bytes transferred by one browser page load", labels=("profile",),
+    buckets=BYTE_BUCKETS,
+)
+RESERVATIONS_TOTAL = REGISTRY.counter(
+    "reservations_total", "Finished reservation runs", labels=("result",)
+)
+ENGINE_FALLBACKS_TOTAL = REGISTRY.counter(
+    "reservation_engine_fallbacks_total", "HTTP engine runs handed over to the browser", labels=("phase",)
+)
+BROWSER_RECYCLES_TOTAL = REGISTRY.counter(
+    "browser_recycles_total", "Browsers replaced mid-job by the memory watchdog", labels=("reason",)
+)
+BROWSER_RECYCLE_FREED_BYTES = REGISTRY.histogram(
+    "browser_recycle_freed_bytes", "Resident memory released by one browser recycle", buckets=MEMORY_BUCKETS
+)
+BROWSER_PROCESSES_REAPED_TOTAL = REGISTRY.counter(
+    "browser_processes_reaped_total", "Leaked Chrome and chromedriver processes killed by the reaper"
+)
+
+
+def record_poll(mode, start, failed=False):
+    """
+    Record one availability check.
+
+    Args:
+        mode: "browser" or "http"
+        start: time.monotonic() value taken when the check began
+        failed: True if the check timed out or errored
+
+    Returns:
+        float: Duration of the check in seconds
+    """
+    seconds = time.monotonic() - start
+    POLL_SECONDS.observe(seconds, mode=mode)
+    POLLS_TOTAL.inc(mode=mode)
+    if failed:
+        POLL_TIMEOUTS_TOTAL.inc(mode=mode)
+    return seconds
+
+
+def record_page_load(profile, seconds, transferred):
+    """
+    Record one browser page load.
+
+    Args:
+        profile: Driver profile that loaded the page, "full" or "lean"
+        seconds: Time until the load returned control to the bot
+        transferred: Bytes transferred for the document and its subresources
+    """
+    PAGE_LOAD_SECONDS.observe(seconds, profile=profile)
+    PAGE_LOAD_BYTES.observe(transferred, profile=profile)
+
+
+def page_load_savings(baseline=None):
+    """
+    Compare page loads of lean drivers against full ones.
+
+    A worker runs a single driver profile, so a lean worker compares its
+    own page loads against a full-profile baseline recorded elsewhere (for
+    example by the benchmark) when it has loaded no full pages itself.
+
+    Args:
+        baseline: Optional {"ms": float, "bytes": int} per full-profile page load
+
+    Returns:
+        dict: Mean milliseconds and bytes per page load for each profile seen,
+              plus ms_saved / bytes_saved once lean loads can be compared with
+              full ones; "full" is the baseline when "baseline" is True
+    """
+    report = {}
+    for profile in ("full", "lean"):
+        seconds = PAGE_LOAD_SECONDS.mean(profile=profile)
+        transferred = PAGE_LOAD_BYTES.mean(profile=profile)
+        if seconds is not None:
+            report[profile] = {"ms": round(seconds * 1000, 1), "bytes": round(transferred)}
+    if "full" not in report and baseline:
+        report["full"] = {"ms": round(baseline["ms"], 1), "bytes": round(baseline["bytes"])}
+        report["baseline"] = True
+    if "full" in report and "lean" in report:
+        report["ms_saved"] = round(report["full"]["ms"] - report["lean"]["ms"], 1)
+        report["bytes_saved"] = report["full"]["bytes"] - report["lean"]["bytes"]
+    return report
+
+
+@contextmanager
+def timed_phase(phase, timings=None):
+    """
+    Time a reservation phase into the phase histogram.
+
+    Args:
+        phase: Phase name, e.g. "login" or "complete_reservation"
+        timings: Optional StepTimings that also receives the duration
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        duration = time.monotonic() - start
+        PHASE_SECONDS.observe(duration, phase=phase)
+        if timings:
+            timings.record(phase, duration)
@@ -0,0 +1,428 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import JavascriptException, TimeoutException, WebDriverException
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.switch_to import SwitchTo
+
+# Starts an async script and parks its result in the page instead of holding
+# chromedriver until the callback fires; {script} is the caller's script body
+ASYNC_START_SCRIPT = """
+var results = window.__tabAsyncResults = window.__tabAsyncResults || {{}};
+var token = arguments[0];
+results[token] = {{done: false}};
+var args = Array.prototype.slice.call(arguments, 1);
+args.push(function (value) {{
+  if (!results[token].done) results[token] = {{done: true, value: value}};
+}});
+(function () {{
+{script}
+}}).apply(null, args);
+"""
+
+# Collects a parked async result; null once the page has navigated away
+ASYNC_RESULT_SCRIPT = """
+var results = window.__tabAsyncResults;
+var entry = results && results[arguments[0]];
+if (entry && entry.done) delete results[arguments[0]];
+return entry || null;
+"""
+
+
+class TabDriver(webdriver.Chrome):
+    """
+    Per-job handle onto one tab of a shared browser.
+
+    Behaves like a Chrome driver: every command (including those sent by
+    WebElements it returns) goes through execute(), which takes the
+    browser's command lock, switches chromedriver to this tab first and
+    applies this tab's own timeouts. Each tab lives in its own browser
+    context, so cookies and storage are not shared between jobs.
+
+    The lock is held for one chromedriver command at a time. An async
+    script is started in the page and its result collected by short
+    polls, so a long in-page wait does not hold up the other tabs.
+    """
+
+    # Lets callers tell a tab apart from a browser of its own
+    shared = True
+
+    # Seconds between checks for the result of an async script
+    async_poll_interval = 0.05
+
+    def __init__(self, browser, window, context_id):
+        """
+        Args:
+            browser: MultiplexedBrowser hosting the tab
+            window: WebDriver window handle of the tab
+            context_id: CDP browser context the tab was created in
+        """
+        # No session of its own: anything not set here is read from the
+        # browser's driver when it is needed (see __getattr__)
+        self.browser = browser
+        self.window = window
+        self.context_id = context_id
+        self.tab_timeouts = {}
+        self.closed = False
+        self.pinned_scripts = {}
+        self._switch_to = SwitchTo(self)
+
+    def __getattr__(self, name):
+        # Session state (command executor, session ID, capabilities, ...) stays
+        # on the driver that owns the browser and is always read from it
+        if name == "browser":
+            raise AttributeError(name)
+        return getattr(self.browser.driver, name)
+
+    def execute(self, driver_command, params=None):
+        if driver_command == Command.W3C_EXECUTE_SCRIPT_ASYNC:
+            return self._execute_async(params)
+        return self._execute(driver_command, params)
+
+    def _execute(self, driver_command, params=None):
+        if self.closed:
+            raise WebDriverException("Browser tab was closed")
+        with self.browser.lock:
+            if driver_command == Command.SET_TIMEOUTS:
+                # Timeouts are per session in chromedriver; remember them per tab instead
+                self.tab_timeouts.update(params or {})
+                self.browser.activate(self)
+                return {"success": 0, "value": None, "sessionId": self.session_id}
+            self.browser.activate(self)
+            return super().execute(driver_command, params)
+
+    def _execute_async(self, params):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.tab_timeouts.get("script", 30000) / 1000
+        self._execute(Command.W3C_EXECUTE_SCRIPT, {
+            "script": ASYNC_START_SCRIPT.format(script=params["script"]),
+            "args": [token] + list(params.get("args", [])),
+        })
+        while True:
+            entry = self._execute(Command.W3C_EXECUTE_SCRIPT, {
+                "script": ASYNC_RESULT_SCRIPT, "args": [token],
+            })["value"]
+            if entry is None:
+                raise JavascriptException("javascript error: document unloaded while waiting for result")
+            if entry["done"]:
+                return {"success": 0, "value": entry.get("value"), "sessionId": self.session_id}
+            if time.monotonic() >= deadline:
+                raise TimeoutException("script timeout")
+            time.sleep(self.async_poll_interval)
+
+    def kill(self):
+        """
+        Stop this tab right away: its next command fails and the tab is closed
+        as soon as the command in flight (if any) returns. Other tabs keep running.
+        """
+        self.closed = True
+        threading.Thread(target=self.browser.close_tab, args=(self,), daemon=True).start()
+
+    def quit(self):
+        self.browser.close_tab(self)
+
+    def close(self):
+        self.browser.close_tab(self)
+
+
+class MultiplexedBrowser:
+    """
+    One Chromium process hosting several jobs, each in an isolated tab.
+
+    chromedriver acts on one window at a time, so a single lock serializes
+    every command and the browser switches windows only when the next
+    command belongs to a different tab than the last one.
+    """
+
+    def __init__(self, driver, tab_setup=None):
+        """
+        Args:
+            driver: Selenium WebDriver instance that owns the browser process
+            tab_setup: Optional callable(tab) run on every new tab, e.g. to block heavy requests
+        """
+        self.driver = driver
+        self.tab_setup = tab_setup
+        self.lock = threading.RLock()
+        self.base_window = driver.current_window_handle
+        self.current = self.base_window
+        self.timeouts = {}
+        self.tabs = set()
+        self.reserved = 0  # Slots promised to callers whose tab is still opening
+        self.created = time.monotonic()
+        size = driver.get_window_size()
+        self._size = {"width": size["width"], "height": size["height"]}
+
+    def activate(self, tab):
+        """Point chromedriver at this tab and its timeouts (caller holds self.lock)."""
+        if self.current != tab.window:
+            self.driver.execute(Command.SWITCH_TO_WINDOW, {"handle": tab.window})
+            self.current = tab.window
+        stale = {name: value for name, value in tab.tab_timeouts.items() if self.timeouts.get(name) != value}
+        if stale:
+            self.driver.execute(Command.SET_TIMEOUTS, dict(stale))
+            self.timeouts.update(stale)
+
+    def open_tab(self):
+        """
+        Open a tab in a fresh browser context.
+
+        Returns:
+            TabDriver: Driver-like handle for the new tab
+        """
+        with self.lock:
+            self._focus_base()
+            try:
+                context_id = self.driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+                target = self.driver.execute_cdp_cmd("Target.createTarget", dict(
+                    self._size, url="about:blank", browserContextId=context_id
+                ))["targetId"]
+            except Exception as e:
+                raise Exception(f"Could not create an isolated browser tab: {e}")
+
+            # chromedriver names windows after their target ID
+            window = next((h for h in self.driver.window_handles if h.upper() == target.upper()), None)
+            if window is None:
+                self._dispose(context_id)
+                raise Exception("New browser tab did not appear in chromedriver")
+
+            tab = TabDriver(self, window, context_id)
+            self.tabs.add(tab)
+
+        if self.tab_setup:
+            try:
+                self.tab_setup(tab)
+            except Exception:
+                self.close_tab(tab)
+                raise
+        return tab
+
+    def close_tab(self, tab):
+        """Close a tab and dispose of its browser context, cookies included."""
+        with self.lock:
+            tab.closed = True
+            if tab not in self.tabs:
+                return
+            self.tabs.discard(tab)
+            try:
+                self._focus_base()
+            except Exception:
+                # The browser is gone; nothing left to close
+                return
+            self._dispose(tab.context_id)
+
+    def is_healthy(self):
+        try:
+            with self.lock:
+                self._focus_base()
+                return self.driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def quit(self):
+        with self.lock:
+            for tab in list(self.tabs):
+                tab.closed = True
+            self.tabs.clear()
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+
+    def _focus_base(self):
+        if self.current != self.base_window:
+            self.driver.execute(Command.SWITCH_TO_WINDOW, {"handle": self.base_window})
+            self.current = self.base_window
+
+    def _dispose(self, context_id):
+        try:
+            self.driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+        except Exception:
+            pass
+
+
+class MultiplexedDriverPool:
+    """
+    Hands out tabs of shared browsers instead of whole browsers.
+
+    Drop-in replacement for DriverPool: acquire() returns a TabDriver in
+    the first browser with a free slot, launching another browser when all
+    are full (or waiting for a tab to close once max_browsers are
+    running), and release() closes the tab and its context. A job's
+    browser overhead is then one renderer and a browser context rather
+    than a full Chromium process tree.
+    """
+
+    def __init__(self, factory, tabs_per_browser=8, max_browsers=None, tab_setup=None, lease_timeout=60):
+        """
+        Args:
+            factory: Callable that launches a new driver
+            tabs_per_browser: Jobs hosted by one browser process
+            max_browsers: Maximum browser processes, None for no cap
+            tab_setup: Optional callable(tab) run on every new tab
+            lease_timeout: Seconds to wait for a free tab when every browser is full
+        """
+        self.factory = factory
+        self.tabs_per_browser = tabs_per_browser
+        self.max_browsers = max_browsers
+        self.tab_setup = tab_setup
+        self.lease_timeout = lease_timeout
+        self._browsers = []
+        self._launching = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {"tabs_opened": 0, "launched": 0, "retired": 0, "lease_waits": 0, "lease_wait_seconds": 0.0}
+
+    def start(self):
+        """Launch the first browser in a background thread so the first job finds it warm."""
+        def warm():
+            with self._cond:
+                if self._browsers or self._launching or self._closed:
+                    return
+                self._launching += 1
+            try:
+                self._launch()
+            except Exception as e:
+                print(f"[ERROR] Failed to pre-launch browser: {e}")
+
+        threading.Thread(target=warm, daemon=True).start()
+
+    def acquire(self):
+        """
+        Lease a tab, waiting up to lease_timeout when every browser is full.
+
+        Returns:
+            TabDriver: A fresh isolated tab leased to the caller
+        """
+        deadline = time.monotonic() + self.lease_timeout
+        wait_start = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("Driver pool is shut down")
+                browser = next(
+                    (b for b in self._browsers if len(b.tabs) + b.reserved < self.tabs_per_browser), None
+                )
+                if browser is not None:
+                    browser.reserved += 1
+                    break
+                if not self.max_browsers or len(self._browsers) + self._launching < self.max_browsers:
+                    self._launching += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Timed out waiting for a free browser tab")
+                wait_start = wait_start or time.monotonic()
+                self._cond.wait(remaining)
+
+            if wait_start is not None:
+                self._stats["lease_waits"] += 1
+                self._stats["lease_wait_seconds"] += time.monotonic() - wait_start
+
+        if browser is None:
+            browser = self._launch(reserve=True)
+
+        try:
+            tab = browser.open_tab()
+        finally:
+            with self._cond:
+                browser.reserved -= 1
+                self._cond.notify_all()
+        with self._cond:
+            self._stats["tabs_opened"] += 1
+        return tab
+
+    def release(self, driver, discard=False):
+        """
+        Close a leased tab.
+
+        Args:
+            driver: TabDriver previously returned by acquire()
+            discard: The job failed; also check the browser is still healthy
+        """
+        if driver is None:
+            return
+        browser = driver.browser
+        browser.close_tab(driver)
+        retire = discard and not browser.is_healthy()
+        with self._cond:
+            if not browser.tabs and not browser.reserved and len(self._browsers) > 1:
+                # Keep one idle browser warm, retire the rest
+                retire = True
+            if retire and browser in self._browsers:
+                self._browsers.remove(browser)
+                self._stats["retired"] += 1
+            else:
+                retire = False
+            # A tab or a browser slot has been freed
+            self._cond.notify_all()
+        if retire:
+            browser.quit()
+
+    @contextmanager
+    def lease(self):
+        """Context manager that acquires a tab and releases it on exit."""
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Browsers ("live"), open tabs and lifetime counters
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["live"] = len(self._browsers)
+            stats["tabs"] = sum(len(b.tabs) for b in self._browsers)
+            stats["tabs_per_browser"] = self.tabs_per_browser
+        return stats
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            browsers, self._browsers = self._browsers, []
+            self._cond.notify_all()
+        for browser in browsers:
+            browser.quit()
+
+    def _launch(self, reserve=False):
+        """
+        Launch a browser and add it to the pool, for a launch already counted in _launching.
+
+        Args:
+            reserve: Hold one of its slots for the caller
+
+        Returns:
+            MultiplexedBrowser: The new browser
+        """
+        try:
+            browser = MultiplexedBrowser(self.factory(), tab_setup=self.tab_setup)
+        except Exception:
+            with self._cond:
+                self._launching -= 1
+                self._cond.notify_all()
+            raise
+
+        # Swap the pending launch for the browser in one step so concurrent callers never see neither
+        with self._cond:
+            self._launching -= 1
+            self._stats["launched"] += 1
+            closed = self._closed
+            if not closed:
+                if reserve:
+                    browser.reserved += 1
+                self._browsers.append(browser)
+            self._cond.notify_all()
+        if closed:
+            browser.quit()
+            raise Exception("Driver pool is shut down")
+        return browser
+
@@ -0,0 +1,178 @@
+import itertools
+import os
+import random
+import threading
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+
+
+def parse_hot_windows(spec):
+    """
+    Parse a comma separated list of HH:MM-HH:MM windows.
+
+    Args:
+        spec: String such as "07:55-08:15,17:58-18:05"
+
+    Returns:
+        list: [(datetime.time, datetime.time)] pairs
+    """
+    windows = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, end = part.split("-")
+            windows.append((dtime.fromisoformat(start.strip()), dtime.fromisoformat(end.strip())))
+        except ValueError:
+            raise Exception(f"Invalid hot window '{part}'. Use HH:MM-HH:MM.")
+    return windows
+
+
+class PollScheduler:
+    """
+    Spreads a global request budget across every active watch.
+
+    Each watch asks for its next delay after every check. The delay grows
+    with the number of active watches so the total stays within
+    requests_per_minute, shrinks inside hot windows (known release times),
+    backs off exponentially after errors, and is jittered so watches do not
+    poll in lockstep.
+    """
+
+    def __init__(self, requests_per_minute=30, min_interval=2.0, max_interval=120.0,
+                 jitter=0.2, backoff_factor=2.0, hot_windows=None, hot_multiplier=4.0,
+                 timezone=None):
+        """
+        Args:
+            requests_per_minute: Global poll budget shared by all watches
+            min_interval: Floor on the delay between checks of one watch
+            max_interval: Ceiling on the delay, including backoff
+            jitter: Random +/- fraction applied to every delay
+            backoff_factor: Multiplier per consecutive error
+            hot_windows: List of (start, end) datetime.time pairs with a raised budget
+            hot_multiplier: Budget multiplier inside hot windows
+            timezone: IANA zone the hot windows are expressed in (default: server local time)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.backoff_factor = backoff_factor
+        self.hot_windows = hot_windows or []
+        self.hot_multiplier = hot_multiplier
+        self.timezone = ZoneInfo(timezone) if timezone else None
+
+        self._errors = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def register(self):
+        """
+        Add a watch to the budget.
+
+        Returns:
+            int: Key to pass to next_delay() and unregister()
+        """
+        with self._lock:
+            key = next(self._ids)
+            self._errors[key] = 0
+            return key
+
+    def unregister(self, key):
+        """Remove a watch from the budget."""
+        with self._lock:
+            self._errors.pop(key, None)
+
+    def in_hot_window(self, now=None):
+        """
+        Returns:
+            bool: True if the current time falls inside a hot window
+        """
+        now = (now or datetime.now(self.timezone)).time()
+        for start, end in self.hot_windows:
+            if start <= end and start <= now <= end:
+                return True
+            if start > end and (now >= start or now <= end):
+                return True
+        return False
+
+    def base_interval(self):
+        """
+        Returns:
+            float: Delay between checks for one watch, before backoff and jitter
+        """
+        with self._lock:
+            active = max(len(self._errors), 1)
+        budget = self.requests_per_minute
+        if self.in_hot_window():
+            budget *= self.hot_multiplier
+        interval = 60.0 * active / budget
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def next_delay(self, key, error=False):
+        """
+        Compute how long a watch should wait before its next check.
+
+        Args:
+            key: Key returned by register()
+            error: True if the last check failed or timed out
+
+        Returns:
+            float: Seconds to sleep
+        """
+        with self._lock:
+            errors = self._errors.get(key, 0) + 1 if error else 0
+            if key in self._errors:
+                self._errors[key] = errors
+
+        delay = self.base_interval() * (self.backoff_factor ** errors)
+        delay = min(delay, self.max_interval)
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, self.min_interval)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Active watch count, current per-watch interval and hot window state
+        """
+        with self._lock:
+            active = len(self._errors)
+        return {
+            "active_watches": active,
+            "interval": round(self.base_interval(), 2),
+            "hot_window": self.in_hot_window(),
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_poll_scheduler():
+    """
+    Return the process-wide poll scheduler, creating it from environment settings.
+
+    Environment:
+        POLL_REQUESTS_PER_MINUTE: Global poll budget (default: 30)
+        POLL_MIN_INTERVAL: Minimum seconds between checks of one watch (default: 2)
+        POLL_MAX_INTERVAL: Maximum seconds between checks, including backoff (default: 120)
+        POLL_HOT_WINDOWS: Comma separated HH:MM-HH:MM windows with a raised budget
+        POLL_HOT_MULTIPLIER: Budget multiplier inside hot windows (default: 4)
+        POLL_TIMEZONE: Time zone of the hot windows (default: America/Los_Angeles)
+
+    Returns:
+        PollScheduler: Shared scheduler instance
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PollScheduler(
+                requests_per_minute=float(os.getenv('POLL_REQUESTS_PER_MINUTE', '30')),
+                min_interval=float(os.getenv('POLL_MIN_INTERVAL', '2')),
+                max_interval=float(os.getenv('POLL_MAX_INTERVAL', '120')),
+                hot_windows=parse_hot_windows(os.getenv('POLL_HOT_WINDOWS')),
+                hot_multiplier=float(os.getenv('POLL_HOT_MULTIPLIER', '4')),
+                timezone=os.getenv('POLL_TIMEZONE', 'America/Los_Angeles'),
+            )
+        return _scheduler
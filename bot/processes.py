@@ -0,0 +1,141 @@
+import os
+import signal
+import time
+
+# Process inspection through /proc, so it works in the Linux container without
+# extra dependencies. Elsewhere every helper reports nothing.
+
+PROC = "/proc"
+
+# Process names (as in /proc/<pid>/comm) of the browser and its driver
+BROWSER_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def available():
+    """
+    Returns:
+        bool: True if /proc can be read on this platform
+    """
+    return os.path.isdir(PROC)
+
+
+def _boot_time():
+    with open(os.path.join(PROC, "stat")) as f:
+        for line in f:
+            if line.startswith("btime "):
+                return int(line.split()[1])
+    return 0
+
+
+def scan_processes():
+    """
+    Read every process visible in /proc.
+
+    Returns:
+        dict: {pid: {"name": str, "ppid": int, "started": epoch seconds, "cmdline": str}}
+    """
+    if not available():
+        return {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    boot = _boot_time()
+    table = {}
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(PROC, entry, "stat")) as f:
+                stat = f.read()
+            with open(os.path.join(PROC, entry, "cmdline"), "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+        except OSError:
+            continue
+        # The name is in parentheses and may itself contain spaces or parentheses
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split()
+        table[int(entry)] = {
+            "name": name,
+            "ppid": int(fields[1]),
+            "started": boot + int(fields[19]) / ticks,
+            "cmdline": cmdline,
+        }
+    return table
+
+
+def process_tree(pid, table=None):
+    """
+    Args:
+        pid: Root process ID
+        table: Optional result of scan_processes() to reuse
+
+    Returns:
+        list: pid followed by all of its descendants, or [] if it is not running
+    """
+    table = scan_processes() if table is None else table
+    if pid not in table:
+        return []
+    children = {}
+    for child, info in table.items():
+        children.setdefault(info["ppid"], []).append(child)
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def kill_tree(pid, table=None):
+    """
+    SIGKILL a process and all of its descendants.
+
+    Descendants are collected before anything is killed, so children are
+    not lost by being re-parented when their parent dies first.
+
+    Returns:
+        int: Number of processes signalled
+    """
+    killed = 0
+    for member in process_tree(pid, table):
+        try:
+            os.kill(member, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+def is_browser_process(info):
+    """
+    Returns:
+        bool: True for Chrome, Chromium and chromedriver processes
+    """
+    return info["name"].lower().startswith(BROWSER_NAMES)
+
+
+def process_age(info, now=None):
+    """
+    Returns:
+        float: Seconds since the process started
+    """
+    return (now or time.time()) - info["started"]
+
+
+def tree_rss(pid, table=None):
+    """
+    Resident memory of a process and all of its descendants.
+
+    Returns:
+        int: Bytes, or None if the process is not running or /proc is unavailable
+    """
+    tree = process_tree(pid, table)
+    if not tree:
+        return None
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for member in tree:
+        try:
+            with open(os.path.join(PROC, str(member), "statm")) as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
@@ -0,0 +1,67 @@
+import threading
+import time
+from datetime import datetime
+
+
+class ProgressCoalescer:
+    """
+    Folds repeated polling updates into a periodic summary.
+
+    A long watch logs "Date unavailable. Checking again..." on every check,
+    which adds up to thousands of identical messages per session. The first
+    polling message of a run goes out as-is; later ones are counted and
+    replaced by at most one summary per interval with the number of checks,
+    when the last one ran and the mean check latency. Any other status
+    (info, success, error, ...) is a state change and goes out immediately.
+    """
+
+    def __init__(self, sink, interval=30):
+        """
+        Args:
+            sink: Callable(message, status) that delivers a progress update
+            interval: Minimum seconds between polling summaries
+        """
+        self.sink = sink
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._polling = False
+        self._last_sent = 0.0
+        self._checks = 0
+        self._check_seconds = 0.0
+        self._last_check = None
+
+    def __call__(self, message, status="info", check_seconds=None):
+        """
+        Report one progress update.
+
+        Args:
+            message: Human readable status text
+            status: Status type; "polling" updates are coalesced
+            check_seconds: Duration of the availability check this update follows, if any
+        """
+        now = time.monotonic()
+        with self._lock:
+            if check_seconds is not None:
+                self._checks += 1
+                self._check_seconds += check_seconds
+                self._last_check = datetime.now()
+
+            if status == "polling":
+                if self._polling and now - self._last_sent < self.interval:
+                    return
+                if self._polling:
+                    message = f"{self._summary()} {message}"
+                self._polling = True
+            else:
+                self._polling = False
+            self._last_sent = now
+
+        self.sink(message, status)
+
+    def _summary(self):
+        parts = [f"Still watching: {self._checks} checks"]
+        if self._last_check:
+            parts.append(f"last at {self._last_check.strftime('%H:%M:%S')}")
+        if self._checks:
+            parts.append(f"avg {self._check_seconds / self._checks:.2f}s per check")
+        return ", ".join(parts) + "."
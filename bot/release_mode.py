@@ -0,0 +1,352 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from bot.calendar_watch import InPageCalendar
+from bot.driver_manager import refresh_page
+from bot.http_poller import HttpAvailabilityPoller
+from bot.metrics import PAGE_REFRESHES_TOTAL, record_poll, timed_phase
+from bot.reservation_bot import (
+    click_add_more_days, click_reserve, login, next_poll_delay, parse_date,
+    poll_for_availability, select_license_plate, submit_checkout
+)
+from bot.reservation_run import ReservationRun
+from bot.waits import sleep_unless_cancelled
+
+
+def parse_release_time(value, timezone=None):
+    """
+    Parse a release time entered by the user.
+
+    Args:
+        value: Local time as YYYY-MM-DDTHH:MM (what a datetime-local input sends),
+               optionally with seconds or a space instead of the T
+        timezone: tzinfo the value is given in (default: server local time)
+
+    Returns:
+        float: Release time in epoch seconds
+    """
+    for fmt in ("%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S"):
+        try:
+            local = datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+        return local.replace(tzinfo=timezone).timestamp() if timezone else local.timestamp()
+    raise Exception("Invalid release time. Please use YYYY-MM-DD HH:MM format.")
+
+
+class CheckoutRace:
+    """
+    Lets exactly one of several racing browsers check out.
+
+    The first racer to see the date open wins, before it clicks Reserve, so
+    only one browser ever puts the date in the account's cart. Every later
+    racer is turned away, even if the winner's checkout then fails, so the
+    account is never booked twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.winner = None
+        self.decided = threading.Event()
+
+    def claim(self, racer):
+        """
+        Returns:
+            bool: True if this racer may check out
+        """
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self.winner = racer
+        self.decided.set()
+        return True
+
+
+class RaceCancelEvent:
+    """Event-like flag that stops a racer once the user cancels or another racer has won."""
+
+    def __init__(self, race, cancel_event=None):
+        self.race = race
+        self.cancel_event = cancel_event
+
+    def is_set(self):
+        return self.race.decided.is_set() or bool(self.cancel_event and self.cancel_event.is_set())
+
+    def wait(self, timeout=None, poll_interval=0.1):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            remaining = poll_interval if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.race.decided.wait(min(poll_interval, remaining))
+        return True
+
+
+def wait_for_release(driver, date_base, release_at, log, cancel_event=None, window=30,
+                     tight_interval=0.5, refresh_rate=5, max_errors=3, scheduler=None):
+    """
+    Watch a parked calendar until the date opens, polling tightly around the release time.
+
+    Checks run over HTTP with the browser's cookies, falling back to
+    refetching the calendar inside the page. Outside release_at +/- window
+    the normal poll pace applies; inside it the date is checked every
+    tight_interval seconds.
+
+    Args:
+        driver: Selenium WebDriver instance parked on the calendar view
+        date_base: Date string in YYYY-MM-DD format
+        release_at: Expected release time in epoch seconds
+        log: Logging callback function
+        cancel_event: Optional threading.Event that stops waiting when set
+        window: Seconds either side of release_at that are polled tightly
+        tight_interval: Seconds between checks inside the window
+        refresh_rate: Seconds between checks outside the window when no scheduler is given
+        max_errors: Consecutive failed checks before switching method
+        scheduler: Optional PollScheduler that paces checks outside the window
+
+    Returns:
+        bool: True once the date is open, False if neither method can read
+              the calendar and the browsers should poll by reloading
+    """
+    poller = HttpAvailabilityPoller.from_driver(driver)
+    calendar = None
+    errors = 0
+    key = scheduler.register() if scheduler else None
+    log(f"Watching {date_base} for its release...", "polling")
+
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+
+            check_start = time.monotonic()
+            if calendar is None:
+                try:
+                    available = poller.check(date_base)
+                    check_seconds = record_poll("http", check_start)
+                    errors = 0 if available is not None else max_errors
+                except Exception:
+                    check_seconds = record_poll("http", check_start, failed=True)
+                    available = None
+                    errors += 1
+                if errors >= max_errors:
+                    log("Calendar not readable over HTTP. Watching it inside the page instead.", "info")
+                    calendar = InPageCalendar(driver, [date_base])
+                    errors = 0
+                    continue
+            else:
+                result = calendar.refetch()
+                failed = bool(result["error"] or not result["found"])
+                check_seconds = record_poll("inpage", check_start, failed=failed)
+                available = bool(result["open"]) if not failed else None
+                errors = errors + 1 if failed else 0
+                if errors >= max_errors:
+                    log("In-page refresh failed. Falling back to page reloads.", "info")
+                    return False
+
+            if available:
+                log(f"Date {date_base} is open!", "success")
+                return True
+
+            now = time.time()
+            if abs(now - release_at) <= window:
+                delay = tight_interval
+            else:
+                delay = next_poll_delay(scheduler, key, refresh_rate, error=available is None)
+                if now < release_at - window:
+                    # Do not sleep past the start of the tight window
+                    delay = min(delay, release_at - window - now)
+            log(f"Date unavailable. Checking again in {delay:.1f}s...", "polling", check_seconds=check_seconds)
+            sleep_unless_cancelled(max(delay, 0), cancel_event)
+    finally:
+        if scheduler:
+            scheduler.unregister(key)
+
+
+def run_release_reservation(username, password, license_plate, date_str, release_at, progress_callback=None,
+                            cancel_event=None, racers=2, lead_time=120, window=30, tight_interval=0.5,
+                            driver_pool=None, poll_scheduler=None, summary_interval=30, on_phase=None):
+    """
+    Book a date that opens at a known time with browsers prepared in advance.
+
+    lead_time seconds before release_at, several browsers sign in, select
+    the plate and park on the calendar view. One of them watches the date,
+    polling tightly around the release time. As soon as it opens, every
+    browser reloads the calendar; the first to see the date open claims the
+    race before clicking Reserve and checks out, and the others are stopped
+    and torn down. All browsers share the account's cart, so only the
+    winner ever adds the date to it.
+
+    Args:
+        username: Account username
+        password: Account password
+        license_plate: License plate number
+        date_str: Date in YYYY/MM/DD format
+        release_at: Expected release time in epoch seconds
+        progress_callback: Optional callback function(message, status) for status updates
+        cancel_event: Optional threading.Event that stops the run when set
+        racers: Browsers prepared to race through checkout (default: 2)
+        lead_time: Seconds before release_at to start preparing browsers (default: 120)
+        window: Seconds either side of release_at that are polled tightly (default: 30)
+        tight_interval: Seconds between checks inside the window (default: 0.5)
+        driver_pool: Optional DriverPool to lease warm browsers from
+        poll_scheduler: Optional PollScheduler that paces polling outside the window; its
+                        timezone is used to label the release time
+        summary_interval: Minimum seconds between coalesced polling updates (default: 30)
+        on_phase: Optional callback function(phase, state) called as the run enters each phase
+
+    Returns:
+        dict: {"success": bool, "message": str, "winner": int or None,
+               "release_to_booked": float or None, "wait_timings": dict, "phase_timings": dict}
+    """
+    run = ReservationRun(progress_callback, cancel_event, driver_pool=driver_pool, summary_interval=summary_interval)
+    log = run.log
+    timings = run.timings
+    phase_timings = run.phase_timings
+
+    def phase(name):
+        if on_phase:
+            on_phase(name, {})
+
+    def racer_log(index):
+        def racer(message, status="info", check_seconds=None):
+            log(f"[Browser {index + 1}] {message}", status, check_seconds=check_seconds)
+        return racer
+
+    drivers = [None] * racers
+    plates = [None] * racers
+    finished = set()
+    race = CheckoutRace()
+    drivers_lock = threading.Lock()
+
+    def release(index, discard):
+        with drivers_lock:
+            driver, drivers[index] = drivers[index], None
+        # A discarded browser is killed first so a page load in flight does not hold up the teardown
+        run.release_driver(driver, discard=discard, kill=discard, announce=False)
+
+    def prepare(index):
+        racer = racer_log(index)
+        try:
+            drivers[index] = run.lease_driver()
+            login(drivers[index], username, password, racer, timings=timings)
+            plates[index] = select_license_plate(drivers[index], license_plate, racer)
+            click_add_more_days(drivers[index], racer)
+        except Exception as e:
+            racer(f"Could not prepare browser: {e}", "info")
+            release(index, discard=True)
+
+    def run_racer(index, date_base, refresh_rate):
+        racer = racer_log(index)
+        try:
+            refresh_page(drivers[index])
+            PAGE_REFRESHES_TOTAL.inc()
+            poll_for_availability(drivers[index], date_base, racer, refresh_rate=refresh_rate,
+                                  cancel_event=RaceCancelEvent(race, cancel_event))
+            # Claim the race before Reserve so the losers never add the date to the shared cart
+            if not race.claim(index):
+                raise Exception("Checkout aborted: another browser is checking out.")
+            click_reserve(drivers[index], racer, timings=timings)
+            submit_checkout(drivers[index], plates[index], racer, timings=timings)
+            finished.add(index)
+        except Exception as e:
+            if race.winner not in (None, index):
+                racer("Another browser won the checkout race.", "info")
+            else:
+                racer(f"Checkout failed: {e}", "info")
+        finally:
+            # Losers are usually torn down by the coordinator already
+            if race.winner != index:
+                release(index, discard=True)
+
+    try:
+        log("Validating date format...", "info")
+        date_base = parse_date(date_str)
+        # Label the release in the zone the user entered it in, not the server's
+        timezone = poll_scheduler.timezone if poll_scheduler else None
+        release_label = datetime.fromtimestamp(release_at, timezone).strftime("%Y-%m-%d %H:%M:%S %Z").strip()
+        log(f"Scheduled for {date_base}, expected to open at {release_label}", "info")
+
+        # Stay idle until it is time to get the browsers ready
+        if release_at - lead_time > time.time():
+            log(f"Preparing {racers} browsers {lead_time:.0f}s before the release...", "info")
+            phase("wait_for_lead_time")
+            with timed_phase("wait_for_lead_time", phase_timings):
+                sleep_unless_cancelled(release_at - lead_time - time.time(), cancel_event)
+
+        phase("prepare_racers")
+        with timed_phase("prepare_racers", phase_timings):
+            threads = [threading.Thread(target=prepare, args=(i,), daemon=True) for i in range(racers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        ready = [i for i in range(racers) if drivers[i] is not None]
+        if not ready:
+            raise Exception("No browser could be prepared for the release.")
+        log(f"{len(ready)} browser(s) parked on the calendar", "info")
+
+        phase("poll_for_availability")
+        with timed_phase("poll_for_availability", phase_timings):
+            detected = wait_for_release(drivers[ready[0]], date_base, release_at, log, cancel_event=cancel_event,
+                                        window=window, tight_interval=tight_interval, scheduler=poll_scheduler)
+        opened_at = time.time()
+
+        # Race every parked browser to the open date; the first to see it checks out
+        phase("checkout_race")
+        with timed_phase("checkout_race", phase_timings):
+            refresh_rate = tight_interval if detected else 5
+            threads = {i: threading.Thread(target=run_racer, args=(i, date_base, refresh_rate), daemon=True)
+                       for i in ready}
+            for thread in threads.values():
+                thread.start()
+            while not race.decided.wait(0.1):
+                if not any(thread.is_alive() for thread in threads.values()):
+                    break
+            if race.winner is not None:
+                # Free the losing browsers right away instead of letting them finish their page loads
+                for index in ready:
+                    if index != race.winner:
+                        release(index, discard=True)
+            for thread in threads.values():
+                thread.join()
+
+        if race.winner is None or race.winner not in finished:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+            raise Exception("No browser completed checkout.")
+
+        return run.succeed(f"Reservation completed successfully by browser {race.winner + 1}!",
+                           winner=race.winner, release_to_booked=round(time.time() - min(release_at, opened_at), 3))
+
+    except Exception as e:
+        return run.fail(e, winner=race.winner, release_to_booked=None)
+
+    finally:
+        run.close()
+        for index in range(racers):
+            if drivers[index] is not None:
+                release(index, discard=index != race.winner or race.winner not in finished)
+
+
+def get_release_settings():
+    """
+    Release-mode tuning from environment settings.
+
+    Environment:
+        RELEASE_RACERS: Browsers prepared to race through checkout (default: 2)
+        RELEASE_LEAD_SECONDS: Seconds before the release to prepare them (default: 120)
+        RELEASE_WINDOW_SECONDS: Seconds either side of the release polled tightly (default: 30)
+        RELEASE_POLL_INTERVAL: Seconds between checks inside that window (default: 0.5)
+
+    Returns:
+        dict: Keyword arguments for run_release_reservation
+    """
+    return {
+        "racers": int(os.getenv('RELEASE_RACERS', '2')),
+        "lead_time": float(os.getenv('RELEASE_LEAD_SECONDS', '120')),
+        "window": float(os.getenv('RELEASE_WINDOW_SECONDS', '30')),
+        "tight_interval": float(os.getenv('RELEASE_POLL_INTERVAL', '0.5')),
+    }
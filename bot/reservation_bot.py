@@ -1,15 +1,27 @@
+import os
 import time
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import TimeoutException
 
-from bot.driver_manager import setup_driver
+from bot.calendar_watch import InPageCalendar
+from bot.dom_queries import read_calendar_cells, read_select_options, select_option
+from bot.driver_manager import refresh_page
+from bot.engines import EngineFallback, ReservationEngine, plate_matches
+from bot.http_engine import HttpEngine
+from bot.http_poller import HttpAvailabilityPoller
+from bot.metrics import ENGINE_FALLBACKS_TOTAL, PAGE_REFRESHES_TOTAL, record_poll, timed_phase
+from bot.reservation_run import ReservationRun
+from bot.waits import document_ready, sleep_unless_cancelled, wait_for, wait_for_page_settled, wait_for_url_change
 
+# Override with PARKING_BASE_URL to run against a local mock of the site
+BASE_URL = os.getenv('PARKING_BASE_URL', 'https://parking.crystalmountainresort.com').rstrip('/')
+LOGIN_URL = f"{BASE_URL}/login/"
 
-def login(driver, username, password, log):
+
+def login(driver, username, password, log, timings=None):
     """
     Handle the login process.
 
@@ -18,10 +30,11 @@ def login(driver, username, password, log):
         username: Account username
         password: Account password
         log: Logging callback function
+        timings: Optional StepTimings to record waits in
     """
     # Navigate to website
     log("Navigating to login page...", "info")
-    driver.get("https://parking.crystalmountainresort.com/login/")
+    driver.get(LOGIN_URL)
     driver.maximize_window()
 
     # Click "Returning Users" button
@@ -59,13 +72,114 @@ def login(driver, username, password, log):
         sign_in_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, "//button[text()='Sign In']"))
         )
+        login_url = driver.current_url
         sign_in_button.click()
-        log("Signed in successfully", "info")
     except Exception as e:
         raise Exception(f"Failed to sign in: {e}")
 
-    # Wait for page to load
-    time.sleep(5)
+    # Wait for the signed-in page instead of a fixed delay
+    try:
+        wait_for(
+            driver,
+            EC.any_of(
+                EC.url_changes(login_url),
+                EC.presence_of_element_located((By.ID, "plate")),
+            ),
+            "sign_in",
+            timeout=20,
+            timings=timings,
+        )
+        wait_for(driver, document_ready, "sign_in_page_load", timeout=10, timings=timings)
+        log("Signed in successfully", "info")
+    except TimeoutException:
+        raise Exception("Failed to sign in: still on the login page after 20s")
+
+
+def restore_session(driver, cached, log):
+    """
+    Load cached cookies into the browser and check the session is still live.
+
+    Args:
+        driver: Selenium WebDriver instance
+        cached: Entry returned by SessionCache.get()
+        log: Logging callback function
+
+    Returns:
+        bool: True if the browser is signed in, False if the session is stale
+    """
+    log("Restoring cached session...", "info")
+
+    # Cookies can only be set for the domain currently loaded
+    driver.get(LOGIN_URL)
+    driver.delete_all_cookies()
+    for cookie in cached["cookies"]:
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            continue
+
+    driver.get(cached["landing_url"])
+
+    # A live session lands on the plate page instead of bouncing back to login
+    try:
+        WebDriverWait(driver, 5).until(
+            EC.presence_of_element_located((By.ID, "plate"))
+        )
+    except TimeoutException:
+        return False
+    return "/login" not in driver.current_url
+
+
+def login_with_cache(driver, username, password, log, session_cache=None, timings=None):
+    """
+    Sign in, reusing a cached session for this account when one is still valid.
+
+    Args:
+        driver: Selenium WebDriver instance
+        username: Account username
+        password: Account password
+        log: Logging callback function
+        session_cache: Optional SessionCache holding authenticated cookies
+        timings: Optional StepTimings to record waits in
+    """
+    if session_cache:
+        cached = session_cache.get(username, password)
+        if cached and restore_session(driver, cached, log):
+            log("Reused cached session, skipping login", "info")
+            return
+        if cached:
+            log("Cached session expired, signing in again", "info")
+            session_cache.invalidate(username)
+
+    login(driver, username, password, log, timings=timings)
+
+    if session_cache:
+        session_cache.put(username, password, driver.get_cookies(), driver.current_url)
+
+
+def match_plates(driver, license_plates):
+    """
+    Resolve several entered plates to their dropdown option text without selecting them.
+
+    Args:
+        driver: Selenium WebDriver instance on the plate page
+        license_plates: License plate numbers as entered by the user
+
+    Returns:
+        dict: {entered plate: option text}
+    """
+    options = WebDriverWait(driver, 10).until(lambda d: read_select_options(d, "plate"))
+    option_texts = [option["text"] for option in options]
+
+    matched = {}
+    for license_plate in license_plates:
+        for text in option_texts:
+            if plate_matches(license_plate, text):
+                matched[license_plate] = text
+                break
+        else:
+            raise Exception(f"No matching license plate found in dropdown for '{license_plate}'")
+    return matched
 
 
 def select_license_plate(driver, license_plate, log):
@@ -81,22 +195,19 @@ def select_license_plate(driver, license_plate, log):
         str: The matched license plate value
     """
     try:
-        dropdown = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "plate"))
-        )
-        select = Select(dropdown)
+        options = WebDriverWait(driver, 10).until(lambda d: read_select_options(d, "plate"))
 
         # Handle license plate input with fuzzy matching
         if license_plate.strip():
             matched_option = None
 
-            for option in select.options:
-                if license_plate.strip().lower().replace(" ", "") in option.text.strip().lower().replace(" ", ""):
-                    matched_option = option.text
+            for option in options:
+                if plate_matches(license_plate, option["text"]):
+                    matched_option = option["text"]
                     break
 
             if matched_option:
-                select.select_by_visible_text(matched_option)
+                select_option(driver, matched_option, "plate")
                 log(f"Selected license plate: {matched_option}", "info")
                 return matched_option
             else:
@@ -125,7 +236,178 @@ def click_add_more_days(driver, log):
         raise Exception(f"Failed to click 'Add More Days': {e}")
 
 
-def poll_for_availability(driver, date_base, log, refresh_rate=5, cancel_event=None):
+def resume_calendar(driver, calendar_url, log):
+    """
+    Go straight back to a calendar view recorded by an interrupted run.
+
+    Args:
+        driver: Selenium WebDriver instance with a logged-in session
+        calendar_url: URL of the calendar view reached before the interruption
+        log: Logging callback function
+
+    Returns:
+        bool: True if the calendar loaded, False if the plate and calendar
+              steps need to run again
+    """
+    try:
+        driver.get(calendar_url)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-date]")))
+        log("Resumed at the calendar view", "info")
+        return True
+    except Exception:
+        log("Could not reopen the calendar directly, selecting the plate again...", "info")
+        return False
+
+
+def next_poll_delay(scheduler, key, refresh_rate, error=False):
+    """
+    Seconds to wait before the next availability check.
+
+    Args:
+        scheduler: Optional PollScheduler sharing the request budget
+        key: Watch key returned by scheduler.register()
+        refresh_rate: Fixed delay used when no scheduler is given
+        error: True if the last check failed or timed out
+
+    Returns:
+        float: Delay in seconds
+    """
+    if scheduler:
+        return scheduler.next_delay(key, error=error)
+    return refresh_rate
+
+
+def wait_in_page(driver, date_bases, log, refresh_rate=5, cancel_event=None, max_errors=3, scheduler=None):
+    """
+    Poll the calendar from inside the page instead of reloading it.
+
+    Each check re-fetches the calendar in place, and between checks a
+    MutationObserver wakes the bot as soon as the page itself marks a
+    target day as open.
+
+    Args:
+        driver: Selenium WebDriver instance showing the calendar view
+        date_bases: Date strings in YYYY-MM-DD format
+        log: Logging callback function
+        refresh_rate: Seconds between checks when no scheduler is given (default: 5)
+        cancel_event: Optional threading.Event that stops polling when set
+        max_errors: Consecutive failed refetches before giving up
+        scheduler: Optional PollScheduler that paces checks
+
+    Returns:
+        bool: True once a date is open and clickable in the browser, False if
+              the calendar cannot be refetched in place and the browser should
+              poll by reloading instead
+    """
+    calendar = InPageCalendar(driver, date_bases)
+    log(f"Polling for availability on {', '.join(date_bases)} in the page...", "polling")
+    key = scheduler.register() if scheduler else None
+    errors = 0
+
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+
+            check_start = time.monotonic()
+            result = calendar.refetch()
+            if result["error"] or not result["found"]:
+                check_seconds = record_poll("inpage", check_start, failed=True)
+                errors += 1
+                if errors >= max_errors:
+                    log(f"In-page refresh failed ({result['error'] or 'no target dates on the page'}). "
+                        f"Falling back to page reloads.", "info")
+                    return False
+                delay = next_poll_delay(scheduler, key, refresh_rate, error=True)
+                log(f"Calendar refetch failed. Retrying in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                sleep_unless_cancelled(delay, cancel_event)
+                continue
+            errors = 0
+            check_seconds = record_poll("inpage", check_start)
+
+            opened = result["open"]
+            if not opened:
+                delay = next_poll_delay(scheduler, key, refresh_rate)
+                log(f"Dates unavailable. Checking again in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                if getattr(driver, "shared", False):
+                    # Blocking in the page would hold up every other tab in the shared browser
+                    sleep_unless_cancelled(delay, cancel_event)
+                    continue
+                opened = calendar.wait(delay)
+                if not opened:
+                    continue
+                result["mode"] = "calendar"
+
+            log(f"Date {opened} is open.", "success")
+            if result["mode"] == "fetch":
+                # Cells were patched from fetched HTML; reload once so the page's own click handlers apply
+                refresh_page(driver)
+                PAGE_REFRESHES_TOTAL.inc()
+            return True
+    finally:
+        if scheduler:
+            scheduler.unregister(key)
+
+
+def poll_for_any_date(driver, date_bases, log, refresh_rate=5, cancel_event=None, scheduler=None):
+    """
+    Poll the calendar until any of several dates opens, then click it.
+
+    Every date is evaluated from the same page load, so watching more dates
+    does not add refreshes.
+
+    Args:
+        driver: Selenium WebDriver instance
+        date_bases: Date strings in YYYY-MM-DD format, in order of preference
+        log: Logging callback function
+        refresh_rate: Seconds between refresh attempts when no scheduler is given (default: 5)
+        cancel_event: Optional threading.Event that stops polling when set
+        scheduler: Optional PollScheduler that paces refreshes
+
+    Returns:
+        str: The date_base that was opened and clicked
+    """
+    log(f"Polling for availability on {', '.join(date_bases)}...", "polling")
+    key = scheduler.register() if scheduler else None
+
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+
+            check_start = time.monotonic()
+            try:
+                # Wait for the calendar to render at least one of the target dates,
+                # reading every date's state in the same call
+                days = WebDriverWait(driver, 10).until(lambda d: read_calendar_cells(d, date_bases))
+                check_seconds = record_poll("browser", check_start)
+
+                for date_base in date_bases:
+                    # Check if the date is marked as "available"
+                    day = days.get(date_base)
+                    if day and day["available"]:
+                        log(f"Date {day['date']} is available! Clicking...", "success")
+                        day["element"].click()
+                        return date_base
+
+                delay = next_poll_delay(scheduler, key, refresh_rate)
+                log(f"Dates unavailable. Checking again in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                sleep_unless_cancelled(delay, cancel_event)
+                refresh_page(driver)
+                PAGE_REFRESHES_TOTAL.inc()
+            except TimeoutException:
+                check_seconds = record_poll("browser", check_start, failed=True)
+                delay = next_poll_delay(scheduler, key, refresh_rate, error=True)
+                log(f"Unable to locate date elements. Retrying in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                sleep_unless_cancelled(delay, cancel_event)
+                refresh_page(driver)
+                PAGE_REFRESHES_TOTAL.inc()
+    finally:
+        if scheduler:
+            scheduler.unregister(key)
+
+
+def poll_for_availability(driver, date_base, log, refresh_rate=5, cancel_event=None, scheduler=None):
     """
     Poll the calendar for date availability.
 
@@ -133,40 +415,217 @@ def poll_for_availability(driver, date_base, log, refresh_rate=5, cancel_event=N
         driver: Selenium WebDriver instance
         date_base: Base date string in YYYY-MM-DD format
         log: Logging callback function
-        refresh_rate: Seconds between refresh attempts (default: 5)
+        refresh_rate: Seconds between refresh attempts when no scheduler is given (default: 5)
+        cancel_event: Optional threading.Event that stops polling when set
+        scheduler: Optional PollScheduler that paces refreshes
     """
     log(f"Polling for availability on {date_base}...", "polling")
+    key = scheduler.register() if scheduler else None
+    found_logged = False
 
-    while True:
-        if cancel_event and cancel_event.is_set():
-            raise Exception("Reservation cancelled by user.")
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
 
-        try:
-            # Use starts-with to match any timestamp for the target date
-            calendar_day = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, f"//div[starts-with(@data-date, '{date_base}')]"))
-            )
-
-            # Get the actual data-date value for logging
-            actual_date = calendar_day.get_attribute("data-date")
-            log(f"Found calendar element: {actual_date}", "info")
-
-            # Check if the date is marked as "available"
-            if "fc-unavailable" not in calendar_day.get_attribute("class"):
-                log(f"Date {actual_date} is available! Clicking...", "success")
-                calendar_day.click()
-                break
-            else:
-                log(f"Date unavailable. Checking again in {refresh_rate}s...", "polling")
-                time.sleep(refresh_rate)
-                driver.refresh()
-        except TimeoutException:
-            log(f"Unable to locate date element. Retrying in {refresh_rate}s...", "polling")
-            time.sleep(refresh_rate)
-            driver.refresh()
+            check_start = time.monotonic()
+            try:
+                # Element, data-date and availability come back from a single call
+                calendar_day = WebDriverWait(driver, 10).until(
+                    lambda d: read_calendar_cells(d, [date_base]).get(date_base)
+                )
+                actual_date = calendar_day["date"]
+                if not found_logged:
+                    log(f"Found calendar element: {actual_date}", "info")
+                    found_logged = True
+
+                # Check if the date is marked as "available"
+                check_seconds = record_poll("browser", check_start)
+                if calendar_day["available"]:
+                    log(f"Date {actual_date} is available! Clicking...", "success")
+                    calendar_day["element"].click()
+                    break
+                else:
+                    delay = next_poll_delay(scheduler, key, refresh_rate)
+                    log(f"Date unavailable. Checking again in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                    sleep_unless_cancelled(delay, cancel_event)
+                    refresh_page(driver)
+                    PAGE_REFRESHES_TOTAL.inc()
+            except TimeoutException:
+                check_seconds = record_poll("browser", check_start, failed=True)
+                delay = next_poll_delay(scheduler, key, refresh_rate, error=True)
+                log(f"Unable to locate date element. Retrying in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                sleep_unless_cancelled(delay, cancel_event)
+                refresh_page(driver)
+                PAGE_REFRESHES_TOTAL.inc()
+    finally:
+        if scheduler:
+            scheduler.unregister(key)
+
+
+def wait_on_watcher(poller, date_base, log, watcher_registry, cancel_event=None):
+    """
+    Wait for a date through the shared per-date watcher instead of polling alone.
+
+    Every check the watcher runs while this session waits is logged with its
+    duration, so coalesced summaries count them like the session's own.
+
+    Args:
+        poller: HttpAvailabilityPoller bound to this session's cookies
+        date_base: Base date string in YYYY-MM-DD format
+        log: Logging callback function
+        watcher_registry: WatcherRegistry shared by all sessions
+        cancel_event: Optional threading.Event that stops waiting when set
+
+    Returns:
+        bool: True once the date is open, False if this session should poll in the browser
+    """
+    subscription = watcher_registry.subscribe(date_base, poller.check)
+    log(f"Watching {date_base} with other sessions waiting on this date...", "polling")
+
+    try:
+        # Wake often enough to notice a cancel promptly
+        while not subscription.wait(timeout=0.5):
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+            for check_seconds in subscription.take_checks():
+                log("Date still unavailable, watcher is checking...", "polling", check_seconds=check_seconds)
+    finally:
+        watcher_registry.unsubscribe(subscription)
+
+    if subscription.result == "available":
+        log(f"Date {date_base} is open.", "success")
+        return True
+
+    log("Calendar not readable over HTTP. Falling back to browser polling.", "info")
+    return False
 
 
-def complete_reservation(driver, license_plate, log):
+def wait_over_http(driver, date_base, log, refresh_rate=5, cancel_event=None, max_errors=3,
+                   watcher_registry=None, scheduler=None, poller=None):
+    """
+    Poll the calendar over HTTP while the browser stays parked on the page.
+
+    Args:
+        driver: Selenium WebDriver instance showing the calendar view
+        date_base: Base date string in YYYY-MM-DD format
+        log: Logging callback function
+        refresh_rate: Seconds between checks when no scheduler is given (default: 5)
+        cancel_event: Optional threading.Event that stops polling when set
+        max_errors: Consecutive request failures before giving up
+        watcher_registry: Optional WatcherRegistry to share polling with other sessions
+        scheduler: Optional PollScheduler that paces checks
+        poller: Optional HttpAvailabilityPoller to use instead of one built from the driver
+
+    Returns:
+        bool: True once the date is open, False if HTTP polling cannot see
+              the date and the browser should poll instead
+    """
+    poller = poller or HttpAvailabilityPoller.from_driver(driver)
+    if watcher_registry:
+        return wait_on_watcher(poller, date_base, log, watcher_registry, cancel_event=cancel_event)
+
+    log(f"Polling for availability on {date_base} over HTTP...", "polling")
+    key = scheduler.register() if scheduler else None
+    errors = 0
+
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+
+            check_start = time.monotonic()
+            try:
+                available = poller.check(date_base)
+                errors = 0
+                check_seconds = record_poll("http", check_start)
+            except Exception as e:
+                check_seconds = record_poll("http", check_start, failed=True)
+                errors += 1
+                if errors >= max_errors:
+                    log(f"HTTP polling failed ({e}). Falling back to browser polling.", "info")
+                    return False
+                delay = next_poll_delay(scheduler, key, refresh_rate, error=True)
+                log(f"Calendar request failed. Retrying in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                sleep_unless_cancelled(delay, cancel_event)
+                continue
+
+            if available is None:
+                log("Calendar not readable over HTTP. Falling back to browser polling.", "info")
+                return False
+            if available:
+                log(f"Date {date_base} is open.", "success")
+                return True
+
+            delay = next_poll_delay(scheduler, key, refresh_rate)
+            log(f"Date unavailable. Checking again in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+            sleep_unless_cancelled(delay, cancel_event)
+    finally:
+        if scheduler:
+            scheduler.unregister(key)
+
+
+def wait_over_http_for_any(driver, date_bases, log, refresh_rate=5, cancel_event=None, max_errors=3,
+                           scheduler=None):
+    """
+    Poll the calendar over HTTP until any of several dates opens.
+
+    Args:
+        driver: Selenium WebDriver instance showing the calendar view
+        date_bases: Date strings in YYYY-MM-DD format
+        log: Logging callback function
+        refresh_rate: Seconds between checks when no scheduler is given (default: 5)
+        cancel_event: Optional threading.Event that stops polling when set
+        max_errors: Consecutive request failures before giving up
+        scheduler: Optional PollScheduler that paces checks
+
+    Returns:
+        list: Open date_bases, or an empty list if the browser should poll instead
+    """
+    poller = HttpAvailabilityPoller.from_driver(driver)
+    log(f"Polling for availability on {', '.join(date_bases)} over HTTP...", "polling")
+    key = scheduler.register() if scheduler else None
+    errors = 0
+
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise Exception("Reservation cancelled by user.")
+
+            check_start = time.monotonic()
+            try:
+                states = poller.check_many(date_bases)
+                errors = 0
+                check_seconds = record_poll("http", check_start)
+            except Exception as e:
+                check_seconds = record_poll("http", check_start, failed=True)
+                errors += 1
+                if errors >= max_errors:
+                    log(f"HTTP polling failed ({e}). Falling back to browser polling.", "info")
+                    return []
+                delay = next_poll_delay(scheduler, key, refresh_rate, error=True)
+                log(f"Calendar request failed. Retrying in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+                sleep_unless_cancelled(delay, cancel_event)
+                continue
+
+            if all(state is None for state in states.values()):
+                log("Calendar not readable over HTTP. Falling back to browser polling.", "info")
+                return []
+
+            open_dates = [date_base for date_base in date_bases if states.get(date_base)]
+            if open_dates:
+                log(f"Open: {', '.join(open_dates)}. Reloading calendar in browser...", "success")
+                return open_dates
+
+            delay = next_poll_delay(scheduler, key, refresh_rate)
+            log(f"Dates unavailable. Checking again in {delay:.0f}s...", "polling", check_seconds=check_seconds)
+            sleep_unless_cancelled(delay, cancel_event)
+    finally:
+        if scheduler:
+            scheduler.unregister(key)
+
+
+def complete_reservation(driver, license_plate, log, timings=None, before_submit=None):
     """
     Complete the reservation and checkout process.
 
@@ -174,6 +633,22 @@ def complete_reservation(driver, license_plate, log):
         driver: Selenium WebDriver instance
         license_plate: License plate value to select in final dropdown
         log: Logging callback function
+        timings: Optional StepTimings to record waits in
+        before_submit: Optional callable checked right before 'Continue' is clicked;
+                       returning False aborts the checkout
+    """
+    click_reserve(driver, log, timings=timings)
+    submit_checkout(driver, license_plate, log, timings=timings, before_submit=before_submit)
+
+
+def click_reserve(driver, log, timings=None):
+    """
+    Put the opened date in the cart and wait for the checkout form.
+
+    Args:
+        driver: Selenium WebDriver instance showing the opened date
+        log: Logging callback function
+        timings: Optional StepTimings to record waits in
     """
     # Click "Reserve Car Parking" button
     try:
@@ -185,19 +660,40 @@ def complete_reservation(driver, license_plate, log):
     except Exception as e:
         raise Exception(f"Failed to click 'Reserve Car Parking' button: {e}")
 
-    # Wait for checkout form to load
-    time.sleep(3)
+    # Wait for checkout form to load: the calendar page goes away or the plate field shows up
+    try:
+        wait_for(
+            driver,
+            EC.any_of(
+                EC.staleness_of(reserve_button),
+                EC.visibility_of_element_located((By.ID, "plate")),
+            ),
+            "checkout_form",
+            timeout=10,
+            timings=timings,
+        )
+    except TimeoutException:
+        raise Exception("Checkout form did not load after 'Reserve Car Parking'")
+
+
+def submit_checkout(driver, license_plate, log, timings=None, before_submit=None):
+    """
+    Select the plate on the checkout form and submit it.
 
+    Args:
+        driver: Selenium WebDriver instance showing the checkout form
+        license_plate: License plate value to select in final dropdown
+        log: Logging callback function
+        timings: Optional StepTimings to record waits in
+        before_submit: Optional callable checked right before 'Continue' is clicked;
+                       returning False aborts the checkout
+    """
     # Bring window to front
     driver.execute_script("window.focus();")
 
-    # Select license plate in second dropdown
+    # Select license plate in second dropdown, as soon as the option is there
     try:
-        dropdown = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "plate"))
-        )
-        select = Select(dropdown)
-        select.select_by_visible_text(license_plate)
+        WebDriverWait(driver, 10).until(lambda d: select_option(d, license_plate, "plate"))
         log("Selected license plate in checkout", "info")
     except Exception as e:
         raise Exception(f"Failed to select license plate in checkout: {e}")
@@ -207,17 +703,105 @@ def complete_reservation(driver, license_plate, log):
         continue_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.ID, "btnCheckout"))
         )
+    except Exception as e:
+        raise Exception(f"Failed to click 'Continue' button: {e}")
+
+    if before_submit and not before_submit():
+        raise Exception("Checkout aborted before submitting.")
+
+    try:
+        checkout_url = driver.current_url
         continue_button.click()
         log("Clicked 'Continue' button", "info")
     except Exception as e:
         raise Exception(f"Failed to click 'Continue' button: {e}")
 
     # Wait for the submission to complete before the browser closes
-    time.sleep(5)
+    try:
+        wait_for_url_change(driver, checkout_url, "checkout_submit", timeout=15, timings=timings)
+    except TimeoutException:
+        # Some checkouts submit in place; give the request a chance to finish
+        wait_for_page_settled(driver, "checkout_settle", timeout=5, timings=timings)
     log("Checkout submitted, reservation confirmed.", "info")
 
 
-def run_reservation(username, password, license_plate, date_str, progress_callback=None, cancel_event=None):
+class SeleniumEngine(ReservationEngine):
+    """Reservation steps clicked through in Chrome, built from the functions above."""
+
+    name = "browser"
+
+    def __init__(self, driver, session_cache=None, timings=None, http_polling=True, in_page_polling=True):
+        """
+        Args:
+            driver: Selenium WebDriver instance (or WatchedDriver) leased for the run
+            session_cache: Optional SessionCache used to skip login on repeat runs
+            timings: Optional StepTimings to record waits in
+            http_polling: Poll the calendar over HTTP instead of refreshing the browser
+            in_page_polling: When HTTP polling is off or cannot read the calendar, refetch it
+                             inside the page instead of reloading it
+        """
+        self.driver = driver
+        self.session_cache = session_cache
+        self.timings = timings
+        self.http_polling = http_polling
+        self.in_page_polling = in_page_polling
+
+    def login(self, username, password, log):
+        login_with_cache(self.driver, username, password, log, self.session_cache, timings=self.timings)
+
+    def select_plate(self, license_plate, log):
+        return select_license_plate(self.driver, license_plate, log)
+
+    def open_calendar(self, log):
+        click_add_more_days(self.driver, log)
+
+    def resume_calendar(self, calendar_url, log):
+        return resume_calendar(self.driver, calendar_url, log)
+
+    @property
+    def calendar_url(self):
+        return self.driver.current_url
+
+    def wait_for_date(self, date_base, log, cancel_event=None, watcher_registry=None, scheduler=None):
+        # Over HTTP first when the calendar is server-rendered; ends with the day clicked
+        if self.http_polling and wait_over_http(self.driver, date_base, log, cancel_event=cancel_event,
+                                                watcher_registry=watcher_registry, scheduler=scheduler):
+            refresh_page(self.driver)
+            PAGE_REFRESHES_TOTAL.inc()
+        elif self.in_page_polling:
+            wait_in_page(self.driver, [date_base], log, cancel_event=cancel_event, scheduler=scheduler)
+        poll_for_availability(self.driver, date_base, log, cancel_event=cancel_event, scheduler=scheduler)
+
+    def add_to_cart(self, date_base, log):
+        # wait_for_date already clicked the day
+        click_reserve(self.driver, log, timings=self.timings)
+
+    def checkout(self, matched_plate, log, before_submit=None):
+        submit_checkout(self.driver, matched_plate, log, timings=self.timings, before_submit=before_submit)
+
+
+def parse_date(date_str):
+    """
+    Normalize a user-entered date.
+
+    Args:
+        date_str: Date in YYYY/MM/DD or YYYY-MM-DD format
+
+    Returns:
+        str: Date in YYYY-MM-DD format
+    """
+    for fmt in ("%Y/%m/%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date_str.strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise Exception("Invalid date format. Please use YYYY/MM/DD or YYYY-MM-DD format.")
+
+
+def run_reservation(username, password, license_plate, date_str, progress_callback=None, cancel_event=None,
+                    driver_pool=None, session_cache=None, http_polling=True, watcher_registry=None,
+                    poll_scheduler=None, in_page_polling=True, summary_interval=30, on_phase=None,
+                    resume_state=None, memory_watchdog=None, echo=True, engine="browser", http_pool=None):
     """
     Main reservation function that coordinates the entire workflow.
 
@@ -227,61 +811,253 @@ def run_reservation(username, password, license_plate, date_str, progress_callba
         license_plate: License plate number
         date_str: Date in YYYY/MM/DD format
         progress_callback: Optional callback function(message, status) for status updates
+        cancel_event: Optional threading.Event that stops the run when set
+        driver_pool: Optional DriverPool to lease a warm browser from
+        session_cache: Optional SessionCache used to skip login on repeat runs
+        http_polling: Poll the calendar over HTTP instead of refreshing the browser
+        watcher_registry: Optional WatcherRegistry so sessions on the same date share one poller
+        poll_scheduler: Optional PollScheduler that paces polling against a global budget
+        in_page_polling: When HTTP polling is off or cannot read the calendar, refetch it
+                         inside the page instead of reloading it
+        summary_interval: Minimum seconds between coalesced polling updates (default: 30)
+        on_phase: Optional callback function(phase, state) called as the run enters each
+                  phase, with progress worth keeping if the run is interrupted
+        resume_state: Progress recorded by an interrupted run; skips the plate and calendar
+                      steps when its calendar view can be reopened
+        memory_watchdog: Optional MemoryWatchdog that replaces the browser mid-watch once it
+                         grows too large, keeping its cookies and page
+        echo: Also print every message to stdout (default: True)
+        engine: "browser" to drive Chrome throughout, or "http" to run without a browser
+                and continue in Chrome from the same step if a page needs one
+        http_pool: Optional urllib3.PoolManager shared by browserless runs
 
     Returns:
-        dict: {"success": bool, "message": str}
+        dict: {"success": bool, "message": str, "engine": str, "wait_timings": dict,
+               "phase_timings": dict}
     """
-    def log(message, status="info"):
-        """Internal logging function that calls progress callback if provided"""
-        if progress_callback:
-            progress_callback(message, status)
-        print(f"[{status.upper()}] {message}")
+    run = ReservationRun(progress_callback, cancel_event, driver_pool=driver_pool,
+                         memory_watchdog=memory_watchdog, summary_interval=summary_interval, echo=echo)
+    log = run.log
+    timings = run.timings
+    phase_timings = run.phase_timings
+
+    current = {"phase": None, "engine": None}
+    # Progress made so far, handed to the browser if the HTTP engine gives up
+    progress = {}
+
+    def phase(name, **state):
+        current["phase"] = name
+        progress.update(state)
+        if on_phase:
+            on_phase(name, state)
 
     driver = None
+    resume_state = resume_state or {}
+
+    def reserve(steps, date_base):
+        current["engine"] = steps.name
+
+        # Login phase
+        phase("login")
+        with timed_phase("login", phase_timings):
+            steps.login(username, password, log)
+
+        matched_plate = resume_state.get("matched_plate")
+        calendar_url = resume_state.get("calendar_url")
+        if not (matched_plate and calendar_url and steps.resume_calendar(calendar_url, log)):
+            # License plate selection
+            phase("select_license_plate")
+            with timed_phase("select_license_plate", phase_timings):
+                matched_plate = steps.select_plate(license_plate, log)
+
+            # Navigate to calendar
+            phase("click_add_more_days", matched_plate=matched_plate)
+            with timed_phase("click_add_more_days", phase_timings):
+                steps.open_calendar(log)
+
+        # Poll for availability
+        phase("poll_for_availability", calendar_url=steps.calendar_url)
+        with timed_phase("poll_for_availability", phase_timings):
+            steps.wait_for_date(date_base, log, cancel_event=cancel_event,
+                                watcher_registry=watcher_registry, scheduler=poll_scheduler)
+
+        # Complete reservation
+        phase("complete_reservation")
+        with timed_phase("complete_reservation", phase_timings):
+            steps.add_to_cart(date_base, log)
+            steps.checkout(matched_plate, log, before_submit=lambda: not run.cancelled())
+
+        return run.succeed("Reservation completed successfully!", engine=steps.name)
 
     try:
         # Validate and process date
         log("Validating date format...", "info")
-        date_obj = None
-        for fmt in ("%Y/%m/%d", "%Y-%m-%d"):
-            try:
-                date_obj = datetime.strptime(date_str, fmt)
-                break
-            except ValueError:
-                continue
-        if date_obj is None:
-            raise Exception("Invalid date format. Please use YYYY/MM/DD or YYYY-MM-DD format.")
-        date_base = date_obj.strftime("%Y-%m-%d")
+        date_base = parse_date(date_str)
         log(f"Looking for date: {date_base}", "info")
 
+        if engine == "http":
+            try:
+                return reserve(HttpEngine(LOGIN_URL, http=http_pool, session_cache=session_cache), date_base)
+            except EngineFallback as e:
+                ENGINE_FALLBACKS_TOTAL.inc(phase=current["phase"])
+                log(f"{e}. Continuing in the browser...", "info")
+                # Pick up where the HTTP run got to: plate matched, calendar found
+                resume_state = dict(resume_state, **progress)
+
         # Initialize driver
         log("Initializing browser...", "info")
-        driver = setup_driver()
+        current["engine"] = SeleniumEngine.name
+        phase("setup_driver")
+        with timed_phase("setup_driver", phase_timings):
+            driver = run.lease_driver()
+
+        return reserve(
+            SeleniumEngine(driver, session_cache=session_cache, timings=timings,
+                           http_polling=http_polling, in_page_polling=in_page_polling),
+            date_base,
+        )
+
+    except Exception as e:
+        return run.fail(e, engine=current["engine"])
+
+    finally:
+        run.close()
+        run.release_driver(driver, discard=run.failed)
+
+
+def run_batch_reservation(username, password, targets, progress_callback=None, cancel_event=None,
+                          max_bookings=1, driver_pool=None, session_cache=None, http_polling=True,
+                          poll_scheduler=None, in_page_polling=True, summary_interval=30, on_phase=None,
+                          resume_state=None, memory_watchdog=None):
+    """
+    Watch several dates and plates from one logged-in browser session.
+
+    Logs in once, evaluates every target date from the same calendar page
+    load, and books whichever dates open first until max_bookings is reached.
+
+    Args:
+        username: Account username
+        password: Account password
+        targets: List of {"date": str, "license_plate": str} in order of preference
+        progress_callback: Optional callback function(message, status) for status updates
+        cancel_event: Optional threading.Event that stops the run when set
+        max_bookings: Stop after this many successful bookings (default: 1)
+        driver_pool: Optional DriverPool to lease a warm browser from
+        session_cache: Optional SessionCache used to skip login on repeat runs
+        http_polling: Poll the calendar over HTTP instead of refreshing the browser
+        poll_scheduler: Optional PollScheduler that paces polling against a global budget
+        in_page_polling: When HTTP polling is off or cannot read the calendar, refetch it
+                         inside the page instead of reloading it
+        summary_interval: Minimum seconds between coalesced polling updates (default: 30)
+        on_phase: Optional callback function(phase, state) called as the run enters each
+                  phase, with progress worth keeping if the run is interrupted
+        resume_state: Progress recorded by an interrupted run; dates it already booked are
+                      skipped and its calendar view is reopened directly when possible
+        memory_watchdog: Optional MemoryWatchdog that replaces the browser mid-watch once it
+                         grows too large, keeping its cookies and page
+
+    Returns:
+        dict: {"success": bool, "message": str, "booked": list, "wait_timings": dict,
+               "phase_timings": dict}
+    """
+    run = ReservationRun(progress_callback, cancel_event, driver_pool=driver_pool,
+                         memory_watchdog=memory_watchdog, summary_interval=summary_interval)
+    log = run.log
+    timings = run.timings
+    phase_timings = run.phase_timings
+
+    def phase(name, **state):
+        if on_phase:
+            on_phase(name, state)
+
+    driver = None
+    resume_state = resume_state or {}
+    booked = list(resume_state.get("booked", []))
+
+    try:
+        if not targets:
+            raise Exception("At least one date is required")
+
+        log("Validating dates...", "info")
+        remaining = [
+            {"date": parse_date(t["date"]), "license_plate": t["license_plate"].strip()}
+            for t in targets
+        ]
+        if any(not t["license_plate"] for t in remaining):
+            raise Exception("License plate cannot be empty")
+        if booked:
+            # Dates an interrupted run already booked still count toward max_bookings
+            remaining = [t for t in remaining if t not in booked]
+            log(f"Already booked before the restart: {', '.join(t['date'] for t in booked)}", "info")
+            if not remaining or len(booked) >= max_bookings:
+                message = f"Booked {len(booked)} reservation(s): " + ", ".join(t["date"] for t in booked)
+                log(message, "success")
+                return run.result(True, message, booked=booked)
+        log(f"Looking for dates: {', '.join(sorted({t['date'] for t in remaining}))}", "info")
+
+        # Initialize driver
+        log("Initializing browser...", "info")
+        phase("setup_driver")
+        with timed_phase("setup_driver", phase_timings):
+            driver = run.lease_driver()
 
         # Login phase
-        login(driver, username, password, log)
+        phase("login")
+        with timed_phase("login", phase_timings):
+            login_with_cache(driver, username, password, log, session_cache, timings=timings)
 
-        # License plate selection
-        matched_plate = select_license_plate(driver, license_plate, log)
+        plate_options = resume_state.get("plate_options") or {}
+        calendar_url = resume_state.get("calendar_url")
+        if not (all(t["license_plate"] in plate_options for t in remaining) and calendar_url
+                and resume_calendar(driver, calendar_url, log)):
+            # Resolve every plate on the plate page, then select the first one
+            phase("select_license_plate")
+            with timed_phase("select_license_plate", phase_timings):
+                plate_options = match_plates(driver, [t["license_plate"] for t in remaining])
+                select_license_plate(driver, remaining[0]["license_plate"], log)
 
-        # Navigate to calendar
-        click_add_more_days(driver, log)
+            # Navigate to calendar
+            phase("click_add_more_days", plate_options=plate_options)
+            with timed_phase("click_add_more_days", phase_timings):
+                click_add_more_days(driver, log)
+            calendar_url = driver.current_url
 
-        # Poll for availability
-        poll_for_availability(driver, date_base, log, cancel_event=cancel_event)
+        while remaining and len(booked) < max_bookings:
+            date_bases = list(dict.fromkeys(t["date"] for t in remaining))
 
-        # Complete reservation
-        complete_reservation(driver, matched_plate, log)
+            # Poll for availability, over HTTP first when the calendar is server-rendered
+            phase("poll_for_availability", calendar_url=calendar_url)
+            with timed_phase("poll_for_availability", phase_timings):
+                if http_polling and wait_over_http_for_any(driver, date_bases, log, cancel_event=cancel_event,
+                                                           scheduler=poll_scheduler):
+                    refresh_page(driver)
+                    PAGE_REFRESHES_TOTAL.inc()
+                elif in_page_polling:
+                    wait_in_page(driver, date_bases, log, cancel_event=cancel_event, scheduler=poll_scheduler)
+                opened = poll_for_any_date(driver, date_bases, log, cancel_event=cancel_event,
+                                           scheduler=poll_scheduler)
+
+            target = next(t for t in remaining if t["date"] == opened)
+            phase("complete_reservation")
+            with timed_phase("complete_reservation", phase_timings):
+                complete_reservation(driver, plate_options[target["license_plate"]], log, timings=timings,
+                                     before_submit=lambda: not run.cancelled())
+            remaining.remove(target)
+            booked.append(target)
+            phase("booked", booked=booked)
+            log(f"Booked {target['date']} for {target['license_plate']} "
+                f"({len(booked)} of {max_bookings})", "success")
+
+            if remaining and len(booked) < max_bookings:
+                driver.get(calendar_url)
 
-        log("Reservation completed successfully!", "success")
-        return {"success": True, "message": "Reservation completed successfully!"}
+        message = f"Booked {len(booked)} reservation(s): " + ", ".join(t["date"] for t in booked)
+        return run.succeed(message, booked=booked)
 
     except Exception as e:
-        error_msg = str(e)
-        log(f"Error: {error_msg}", "error")
-        return {"success": False, "message": error_msg}
+        note = f" (already booked: {', '.join(t['date'] for t in booked)})" if booked else ""
+        return run.fail(e, note=note, booked=booked)
 
     finally:
-        if driver:
-            log("Closing browser...", "info")
-            driver.quit()
+        run.close()
+        run.release_driver(driver, discard=run.failed)
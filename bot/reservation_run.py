@@ -0,0 +1,139 @@
+from bot.driver_manager import CancelGuard, kill_driver, setup_driver
+from bot.memory_watchdog import WatchedDriver
+from bot.metrics import RESERVATIONS_TOTAL
+from bot.progress import ProgressCoalescer
+from bot.waits import StepTimings
+
+
+class ReservationRun:
+    """
+    Plumbing shared by the single-date, batch and release-time runs.
+
+    Owns the run's progress log, its step and phase timings, and the
+    browsers it leases: each one is guarded so a cancel tears it down at
+    once, and is handed back to the pool (or quit) when the run ends. It
+    also builds the result dict every run returns.
+    """
+
+    def __init__(self, progress_callback=None, cancel_event=None, driver_pool=None, memory_watchdog=None,
+                 summary_interval=30, echo=True):
+        """
+        Args:
+            progress_callback: Optional callback function(message, status) for status updates
+            cancel_event: Optional threading.Event that stops the run when set
+            driver_pool: Optional DriverPool to lease warm browsers from
+            memory_watchdog: Optional MemoryWatchdog that replaces a browser mid-watch once it
+                             grows too large, keeping its cookies and page
+            summary_interval: Minimum seconds between coalesced polling updates (default: 30)
+            echo: Also print every message to stdout (default: True)
+        """
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.driver_pool = driver_pool
+        self.memory_watchdog = memory_watchdog
+        self.echo = echo
+        # Repeated polling updates are folded into periodic summaries
+        self.log = ProgressCoalescer(self._emit, interval=summary_interval)
+        self.timings = StepTimings()
+        self.phase_timings = StepTimings()
+        self.failed = False
+        # Kills the browsers the moment the run is cancelled, whatever they are waiting on
+        self.guard = CancelGuard(cancel_event)
+
+    def cancelled(self):
+        return bool(self.cancel_event and self.cancel_event.is_set())
+
+    def lease_driver(self, log=None, watch=True):
+        """
+        Lease a browser for the run and guard it against cancellation.
+
+        Args:
+            log: Logging callback for the memory watchdog (default: the run's log)
+            watch: Let the memory watchdog replace the browser when it grows too large
+
+        Returns:
+            webdriver.Chrome or WatchedDriver: The leased browser
+        """
+        driver = self.driver_pool.acquire() if self.driver_pool else setup_driver()
+        if watch and self.memory_watchdog:
+            driver = self.memory_watchdog.watch(driver, self.driver_pool, log or self.log)
+        self.guard.attach(driver)
+        return driver
+
+    def release_driver(self, driver, discard=False, kill=False, announce=True):
+        """
+        Hand a leased browser back to the pool, or quit it.
+
+        Args:
+            driver: Browser returned by lease_driver()
+            discard: Do not reuse the browser
+            kill: Kill the browser first so a page load in flight does not hold up the teardown
+            announce: Log that the browser is being returned or closed
+        """
+        if driver is None:
+            return
+        self.guard.detach(driver)
+        if isinstance(driver, WatchedDriver):
+            # Hand back whichever browser the run ended on
+            driver = driver.driver
+        if kill:
+            kill_driver(driver)
+        if self.driver_pool:
+            if announce:
+                self.log("Returning browser to pool...", "info")
+            self.driver_pool.release(driver, discard=discard)
+            return
+        if announce:
+            self.log("Closing browser...", "info")
+        try:
+            driver.quit()
+        except Exception:
+            # Already killed by the cancel guard
+            pass
+
+    def close(self):
+        """Stop watching the cancel flag."""
+        self.guard.close()
+
+    def result(self, success, message, **extra):
+        """
+        Returns:
+            dict: {"success", "message", "wait_timings", "phase_timings"} plus extra
+        """
+        result = {"success": success, "message": message}
+        result.update(extra)
+        result["wait_timings"] = self.timings.summary()
+        result["phase_timings"] = self.phase_timings.summary()
+        return result
+
+    def succeed(self, message, **extra):
+        """Count and report a successful run."""
+        RESERVATIONS_TOTAL.inc(result="success")
+        self.log(message, "success")
+        return self.result(True, message, **extra)
+
+    def fail(self, error, note="", **extra):
+        """
+        Count and report a failed or cancelled run.
+
+        Args:
+            error: Exception that ended the run
+            note: Optional text appended to the error message
+        """
+        self.failed = True
+        if self.cancelled():
+            # Whatever failed after a cancel was most likely the guard tearing the browser down
+            RESERVATIONS_TOTAL.inc(result="cancelled")
+            message = "Reservation cancelled by user."
+        else:
+            RESERVATIONS_TOTAL.inc(result="error")
+            message = str(error)
+        message += note
+        self.log(f"Error: {message}", "error")
+        return self.result(False, message, **extra)
+
+    def _emit(self, message, status):
+        if self.progress_callback:
+            self.progress_callback(message, status)
+        if self.echo:
+            print(f"[{status.upper()}] {message}")
@@ -0,0 +1,145 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+from cryptography.fernet import Fernet, InvalidToken
+
+from bot.keys import load_or_create_key
+
+# PBKDF2 rounds for the credential check stored with each entry
+CREDENTIAL_ROUNDS = 100_000
+
+
+class SessionCache:
+    """
+    Per-account cache of authenticated browser cookies.
+
+    Entries are stored on disk encrypted with Fernet, keyed by a hash of the
+    username, and expire after a fixed TTL. The Fernet token timestamp is
+    used for the TTL check, so stale entries are rejected before any cookie
+    is handed back to a browser.
+
+    Each entry also holds a salted hash of the username and password that
+    stored it, and is only handed back to a caller presenting the same
+    credentials; knowing a username is not enough to get its session.
+    """
+
+    def __init__(self, directory, key=None, ttl=1800):
+        """
+        Args:
+            directory: Folder where encrypted entries are written
+            key: Fernet key (bytes or str); if omitted, a key generated once and kept in
+                 the directory is used, so every worker sharing the directory can read it
+            ttl: Seconds an entry stays valid after it was stored
+        """
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._fernet = Fernet(key or load_or_create_key(os.path.join(directory, 'cache.key')))
+        self._lock = threading.Lock()
+
+    def get(self, username, password):
+        """
+        Look up a cached session.
+
+        Args:
+            username: Account username
+            password: Account password; must match the one the session was stored with
+
+        Returns:
+            dict: {"cookies": list, "landing_url": str} or None if missing, expired
+                  or stored for other credentials
+        """
+        path = self._path(username)
+        try:
+            with open(path, 'rb') as f:
+                token = f.read()
+            payload = self._fernet.decrypt(token, ttl=self.ttl)
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, OSError):
+            self.invalidate(username)
+            return None
+        entry = json.loads(payload)
+        credential = entry.get("credential")
+        if not credential:
+            # Written before entries were bound to credentials
+            self.invalidate(username)
+            return None
+        expected = self._credential_hash(username, password, bytes.fromhex(credential["salt"]))
+        if not hmac.compare_digest(expected, credential["hash"]):
+            return None
+        return {"cookies": entry["cookies"], "landing_url": entry["landing_url"]}
+
+    def put(self, username, password, cookies, landing_url):
+        """
+        Store the cookies of a freshly authenticated browser.
+
+        Args:
+            username: Account username
+            password: Account password the session was signed in with
+            cookies: List of cookie dicts from driver.get_cookies()
+            landing_url: URL the browser was on right after signing in
+        """
+        salt = os.urandom(16)
+        payload = json.dumps({
+            "cookies": cookies,
+            "landing_url": landing_url,
+            "credential": {"salt": salt.hex(), "hash": self._credential_hash(username, password, salt)},
+        }).encode()
+        token = self._fernet.encrypt(payload)
+        path = self._path(username)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(token)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, path)
+
+    def invalidate(self, username):
+        """Drop the cached session for an account."""
+        try:
+            os.remove(self._path(username))
+        except FileNotFoundError:
+            pass
+
+    def _credential_hash(self, username, password, salt):
+        secret = f"{username.strip().lower()}\0{password}".encode()
+        return hashlib.pbkdf2_hmac('sha256', secret, salt, CREDENTIAL_ROUNDS).hex()
+
+    def _path(self, username):
+        digest = hashlib.sha256(username.strip().lower().encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.session")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_session_cache():
+    """
+    Return the process-wide session cache, creating it from environment settings.
+
+    Environment:
+        SESSION_CACHE_KEY: Fernet key shared by workers (default: generated once and
+                           stored as cache.key in SESSION_CACHE_DIR)
+        SESSION_CACHE_DIR: Folder for encrypted entries (default: system temp dir)
+        SESSION_CACHE_TTL: Seconds a cached login stays valid (default: 1800)
+
+    Returns:
+        SessionCache: Shared cache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SessionCache(
+                directory=os.getenv(
+                    'SESSION_CACHE_DIR',
+                    os.path.join(tempfile.gettempdir(), 'crystal_parking_sessions')
+                ),
+                key=os.getenv('SESSION_CACHE_KEY'),
+                ttl=int(os.getenv('SESSION_CACHE_TTL', '1800')),
+            )
+        return _cache
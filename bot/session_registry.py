@@ -0,0 +1,188 @@
+import heapq
+import os
+import threading
+import time
+
+
+class SessionRegistry:
+    """
+    Tracks every reservation session in this worker and expires it.
+
+    Each session records when it was created and last active. Sessions with
+    a job queued, scheduled or running never expire; once the job finishes
+    the session is kept for finished_ttl seconds so the status page can read
+    (or reconnect for) the final message, and a session with no job is
+    dropped after idle_ttl seconds without activity. Deadlines sit in a
+    min-heap, and a single reaper thread pops whatever is due and deletes it
+    from the broker, so cleanup costs one thread in total instead of one
+    sleeping thread per finished stream.
+    """
+
+    def __init__(self, broker, idle_ttl=900, finished_ttl=120, tick=1):
+        """
+        Args:
+            broker: Session broker holding each session's messages and cancel flag
+            idle_ttl: Seconds a session without a running job survives without activity
+            finished_ttl: Seconds a session is kept after its job finished
+            tick: Seconds between reaper passes
+        """
+        self.broker = broker
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.tick = tick
+        self._sessions = {}  # session_id -> {"created", "last_activity", "active", "finished", "expires"}
+        self._heap = []  # (expires, session_id); stale entries are skipped when popped
+        self._lock = threading.Lock()
+        self._started = False
+        self._stats = {"created": 0, "evicted_idle": 0, "evicted_finished": 0}
+
+    def start(self):
+        """Start the reaper thread (once per process)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        def loop():
+            while True:
+                time.sleep(self.tick)
+                try:
+                    self.reap()
+                except Exception as e:
+                    print(f"[ERROR] Session reaper pass failed: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def open(self, session_id, active=True):
+        """
+        Register a session and create it in the broker if it does not exist yet.
+
+        Args:
+            session_id: Reservation session ID
+            active: True if a job for this session is about to be queued or run
+        """
+        if not self.broker.exists(session_id):
+            self.broker.create_session(session_id)
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = {
+                "created": now,
+                "last_activity": now,
+                "active": active,
+                "finished": None,
+                "expires": None,
+            }
+            self._stats["created"] += 1
+            self._schedule(session_id)
+
+    def touch(self, session_id):
+        """Record activity on a session (a published message or a connected stream)."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["last_activity"] = time.time()
+            self._schedule(session_id)
+
+    def finish(self, session_id):
+        """Mark a session's job as done; the session expires finished_ttl seconds later."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session["finished"] is not None:
+                return
+            session["active"] = False
+            session["finished"] = time.time()
+            self._schedule(session_id)
+
+    def evict(self, session_id):
+        """Drop a session right away, e.g. when its job was never accepted."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        self.broker.delete(session_id)
+
+    def reap(self, now=None):
+        """
+        Evict every session whose deadline has passed.
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires, session_id = heapq.heappop(self._heap)
+                session = self._sessions.get(session_id)
+                # Skip entries superseded by a later touch or finish
+                if session is None or session["expires"] != expires:
+                    continue
+                del self._sessions[session_id]
+                key = "evicted_finished" if session["finished"] is not None else "evicted_idle"
+                self._stats[key] += 1
+                due.append(session_id)
+
+        for session_id in due:
+            self.broker.delete(session_id)
+        return len(due)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Live, active and finished session counts, plus sessions created
+                  and evicted (idle or finished) by this worker
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["live"] = len(self._sessions)
+            stats["active"] = sum(1 for s in self._sessions.values() if s["active"])
+            stats["finished"] = sum(1 for s in self._sessions.values() if s["finished"] is not None)
+        return stats
+
+    def _schedule(self, session_id):
+        # Caller holds self._lock
+        session = self._sessions[session_id]
+        if session["active"]:
+            session["expires"] = None
+            return
+        if session["finished"] is not None:
+            expires = session["finished"] + self.finished_ttl
+        else:
+            expires = session["last_activity"] + self.idle_ttl
+        if expires == session["expires"]:
+            return
+        session["expires"] = expires
+        heapq.heappush(self._heap, (expires, session_id))
+
+        # Touches leave stale entries behind; rebuild before they outnumber live ones
+        if len(self._heap) > 2 * len(self._sessions) + 64:
+            self._heap = [(s["expires"], sid) for sid, s in self._sessions.items() if s["expires"] is not None]
+            heapq.heapify(self._heap)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry(broker):
+    """
+    Return the process-wide session registry, creating it from environment settings.
+
+    Environment:
+        SESSION_IDLE_TTL: Seconds a session without a running job is kept without activity (default: 900)
+        SESSION_FINISHED_TTL: Seconds a session is kept after its job finished (default: 120)
+
+    Args:
+        broker: Session broker the registry deletes expired sessions from
+
+    Returns:
+        SessionRegistry: Shared registry instance
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SessionRegistry(
+                broker,
+                idle_ttl=float(os.getenv('SESSION_IDLE_TTL', '900')),
+                finished_ttl=float(os.getenv('SESSION_FINISHED_TTL', '120')),
+            )
+        return _registry
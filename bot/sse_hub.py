@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+
+from bot.broker import DEFAULT_BUFFER_SIZE
+
+# Sentinel pushed to every client by the keepalive timer
+KEEPALIVE = object()
+
+# Sentinel pushed when a client's session disappears from the broker
+CLOSED = object()
+
+
+class StreamClient:
+    """One connected SSE client. The streaming response reads from its queue."""
+
+    def __init__(self, session_id, after_id=0, max_pending=DEFAULT_BUFFER_SIZE):
+        """
+        Args:
+            session_id: Reservation session ID
+            after_id: Event ID of the last message already delivered
+            max_pending: Items the queue holds before the client counts as behind;
+                         at least the broker's replay buffer so a reconnect fits
+        """
+        self.session_id = session_id
+        self.last_id = after_id
+        self.queue = queue.Queue(maxsize=max_pending)
+
+    def push(self, item):
+        """
+        Queue an item unless the client has fallen behind.
+
+        Returns:
+            bool: False if the queue is full and the item was not queued
+        """
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self):
+        """End the stream, making room for the sentinel if the client has fallen behind."""
+        while not self.push(CLOSED):
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class StreamHub:
+    """
+    Fans broker messages out to connected SSE clients.
+
+    A single dispatcher thread reads new messages for every session that has
+    a client and a single timer sends keepalives, so an idle client costs a
+    queue entry rather than a thread blocked in its own timed wait. Under a
+    cooperative worker (gunicorn -k gevent) each streaming response is a
+    greenlet parked on its queue, which lets a worker hold thousands of
+    mostly idle streams.
+    """
+
+    def __init__(self, broker, tick=0.25, keepalive_interval=15):
+        """
+        Args:
+            broker: Session broker to read messages from
+            tick: Seconds between dispatcher passes
+            keepalive_interval: Seconds between keepalive comments
+        """
+        self.broker = broker
+        # A replay of the whole buffer must fit in a new client's queue
+        self.max_pending = broker.buffer_size
+        self.tick = tick
+        self.keepalive_interval = keepalive_interval
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._dispatch, daemon=True).start()
+        threading.Thread(target=self._keepalive, daemon=True).start()
+
+    def subscribe(self, session_id, after_id=0):
+        """
+        Register a client for a session's messages.
+
+        Args:
+            session_id: Reservation session ID
+            after_id: Only deliver messages with a larger event ID
+
+        Returns:
+            StreamClient: Client whose queue receives (event_id, message) pairs
+        """
+        self.start()
+        client = StreamClient(session_id, after_id, max_pending=self.max_pending)
+        with self._lock:
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of connected clients and distinct sessions streamed
+        """
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "sessions": len({c.session_id for c in self._clients}),
+            }
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                clients = list(self._clients)
+
+            # Read each session once, then hand messages to all of its clients
+            by_session = {}
+            for client in clients:
+                by_session.setdefault(client.session_id, []).append(client)
+
+            for session_id, session_clients in by_session.items():
+                after_id = min(c.last_id for c in session_clients)
+                try:
+                    messages = self.broker.read(session_id, after_id=after_id, timeout=0)
+                except Exception as e:
+                    print(f"[ERROR] Stream dispatch failed for {session_id}: {e}")
+                    continue
+
+                for client in session_clients:
+                    if messages is None:
+                        client.close()
+                        self.unsubscribe(client)
+                        continue
+                    for event_id, message in messages:
+                        if event_id <= client.last_id:
+                            continue
+                        if not client.push((event_id, message)):
+                            # Behind: retry from here on the next pass instead of skipping ahead
+                            break
+                        client.last_id = event_id
+
+            time.sleep(self.tick)
+
+    def _keepalive(self):
+        while True:
+            time.sleep(self.keepalive_interval)
+            with self._lock:
+                clients = list(self._clients)
+            for client in clients:
+                client.push(KEEPALIVE)
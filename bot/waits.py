@@ -0,0 +1,140 @@
+import threading
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+
+class StepTimings:
+    """Records how long each named wait actually took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._steps.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        """
+        Returns:
+            dict: {step name: {"count": int, "total": float, "max": float}}
+        """
+        with self._lock:
+            return {
+                name: {
+                    "count": len(values),
+                    "total": round(sum(values), 3),
+                    "max": round(max(values), 3),
+                }
+                for name, values in self._steps.items()
+            }
+
+
+def sleep_unless_cancelled(seconds, cancel_event=None):
+    """Sleep, waking early and raising if the reservation is cancelled."""
+    if cancel_event:
+        if cancel_event.wait(seconds):
+            raise Exception("Reservation cancelled by user.")
+    else:
+        time.sleep(seconds)
+
+
+def wait_for(driver, condition, name, timeout=10, timings=None, poll_frequency=0.1):
+    """
+    Wait until a condition holds and record how long it took.
+
+    Args:
+        driver: Selenium WebDriver instance
+        condition: Callable(driver) returning a truthy value when satisfied
+        name: Step name used for timing records
+        timeout: Maximum seconds to wait
+        timings: Optional StepTimings to record the wait in
+        poll_frequency: Seconds between condition checks
+
+    Returns:
+        The condition's truthy result
+
+    Raises:
+        TimeoutException: If the condition did not hold within timeout
+    """
+    start = time.monotonic()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    finally:
+        if timings:
+            timings.record(name, time.monotonic() - start)
+
+
+def document_ready(driver):
+    """Condition: the current document has finished loading."""
+    return driver.execute_script("return document.readyState;") == "complete"
+
+
+class network_idle:
+    """
+    Condition: no new resources have loaded for idle_time seconds.
+
+    Uses the Resource Timing buffer, so it only sees requests the page
+    itself made; it is meant as a settle check after document_ready.
+    """
+
+    def __init__(self, idle_time=0.5):
+        self.idle_time = idle_time
+        self._count = None
+        self._since = None
+
+    def __call__(self, driver):
+        count = driver.execute_script(
+            "return document.readyState === 'complete' ? "
+            "performance.getEntriesByType('resource').length : -1;"
+        )
+        now = time.monotonic()
+        if count != self._count:
+            self._count = count
+            self._since = now
+            return False
+        return count >= 0 and now - self._since >= self.idle_time
+
+
+def wait_for_url_change(driver, old_url, name, timeout=10, timings=None):
+    """
+    Wait for the browser to navigate away from a URL, then for the new page to load.
+
+    Args:
+        driver: Selenium WebDriver instance
+        old_url: URL the browser was on before the action
+        name: Step name used for timing records
+        timeout: Maximum seconds to wait
+        timings: Optional StepTimings to record the wait in
+    """
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(EC.url_changes(old_url))
+        remaining = max(timeout - (time.monotonic() - start), 0.1)
+        WebDriverWait(driver, remaining, poll_frequency=0.1).until(document_ready)
+    finally:
+        if timings:
+            timings.record(name, time.monotonic() - start)
+
+
+def wait_for_page_settled(driver, name, timeout=10, idle_time=0.5, timings=None):
+    """
+    Wait for document ready state and a short network idle period.
+
+    Args:
+        driver: Selenium WebDriver instance
+        name: Step name used for timing records
+        timeout: Maximum seconds to wait
+        idle_time: Seconds without new resource loads that count as idle
+        timings: Optional StepTimings to record the wait in
+
+    Returns:
+        bool: True if the page settled, False if the timeout was reached first
+    """
+    try:
+        wait_for(driver, network_idle(idle_time), name, timeout=timeout, timings=timings)
+        return True
+    except TimeoutException:
+        return False
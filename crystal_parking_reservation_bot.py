@@ -1,188 +1,282 @@
-import time
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import TimeoutException
+"""
+Command-line front end for the reservation bot.
+
+Single reservation (prompts for anything not given on the command line):
+    python crystal_parking_reservation_bot.py --username me --plate ABC123 --date 2025/01/04
+
+Batch mode reads one job per CSV row or JSONL line and runs them
+concurrently, at most --parallel at a time:
+    python crystal_parking_reservation_bot.py --jobs jobs.csv --parallel 4 --report report.json
+
+Each job needs username, license_plate and date, plus an optional id and
+password. Jobs without a password use PARKING_PASSWORD; batch mode never
+prompts. Progress lines are prefixed with the job ID, and a summary with
+per-phase timings is printed (and written to --report) when all jobs end.
+Ctrl+C cancels every running job. --engine http runs jobs without a
+browser, starting Chrome only for a job whose pages need one.
+"""
+import argparse
+import csv
 import getpass
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+from bot.availability_watcher import get_watcher_registry
+from bot.driver_manager import get_driver_pool
+from bot.http_engine import get_http_pool, get_reservation_engine
+from bot.memory_watchdog import get_memory_watchdog
+from bot.poll_scheduler import get_poll_scheduler
+from bot.reservation_bot import parse_date, run_reservation
+from bot.session_cache import get_session_cache
+
+JOB_FIELDS = ("username", "license_plate", "date")
+
+
+def read_jobs(path, default_password=None):
+    """
+    Load reservation jobs from a CSV file (with a header row) or a JSONL file.
 
-username = input("Enter username: ")
-password = getpass.getpass("Enter password: ")
-license_plate = input("Enter license plate: ")
-date_input = input("Enter date (YYYY/MM/DD): ")
-
-# Process the date and handle errors
-try:
-    date_obj = datetime.strptime(date_input, "%Y/%m/%d")
-    date_base = date_obj.strftime("%Y-%m-%d")  # Just the date portion (YYYY-MM-DD)
-    print(f"Looking for date: {date_base}")
-except ValueError:
-    print("Invalid date format. Please enter the date in 'YYYY/MM/DD' format.")
-    exit()
-
-#Selenium will open a browser and close once the action has been complete natively. This detatches that functionality so it stays open. 
-options = Options()
-options.add_experimental_option("detach", True)
-
-# Initialize WebDriver
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-# Navigate to website
-driver.get("https://parking.crystalmountainresort.com/login/")
-driver.maximize_window()
-
-# Wait for the "Returning Users" button to be clickable and click it
-try:
-    # Locate the button using XPath
-    button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[text()='Returning Users']"))
-    )
-    button.click()
-    print("Clicked the 'Returning Users' button successfully!")
-except Exception as e:
-    print(f"Error: {e}")
-
-
-# Wait for username input field and enter data
-try:
-    username_input = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//input[@placeholder='Username']"))
-    )
-    username_input.send_keys(username)  # Replace "YourUsername" with the actual username 
-    print("Entered username successfully!")
-except Exception as e:
-    print(f"Error entering username: {e}")
-
-# Wait for password input field and enter data
-try:
-    password_input = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//input[@placeholder='Password']"))
-    )
-    password_input.send_keys(password)  # Replace "YourPassword" with the actual password
-    print("Entered password successfully!")
-except Exception as e:
-    print(f"Error entering password: {e}")
-
-# Wait for "Sign In" button to be clickable and click it
-try:
-    sign_in_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[text()='Sign In']"))
-    )
-    sign_in_button.click()
-    print("Clicked the 'Sign In' button successfully!")
-except Exception as e:
-    print(f"Error clicking 'Sign In': {e}")
-
-# Optional: Pause to see the result
-time.sleep(5)
-
-try:
-    dropdown = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.ID, "plate"))
-    )
-    select = Select(dropdown)
-
-    # Handle license plate input
-    if license_plate.strip():
-        options = [option.text.strip().lower().replace(" ", "") for option in select.options]
-        matched_option = None
-
-        for option in select.options:
-            if license_plate.strip().lower().replace(" ", "") in option.text.strip().lower().replace(" ", ""):
-                matched_option = option.text
-                break
-
-        if matched_option:
-            select.select_by_visible_text(matched_option)
-            license_plate = matched_option  # Store the selected license plate
-            print(f"Selected the dropdown value: {matched_option}")
+    Args:
+        path: Jobs file; ".jsonl" and ".json" are read as one JSON object per line,
+              anything else as CSV
+        default_password: Password for jobs that do not carry their own
+
+    Returns:
+        list: Jobs as {"id", "username", "password", "license_plate", "date"} dicts
+    """
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".json")):
+            rows = []
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    rows.append((line_no, json.loads(line)))
+                except ValueError as e:
+                    raise Exception(f"{path} line {line_no}: invalid JSON ({e})")
         else:
-            print("No matching license plate found.")
-    else:
-        print("No license plate entered. Here are the available options:")
-        for option in select.options:
-            print(option.text)
-except Exception as e:
-    print(f"Error selecting dropdown value: {e}")
-
-# Wait for the "Add More Days" link and click it
-try:
-    add_more_days_link = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//a[text()='Add More Days' and @class='btn btn-primary']"))
-    )
-    add_more_days_link.click()
-    print("Clicked the 'Add More Days' link successfully!")
-except Exception as e:
-    print(f"Error clicking 'Add More Days': {e}")
-
-
-refresh_rate = 5  # Refresh every 5 seconds
-
-while True:
+            # Line 1 is the header
+            rows = list(enumerate(csv.DictReader(f), 2))
+
+    jobs = []
+    for line_no, row in rows:
+        row = {key.strip().lower(): str(value).strip() for key, value in row.items() if key and value is not None}
+        if "plate" in row and "license_plate" not in row:
+            row["license_plate"] = row.pop("plate")
+        missing = [field for field in JOB_FIELDS if not row.get(field)]
+        if missing:
+            raise Exception(f"{path} line {line_no}: missing {', '.join(missing)}")
+        password = row.get("password") or default_password
+        if not password:
+            raise Exception(f"{path} line {line_no}: no password in the file and PARKING_PASSWORD is not set")
+        try:
+            date = parse_date(row["date"])
+        except Exception as e:
+            raise Exception(f"{path} line {line_no}: {e}")
+        jobs.append({
+            "id": row.get("id") or f"job-{len(jobs) + 1}",
+            "username": row["username"],
+            "password": password,
+            "license_plate": row["license_plate"],
+            "date": date,
+        })
+
+    ids = [job["id"] for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise Exception(f"{path}: job IDs must be unique")
+    return jobs
+
+
+def run_jobs(jobs, parallel=1, cancel_event=None, **bot_options):
+    """
+    Run reservation jobs concurrently and stream their progress to stdout.
+
+    Args:
+        jobs: Jobs as returned by read_jobs()
+        parallel: Jobs running at the same time
+        cancel_event: Optional threading.Event that cancels running jobs and skips queued ones
+        **bot_options: Shared objects passed to run_reservation (driver_pool, poll_scheduler, ...)
+
+    Returns:
+        list: One result per job, in input order, with id, success, message, engine,
+              started, seconds, phase_timings and wait_timings
+    """
+    cancel_event = cancel_event or threading.Event()
+    pending = queue.Queue()
+    for index, job in enumerate(jobs):
+        pending.put((index, job))
+    results = [None] * len(jobs)
+    print_lock = threading.Lock()
+    # One job prints like the web service log; several are told apart by ID
+    labelled = len(jobs) > 1
+
+    def worker():
+        while True:
+            try:
+                index, job = pending.get_nowait()
+            except queue.Empty:
+                return
+            base = {
+                "id": job["id"],
+                "username": job["username"],
+                "license_plate": job["license_plate"],
+                "date": job["date"],
+            }
+            if cancel_event.is_set():
+                results[index] = dict(base, success=False, message="Not started: batch cancelled.", engine=None,
+                                      started=None, seconds=0, phase_timings={}, wait_timings={})
+                continue
+
+            def progress(message, status, job_id=job["id"]):
+                prefix = f"[{job_id}] " if labelled else ""
+                with print_lock:
+                    print(f"{prefix}[{status.upper()}] {message}", flush=True)
+
+            started = time.time()
+            result = run_reservation(
+                job["username"], job["password"], job["license_plate"], job["date"],
+                progress_callback=progress, cancel_event=cancel_event, echo=False, **bot_options
+            )
+            results[index] = dict(
+                base,
+                success=result["success"],
+                message=result["message"],
+                engine=result.get("engine"),
+                started=started,
+                seconds=round(time.time() - started, 3),
+                phase_timings=result.get("phase_timings", {}),
+                wait_timings=result.get("wait_timings", {}),
+            )
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, min(parallel, len(jobs))))]
+    for thread in threads:
+        thread.start()
     try:
-        # Use starts-with to match any timestamp for the target date
-        # This avoids hardcoding specific timezone offsets (T07:00, T08:00, etc.)
-        calendar_day = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, f"//div[starts-with(@data-date, '{date_base}')]"))
+        for thread in threads:
+            # Join in slices so Ctrl+C reaches the main thread
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        with print_lock:
+            print("\nCancelling all jobs...", flush=True)
+        cancel_event.set()
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def build_report(results, wall_seconds):
+    """
+    Summarize a batch run.
+
+    Returns:
+        dict: Job counts, wall time, per-phase timings across jobs (mean and max
+              of each job's total per phase) and the individual results
+    """
+    phases = {}
+    for result in results:
+        for name, timing in result["phase_timings"].items():
+            phases.setdefault(name, []).append(timing["total"])
+    return {
+        "jobs": len(results),
+        "succeeded": sum(1 for r in results if r["success"]),
+        "failed": sum(1 for r in results if not r["success"]),
+        "wall_seconds": round(wall_seconds, 2),
+        "phases": {
+            name: {"mean": round(statistics.mean(values), 3), "max": round(max(values), 3), "jobs": len(values)}
+            for name, values in phases.items()
+        },
+        "results": results,
+    }
+
+
+def print_report(report):
+    print()
+    print(f"{report['succeeded']}/{report['jobs']} reservations succeeded in {report['wall_seconds']:.1f}s")
+    print()
+    print(f"{'JOB':<16} {'DATE':<10}  {'RESULT':<7} {'SECONDS':>8}  MESSAGE")
+    for r in report["results"]:
+        result = "ok" if r["success"] else "failed"
+        print(f"{r['id']:<16} {r['date']:<10}  {result:<7} {r['seconds']:>8.1f}  {r['message']}")
+    if report["phases"]:
+        print()
+        print(f"{'PHASE':<24} {'MEAN':>8} {'MAX':>8} {'JOBS':>5}")
+        for name, timing in report["phases"].items():
+            print(f"{name:<24} {timing['mean']:>8.2f} {timing['max']:>8.2f} {timing['jobs']:>5}")
+
+
+def prompt_job(args, password):
+    """Fill in a single job from the command line, prompting for anything missing."""
+    username = args.username or input("Enter username: ")
+    password = password or getpass.getpass("Enter password: ")
+    license_plate = args.plate or input("Enter license plate: ")
+    date = args.date or input("Enter date (YYYY/MM/DD): ")
+    return {
+        "id": "reservation",
+        "username": username,
+        "password": password,
+        "license_plate": license_plate,
+        "date": parse_date(date),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reserve Crystal Mountain parking from the command line")
+    parser.add_argument("--jobs", help="CSV or JSONL file of jobs to run in batch mode")
+    parser.add_argument("--parallel", type=int, default=4, help="Batch jobs running at once (default: 4)")
+    parser.add_argument("--report", help="Write the summary report to this JSON file")
+    parser.add_argument("--username", help="Account username (single reservation)")
+    parser.add_argument("--plate", help="License plate (single reservation)")
+    parser.add_argument("--date", help="Date YYYY/MM/DD (single reservation)")
+    parser.add_argument("--engine", choices=["browser", "http"],
+                        help="Drive Chrome throughout, or run over HTTP and fall back to Chrome "
+                             "(default: RESERVATION_ENGINE, else browser)")
+    args = parser.parse_args()
+
+    password = os.getenv("PARKING_PASSWORD")
+    try:
+        engine = args.engine or get_reservation_engine()
+        jobs = read_jobs(args.jobs, password) if args.jobs else [prompt_job(args, password)]
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print(f"Error: {args.jobs} has no jobs", file=sys.stderr)
+        return 2
+
+    driver_pool = get_driver_pool()
+    if engine == "browser":
+        # Over HTTP a browser is only launched for jobs that fall back to one
+        driver_pool.start()
+    start = time.time()
+    try:
+        results = run_jobs(
+            jobs,
+            parallel=args.parallel,
+            driver_pool=driver_pool,
+            session_cache=get_session_cache(),
+            poll_scheduler=get_poll_scheduler(),
+            watcher_registry=get_watcher_registry(),
+            memory_watchdog=get_memory_watchdog(),
+            engine=engine,
+            http_pool=get_http_pool(),
         )
+    finally:
+        driver_pool.shutdown()
 
-        # Get the actual data-date value for logging
-        actual_date = calendar_day.get_attribute("data-date")
-        print(f"Found calendar element with data-date: {actual_date}")
+    report = build_report(results, time.time() - start)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["failed"] == 0 else 1
 
-        # Check if the date is marked as "available"
-        if "fc-unavailable" not in calendar_day.get_attribute("class"):
-            print(f"Date {actual_date} is available! Clicking the date...")
-            calendar_day.click()  # Click on the available date
-            break
-        else:
-            print(f"Date {actual_date} is unavailable. Refreshing the page in {refresh_rate} seconds...")
-            time.sleep(refresh_rate)
-            driver.refresh()
-    except TimeoutException:
-        print(f"Unable to locate the calendar date element for {date_base}. Retrying...")
-        time.sleep(refresh_rate)  # Wait for the specified refresh rate before retrying
-        driver.refresh()
-
-# Locate and click the "Reserve Car Parking" button
-try:
-    reserve_button = WebDriverWait(driver, 3).until(
-        EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'add2cart') and contains(., 'Reserve Car Parking')]"))
-    )
-    reserve_button.click()
-    print("Clicked the 'Reserve Car Parking' button successfully!")
-except Exception as e:
-    print(f"Error clicking 'Reserve Car Parking' button: {e}")
-
-# Bring the window to the front using JavaScript
-driver.execute_script("window.focus();")
-
-# Wait for the second dropdown to be available and select the same license plate
-try:
-    dropdown = WebDriverWait(driver, 3).until(
-        EC.presence_of_element_located((By.ID, "plate"))
-    )
-    select = Select(dropdown)
-    select.select_by_visible_text(license_plate)  # Use the same license plate from the first dropdown
-    print("Selected the dropdown value successfully!")
-except Exception as e:
-    print(f"Error selecting dropdown value: {e}")
-
-
-# Wait for the "Continue" button to be clickable and click it
-try:
-    continue_button = WebDriverWait(driver, 3).until(
-        EC.element_to_be_clickable((By.ID, "btnCheckout"))
-    )
-    continue_button.click()
-    print("Clicked the 'Continue' button successfully!")
-except Exception as e:
-    print(f"Error clicking 'Continue' button: {e}")
-
-# Close browser
-# driver.quit()
\ No newline at end of file
+
+if __name__ == "__main__":
+    sys.exit(main())
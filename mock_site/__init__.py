@@ -0,0 +1 @@
+# Local mock of the parking site for benchmarks and offline testing
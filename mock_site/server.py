@@ -0,0 +1,236 @@
+"""
+Local stand-in for the Crystal Mountain parking site.
+
+Reproduces the pages and elements the bot depends on: the login page with
+the 'Returning Users' button, the #plate dropdown, the FullCalendar style
+data-date / fc-unavailable cells, the add2cart 'Reserve Car Parking'
+button and the #btnCheckout checkout form. Dates flip from unavailable to
+available at scripted times so detection latency can be measured.
+
+Usage:
+    python -m mock_site.server --port 8001 --flip 2025-01-04=30
+"""
+import argparse
+import secrets
+import threading
+import time
+from datetime import date, datetime, timedelta
+from flask import Flask, abort, jsonify, redirect, request, render_template_string
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Login</title></head>
+<body>
+  <button type="button" onclick="document.getElementById('login-form').style.display='block'">Returning Users</button>
+  <form id="login-form" method="post" action="/login/" style="display:none">
+    <input type="text" name="username" placeholder="Username">
+    <input type="password" name="password" placeholder="Password">
+    <button type="submit">Sign In</button>
+  </form>
+  {% if error %}<p class="error">{{ error }}</p>{% endif %}
+</body></html>
+"""
+
+PLATE_PAGE = """<!DOCTYPE html>
+<html><head><title>Vehicles</title></head>
+<body>
+  <select id="plate" name="plate">
+    {% for plate in plates %}<option value="{{ plate }}">{{ plate }}</option>{% endfor %}
+  </select>
+  <a href="/calendar/" class="btn btn-primary">Add More Days</a>
+</body></html>
+"""
+
+CALENDAR_PAGE = """<!DOCTYPE html>
+<html><head><title>Calendar</title></head>
+<body>
+  <div id="calendar" class="fc">
+    {% for day in days %}
+    <div class="fc-daygrid-day fc-day{% if not day.open %} fc-unavailable{% endif %}"
+         data-date="{{ day.date }}T08:00:00"
+         {% if day.open %}data-href="/reserve/{{ day.date }}/" onclick="location.href='/reserve/{{ day.date }}/'"{% endif %}
+         style="display:inline-block;width:40px;height:40px">{{ day.label }}</div>
+    {% endfor %}
+  </div>
+</body></html>
+"""
+
+RESERVE_PAGE = """<!DOCTYPE html>
+<html><head><title>Reserve {{ day }}</title></head>
+<body>
+  <div class="add2cart btn" data-href="/checkout/?date={{ day }}"
+       onclick="location.href='/checkout/?date={{ day }}'">Reserve Car Parking</div>
+</body></html>
+"""
+
+CHECKOUT_PAGE = """<!DOCTYPE html>
+<html><head><title>Checkout</title></head>
+<body>
+  <form method="post" action="/checkout/">
+    <input type="hidden" name="date" value="{{ day }}">
+    <select id="plate" name="plate">
+      {% for plate in plates %}<option value="{{ plate }}">{{ plate }}</option>{% endfor %}
+    </select>
+    <button id="btnCheckout" type="submit">Continue</button>
+  </form>
+</body></html>
+"""
+
+CONFIRMATION_PAGE = """<!DOCTYPE html>
+<html><head><title>Confirmed</title></head>
+<body><h1>Reservation confirmed</h1><p>{{ day }} for {{ plate }}</p></body></html>
+"""
+
+
+class MockState:
+    """Accounts, scripted availability flips, sessions and bookings of the mock site."""
+
+    def __init__(self, plates=None, horizon_days=60):
+        self.plates = plates or ["ABC 123 - Subaru Outback", "XYZ 789 - Toyota Tacoma"]
+        self.horizon_days = horizon_days
+        self.open_at = {}  # "YYYY-MM-DD" -> epoch seconds when the date opens
+        self.sessions = set()
+        self.bookings = []
+        self.counts = {"login": 0, "calendar": 0, "checkout": 0}
+        self.lock = threading.Lock()
+
+    def flip(self, day, after=0.0):
+        """Schedule a date to become available after the given number of seconds."""
+        with self.lock:
+            self.open_at[day] = time.time() + after
+            return self.open_at[day]
+
+    def is_open(self, day):
+        opens = self.open_at.get(day)
+        return opens is not None and time.time() >= opens
+
+    def calendar_days(self):
+        start = date.today()
+        scripted = [datetime.strptime(d, "%Y-%m-%d").date() for d in self.open_at]
+        if scripted:
+            start = min([start] + scripted)
+        end = max([start + timedelta(days=self.horizon_days)] + scripted)
+        days = []
+        current = start
+        while current <= end:
+            day = current.isoformat()
+            days.append({"date": day, "label": current.day, "open": self.is_open(day)})
+            current += timedelta(days=1)
+        return days
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+
+def create_app(state=None):
+    """
+    Build the mock site.
+
+    Args:
+        state: Optional MockState to share with a benchmark harness
+
+    Returns:
+        Flask: The mock application
+    """
+    state = state or MockState()
+    app = Flask(__name__)
+    app.config["MOCK_STATE"] = state
+
+    def signed_in():
+        return request.cookies.get("mock_session") in state.sessions
+
+    def require_session():
+        if not signed_in():
+            abort(redirect("/login/"))
+
+    @app.route("/login/", methods=["GET", "POST"])
+    def login():
+        if request.method == "GET":
+            return render_template_string(LOGIN_PAGE)
+        state.count("login")
+        if not request.form.get("username") or not request.form.get("password"):
+            return render_template_string(LOGIN_PAGE, error="Invalid credentials"), 401
+        token = secrets.token_hex(16)
+        with state.lock:
+            state.sessions.add(token)
+        response = redirect("/plates/")
+        response.set_cookie("mock_session", token, httponly=True)
+        return response
+
+    @app.route("/plates/")
+    def plates():
+        require_session()
+        return render_template_string(PLATE_PAGE, plates=state.plates)
+
+    @app.route("/calendar/")
+    def calendar():
+        require_session()
+        state.count("calendar")
+        return render_template_string(CALENDAR_PAGE, days=state.calendar_days())
+
+    @app.route("/reserve/<day>/")
+    def reserve(day):
+        require_session()
+        if not state.is_open(day):
+            return redirect("/calendar/")
+        return render_template_string(RESERVE_PAGE, day=day)
+
+    @app.route("/checkout/", methods=["GET", "POST"])
+    def checkout():
+        require_session()
+        if request.method == "GET":
+            return render_template_string(CHECKOUT_PAGE, day=request.args.get("date", ""), plates=state.plates)
+        state.count("checkout")
+        booking = {
+            "date": request.form.get("date"),
+            "plate": request.form.get("plate"),
+            "time": time.time(),
+        }
+        with state.lock:
+            state.bookings.append(booking)
+        return redirect(f"/confirmation/?date={booking['date']}&plate={booking['plate']}")
+
+    @app.route("/confirmation/")
+    def confirmation():
+        require_session()
+        return render_template_string(
+            CONFIRMATION_PAGE, day=request.args.get("date"), plate=request.args.get("plate")
+        )
+
+    @app.route("/mock/flip", methods=["POST"])
+    def mock_flip():
+        data = request.get_json(force=True)
+        opens = state.flip(data["date"], float(data.get("after", 0)))
+        return jsonify({"date": data["date"], "opens_at": opens})
+
+    @app.route("/mock/state")
+    def mock_state():
+        with state.lock:
+            return jsonify({
+                "open_at": state.open_at,
+                "bookings": state.bookings,
+                "counts": state.counts,
+                "sessions": len(state.sessions),
+            })
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock parking site")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--flip", action="append", default=[], metavar="DATE=SECONDS",
+                        help="Open DATE (YYYY-MM-DD) this many seconds after startup")
+    args = parser.parse_args()
+
+    state = MockState()
+    for spec in args.flip:
+        day, _, after = spec.partition("=")
+        state.flip(day, float(after or 0))
+
+    create_app(state).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()